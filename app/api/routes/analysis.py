@@ -1,35 +1,126 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, update
+from app.core.config import settings
+from app.core.redis import get_async_redis
 from app.db.session import SESSION
 from app.db.models.track import Track
-from rq import Queue
-from redis import Redis
-from app.core.config import settings
+from app.db.models.analysis import Analysis
+from app.schemas.analysis import AnalysisBatchIn, AnalysisBatchOut
+from app.services.audio.packed import unpack_beats
 import asyncio
 
-from app.services.tasks.jobs import analyze_track_job
+from app.services.tasks.progress import stream_progress
+from app.services.tasks.queue import enqueue_analyses
+from app.services.tasks.singleflight import claim_analyses, release_analyses
 
 router = APIRouter()
-redis_conn = Redis.from_url(settings.REDIS_URL)
-queue = Queue(settings.RQ_QUEUE, connection=redis_conn)
+
+
+def _audio_ready(status, file_path) -> bool:
+    """YouTube 다운로드 중(또는 실패해 파일이 없는) 트랙은 분석할 오디오가 없다"""
+    return status != "downloading" and bool(file_path)
+
 
 @router.post("/{track_id}/start")
 async def start_analysis(track_id: int):
+    """이미 queued/processing인 분석이 있으면 새로 큐잉하지 않고 그 잡 id를 돌려준다 (single-flight)"""
     async with SESSION() as db:
         track = await db.get(Track, track_id)
         if not track:
             raise HTTPException(404, "Track not found")
-        # if track.status not in ("pending", "failed", "", ""):  # 이미 처리중/완료면 거절
-        #     raise HTTPException(409, f"Already {track.status}")
-
-        track.status = "queued"
-        await db.commit()
-    job = await asyncio.to_thread(
-        queue.enqueue,
-        analyze_track_job,  # 동기 함수
-        track_id,
-        job_timeout=60 * 30,
-        result_ttl=60 * 60,  # 선택: 결과 보존 1h
-        failure_ttl=24 * 60 * 60,  # 선택: 실패 보존 1d
-        description=f"analyze track {track_id}",
+        if not _audio_ready(track.status, track.file_path):
+            raise HTTPException(409, f"Track audio is not ready (status={track.status})")
+
+        claimed, existing = await asyncio.to_thread(claim_analyses, [track_id])
+        if existing:
+            return {"job_id": existing[track_id], "status": track.status}
+        try:
+            track.status = "queued"
+            await db.commit()
+        except Exception:
+            await asyncio.to_thread(release_analyses, claimed)
+            raise
+    jobs = await asyncio.to_thread(enqueue_analyses, [track_id], "normal", claimed)
+    return {"job_id": jobs[track_id].id, "status": "queued"}
+
+
+@router.post("/batch", response_model=AnalysisBatchOut)
+async def start_analysis_batch(body: AnalysisBatchIn):
+    """
+    여러 트랙 분석을 한 번에: 상태는 UPDATE 한 문장, 잡은 Redis 파이프라인 한 번으로 큐잉.
+    없는 트랙은 건너뛰고 missing으로, 오디오가 아직 없는 트랙(다운로드 중)은 not_ready로,
+    이미 분석 중인 트랙은 기존 잡 id와 함께 inflight로 돌려준다.
+    """
+    track_ids = list(dict.fromkeys(body.track_ids))
+    if len(track_ids) > settings.ANALYSIS_BATCH_MAX:
+        raise HTTPException(400, f"At most {settings.ANALYSIS_BATCH_MAX} tracks per batch")
+    async with SESSION() as db:
+        rows = (await db.execute(
+            select(Track.id, Track.status, Track.file_path).where(Track.id.in_(track_ids))
+        )).all()
+        found = {r.id for r in rows}
+        ready = {r.id for r in rows if _audio_ready(r.status, r.file_path)}
+        claimed, existing = await asyncio.to_thread(claim_analyses, [i for i in track_ids if i in ready])
+        if claimed:
+            try:
+                await db.execute(update(Track).where(Track.id.in_(list(claimed))).values(status="queued"))
+                await db.commit()
+            except Exception:
+                await asyncio.to_thread(release_analyses, claimed)
+                raise
+    jobs = await asyncio.to_thread(enqueue_analyses, list(claimed), body.priority, claimed) if claimed else {}
+    return AnalysisBatchOut(
+        jobs={**{track_id: job.id for track_id, job in jobs.items()}, **existing},
+        missing=[i for i in track_ids if i not in found],
+        not_ready=[i for i in track_ids if i in found and i not in ready],
+        inflight=list(existing),
     )
-    return {"job_id": job.id, "status": "queued"}
\ No newline at end of file
+
+
+@router.get("/{track_id}/events")
+async def analysis_events(track_id: int):
+    """
+    진행 이벤트 SSE 스트림 (Redis pub/sub만 사용, DB 조회 없음).
+    마지막 이벤트를 먼저 보내고 stage가 done/failed면 종료.
+    진행 이벤트가 없던 트랙(예: 이 기능 이전에 분석된 트랙)은 heartbeat만 오므로 타임라인으로 확인.
+    """
+    return StreamingResponse(
+        stream_progress(track_id, get_async_redis()),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/{track_id}")
+async def get_analysis(track_id: int):
+    """
+    트랙 상태 + 최신 분석 결과.
+    단계 DAG에서는 beats 단계가 커밋되면 stem 분리가 끝나기 전에도 BPM/비트 그리드가 보인다.
+    """
+    async with SESSION() as db:
+        track = await db.get(Track, track_id)
+        if not track:
+            raise HTTPException(404, "Track not found")
+        a = (await db.execute(
+            select(Analysis).where(Analysis.track_id == track_id).order_by(Analysis.id.desc()).limit(1)
+        )).scalar_one_or_none()
+
+    out = {"trackId": track_id, "status": track.status, "analysis": None}
+    if a is not None:
+        beat_grid = None
+        if a.beat_grid is not None:
+            b = unpack_beats(a.beat_grid)
+            beat_grid = [
+                {"idx": i, "ms": m, "count": c, "measure": me}
+                for i, (m, c, me) in enumerate(zip(b.ms.tolist(), b.count.tolist(), b.measure.tolist()))
+            ]
+        out["analysis"] = {
+            "id": a.id,
+            "bpm": a.bpm,
+            "beatConfidence": a.beat_confidence,
+            "phaseShiftMs": a.beat_phase_shift_ms,
+            "measures": a.measures,
+            "beatGrid": beat_grid,
+        }
+    return out
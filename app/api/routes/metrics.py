@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Response
+from prometheus_client import CollectorRegistry
+import asyncio
+
+from app.core.metrics import CONTENT_TYPE_LATEST, QueueCollector, metrics_registry, render_metrics
+from app.core.redis import get_redis
+from app.services.tasks.queue import analysis_queues
+
+router = APIRouter()
+
+# 큐 깊이는 스크레이프 시점에 Redis에서 읽는다 (프로세스 메트릭과 별도 레지스트리)
+_queue_registry = CollectorRegistry(auto_describe=False)
+_queue_registry.register(QueueCollector(analysis_queues, get_redis))
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus text format: 단계/잡/큐 대기 히스토그램, 큐 깊이, DB 문장 수, Redis 왕복, 요청 지연"""
+    data = await asyncio.to_thread(render_metrics, metrics_registry(), _queue_registry)
+    return Response(content=data, media_type=CONTENT_TYPE_LATEST)
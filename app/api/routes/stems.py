@@ -1,13 +1,200 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse
+from sqlalchemy import select
+from urllib.parse import quote
+import asyncio, os
+from app.core.config import settings
 from app.db.session import SESSION
-from app.services.audio.timeline import build_timeline
+from app.db.models.stem import Stem
+from app.services.audio.peaks import PeakPyramid, pyramid_path
+from app.services.audio.transcode import MEDIA_TYPES, TranscodeBusy, TranscodeError, get_transcode_pool
+from app.services.audio.timeline import TIMELINE_MEDIA_TYPES, latest_analysis_stmt, load_timeline, render_timeline
+from app.services.storage.backends import get_storage
+from app.services.cache.timeline import cached_timeline_etag, read_cached_timeline, write_cached_timeline
+from app.utils.http import etag_matches, make_etag, media_quality, parse_accept
 
 router = APIRouter()
 
+STEM_TYPES = tuple(Stem.__table__.c.stem_type.type.enums)
+
+
+def _parse_stems(stems: str | None) -> list[str] | None:
+    if stems is None:
+        return None
+    names = [n.strip() for n in stems.split(",") if n.strip()]
+    unknown = [n for n in names if n not in STEM_TYPES]
+    if unknown:
+        raise HTTPException(400, f"Unknown stem types: {', '.join(unknown)}")
+    return names
+
+
+def _timeline_format(request: Request) -> str:
+    """
+    Accept 헤더로 응답 형식 결정: msgpack을 명시(q>0)했고 json보다 선호도가 낮지 않을 때만 바이너리.
+    와일드카드(*/*)는 json으로 본다.
+    """
+    ranges = parse_accept(request.headers.get("accept"))
+    q_msgpack = max(
+        (q for q in (media_quality(ranges, m, wildcards=False) for m in ("application/x-msgpack", "application/msgpack"))
+         if q is not None),
+        default=0.0,
+    )
+    q_json = media_quality(ranges, "application/json")
+    if q_msgpack > 0 and (q_json is None or q_msgpack >= q_json):
+        return "msgpack"
+    return "json"
+
+
 @router.get("/{track_id}/timeline")
-async def get_timeline(track_id: int):
+async def get_timeline(
+    request: Request,
+    track_id: int,
+    from_ms: int | None = None,
+    to_ms: int | None = None,
+    stems: str | None = None,
+):
+    """
+    완료 시(또는 첫 조회 시) 한 번 인코딩해 둔 타임라인 bytes를 그대로 응답.
+    ETag는 분석 id + 캐시 파일 stat 기반이라 304는 파일을 읽지 않는다.
+    from_ms/to_ms([from_ms, to_ms)) 또는 stems=drums,bass 를 주면 그 부분만 바로 만들어 응답
+    (packed 배열 이진 탐색이라 비용은 구간 크기에 비례).
+    Accept: application/x-msgpack 이면 lane별 병렬 배열 바이너리 (services/audio/timeline.py 참고).
+    """
+    if from_ms is not None and to_ms is not None and from_ms >= to_ms:
+        raise HTTPException(400, "from_ms must be less than to_ms")
+    stem_types = _parse_stems(stems)
+    windowed = from_ms is not None or to_ms is not None or stem_types is not None
+    fmt = _timeline_format(request)
+    headers = {"Cache-Control": "no-cache", "Vary": "Accept"}
+    media_type = TIMELINE_MEDIA_TYPES[fmt]
+
+    async with SESSION() as db:
+        a = (await db.execute(latest_analysis_stmt(track_id))).first()
+        if a is None:
+            raise HTTPException(404, "Timeline not ready")
+
+        if windowed:
+            # 분석 결과는 분석 id별로 불변 -> (분석 id, 요청 구간)으로 ETag
+            etag = make_etag("timeline", track_id, a.id, fmt, from_ms, to_ms, stems)
+            if etag_matches(request, etag):
+                return Response(status_code=304, headers={"ETag": etag, **headers})
+            data = render_timeline(await load_timeline(db, track_id, a, from_ms, to_ms, stem_types), fmt)
+            return Response(content=data, media_type=media_type, headers={"ETag": etag, **headers})
+
+        etag = await asyncio.to_thread(cached_timeline_etag, track_id, a.id, fmt)
+        if etag and etag_matches(request, etag):
+            return Response(status_code=304, headers={"ETag": etag, **headers})
+
+        cached = await asyncio.to_thread(read_cached_timeline, track_id, a.id, fmt) if etag else None
+        if cached is None:
+            data = render_timeline(await load_timeline(db, track_id, a), fmt)
+            etag = await asyncio.to_thread(write_cached_timeline, track_id, a.id, data, fmt)
+        else:
+            data, etag = cached
+    return Response(content=data, media_type=media_type, headers={"ETag": etag, **headers})
+
+@router.get("/{track_id}/peaks")
+async def get_peaks(
+    request: Request,
+    track_id: int,
+    stem: str,
+    level: int = 0,
+    from_ms: int = 0,
+    to_ms: int | None = None,
+):
+    """
+    줌 레벨별 min/max 피크를 raw little-endian int16 [min, max] 쌍으로 반환.
+    bin 크기/시작 위치는 X-Peaks-* 헤더로 전달.
+    """
     async with SESSION() as db:
-        data = await build_timeline(db, track_id)
-    if data is None:
-        raise HTTPException(404, "Timeline not ready")
-    return data
\ No newline at end of file
+        row = (await db.execute(
+            select(Stem.id, Stem.file_path)
+            .where(Stem.track_id == track_id, Stem.stem_type == stem)
+            .order_by(Stem.id.desc())
+            .limit(1)
+        )).first()
+    if row is None or not row.file_path:
+        raise HTTPException(404, "Stem not found")
+
+    try:
+        path = await asyncio.to_thread(get_storage().local_path, pyramid_path(row.file_path))
+        st = await asyncio.to_thread(os.stat, path)
+        pyramid = await asyncio.to_thread(PeakPyramid, path)
+    except FileNotFoundError:
+        raise HTTPException(404, "Peaks not ready")
+    if not 0 <= level < len(pyramid.level_bins):
+        raise HTTPException(400, f"level must be in [0, {len(pyramid.level_bins) - 1}]")
+
+    etag = make_etag("peaks", row.id, st.st_mtime_ns, st.st_size, level, from_ms, to_ms)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={settings.PEAKS_CACHE_MAX_AGE}",
+        "X-Peaks-Sample-Rate": str(pyramid.sample_rate),
+        "X-Peaks-Samples-Per-Bin": str(pyramid.samples_per_bin(level)),
+        "X-Peaks-Levels": str(len(pyramid.level_bins)),
+    }
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    data, start_bin = await asyncio.to_thread(pyramid.read, level, from_ms, to_ms)
+    headers["X-Peaks-Start-Bin"] = str(start_bin)
+    return Response(content=data, media_type="application/octet-stream", headers=headers)
+
+
+def _stem_audio_response(request: Request, stem_id: int, path: str, st: os.stat_result) -> Response:
+    """
+    ETag(stem id + 파일 stat) 304 -> X-Accel-Redirect(설정 시 nginx sendfile) -> FileResponse.
+    FileResponse는 Range/If-Range(206/416)를 처리하고, 서버가 pathsend 확장을 지원하면 본문 복사 없이 보낸다.
+    """
+    etag = make_etag("stem-audio", stem_id, os.path.basename(path), st.st_mtime_ns, st.st_size)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={settings.STEM_AUDIO_MAX_AGE}",
+        "Accept-Ranges": "bytes",
+    }
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    media_type = MEDIA_TYPES.get(os.path.splitext(path)[1].lower(), "application/octet-stream")
+
+    rel = os.path.relpath(os.path.abspath(path), os.path.abspath(settings.STORAGE_DIR))
+    if settings.STEM_AUDIO_ACCEL_PREFIX and not rel.startswith(".."):
+        accel = settings.STEM_AUDIO_ACCEL_PREFIX.rstrip("/") + "/" + quote(rel.replace(os.sep, "/"))
+        return Response(media_type=media_type, headers={**headers, "X-Accel-Redirect": accel})
+    return FileResponse(path, stat_result=st, media_type=media_type, headers=headers)
+
+
+@router.api_route("/{track_id}/{stem_type}/audio", methods=["GET", "HEAD"])
+async def get_stem_audio(
+    request: Request,
+    track_id: int,
+    stem_type: str,
+    fmt: str = Query("original", alias="format", pattern="^(original|opus)$"),
+):
+    """
+    stem 오디오 파일 (Range 요청으로 구간만 받아 seek 가능).
+    format=opus 이면 ffmpeg 풀에서 한 번 변환해 캐시한 Ogg Opus를 같은 방식으로 응답.
+    """
+    if stem_type not in STEM_TYPES:
+        raise HTTPException(404, "Stem not found")
+    async with SESSION() as db:
+        row = (await db.execute(
+            select(Stem.id, Stem.file_path)
+            .where(Stem.track_id == track_id, Stem.stem_type == stem_type)
+            .order_by(Stem.id.desc())
+            .limit(1)
+        )).first()
+    if row is None or not row.file_path:
+        raise HTTPException(404, "Stem not found")
+
+    try:
+        path = await asyncio.to_thread(get_storage().local_path, row.file_path)
+        if fmt == "opus":
+            path = await get_transcode_pool().to_opus(path)
+        st = await asyncio.to_thread(os.stat, path)
+    except FileNotFoundError:
+        raise HTTPException(404, "Stem audio not found")
+    except TranscodeBusy:
+        raise HTTPException(503, "Transcoder busy", headers={"Retry-After": "5"})
+    except TranscodeError as e:
+        raise HTTPException(502, f"Transcode failed: {e}")
+    return _stem_audio_response(request, row.id, path, st)
@@ -1,20 +1,18 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
-import os, shutil, asyncio, subprocess, tempfile
+from fastapi import APIRouter, UploadFile, File, HTTPException, Request
+import os, asyncio, hashlib, subprocess, wave
 from app.core.config import settings
 from app.db.session import SESSION
 from app.db.models.track import Track, SourceType
+from app.services.audio.io import hash_wav, tracks_dir
+from app.services.cache.results import clone_cached_analysis_async
+from app.services.storage.backends import get_storage
+from app.services.tasks.queue import enqueue_youtube_ingest
 from sqlalchemy import insert, update
 from starlette.status import HTTP_201_CREATED
-from typing import Tuple
-import yt_dlp
+from typing import AsyncIterator
 
 router = APIRouter()
 
-def _tracks_dir() -> str:
-    dest_dir = os.path.join(settings.STORAGE_DIR, "tracks")
-    os.makedirs(dest_dir, exist_ok=True)
-    return dest_dir
-
 async def _create_stub_record(*, filename: str, source_type: SourceType, status: str = "pending") -> int:
     async with SESSION() as db:
         stmt = insert(Track).values(
@@ -27,100 +25,154 @@ async def _create_stub_record(*, filename: str, source_type: SourceType, status:
         await db.commit()
         return res.inserted_primary_key[0]
 
-async def _finalize_record(track_id: int, file_path: str, status: str = "pending") -> None:
+async def _finalize_record(track_id: int, file_path: str, audio_hash: str | None = None, status: str = "pending") -> None:
     async with SESSION() as db:
-        stmt = update(Track).where(Track.id == track_id).values(file_path=file_path, status=status)
+        stmt = update(Track).where(Track.id == track_id).values(file_path=file_path, audio_hash=audio_hash, status=status)
         await db.execute(stmt)
         await db.commit()
 
-async def _ffmpeg_convert_to_wav(src_path: str, dst_path: str) -> None:
-    def _run():
-        cmd = ["ffmpeg", "-y", "-i", src_path, "-ac", "1", "-ar", str(settings.TARGET_SR), "-sample_fmt", "s16", "-f", "wav", dst_path]
-        subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+async def _reuse_cached_analysis(track_id: int, audio_hash: str) -> bool:
+    """같은 오디오의 완료된 분석이 있으면 새 트랙으로 복제하고 done 처리"""
+    async with SESSION() as db:
+        track = await db.get(Track, track_id)
+        if track is None or await clone_cached_analysis_async(db, track, audio_hash) is None:
+            return False
+        await db.commit()
+        return True
+
+async def _finalize_ingest(track_id: int, final_path: str, audio_hash: str | None = None) -> dict:
+    if audio_hash is None:
+        audio_hash = await asyncio.to_thread(hash_wav, final_path)
+    # 해시는 canonical WAV에서, DB에는 저장소 ref (flac/object 백엔드면 압축/업로드)
+    ref = await asyncio.to_thread(get_storage().store_audio, final_path)
+    await _finalize_record(track_id, ref, audio_hash)
+    if await _reuse_cached_analysis(track_id, audio_hash):
+        return {"id": track_id, "status": "done", "cached": True}
+    return {"id": track_id, "status": "pending"}
+
+_INGEST_CHUNK = 64 * 1024
+
+async def _stream_convert_to_wav(chunks: AsyncIterator[bytes], dst_path: str) -> str:
+    """
+    업로드 청크를 도착하는 대로 ffmpeg stdin에 흘려 canonical WAV(s16 mono TARGET_SR)를 만든다.
+    - 임시 원본 파일 없이 최종 WAV 한 번만 디스크에 쓴다
+    - ffmpeg 출력(raw PCM)을 받으면서 바로 해싱 (hash_wav와 같은 값)
+    - 입력이 MAX_UPLOAD_BYTES를 넘으면 즉시 중단 (413)
+      /upload_stream은 본문을 받는 도중에 끊지만, /upload(multipart)는 Starlette가 본문 전체를
+      SpooledTemporaryFile로 받아 둔 뒤에 핸들러가 돌기 때문에 한도 검사도 그 이후다
+      (요청 크기 자체는 프록시의 client_max_body_size 등으로 막는다)
+    - WAV 쓰기/해싱은 스레드에서 (이벤트 루프를 막지 않게)
+    - 포맷 판별은 ffmpeg에 맡김 (단, moov가 뒤에 있는 mp4처럼 seek가 필요한 입력은 실패)
+    Returns: audio_hash
+    """
+    sr = settings.TARGET_SR
+    cmd = [
+        settings.FFMPEG_BIN, "-hide_banner", "-loglevel", "error",
+        "-i", "pipe:0", "-vn", "-ac", "1", "-ar", str(sr),
+        "-f", "s16le", "-acodec", "pcm_s16le", "pipe:1",
+    ]
     try:
-        await asyncio.to_thread(_run)
+        proc = await asyncio.create_subprocess_exec(
+            *cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
     except FileNotFoundError:
         raise HTTPException(500, "ffmpeg가 설치되어 있지 않습니다.")
-    except subprocess.CalledProcessError:
-        raise HTTPException(500, "오디오를 wav로 변환하는 중 오류가 발생했습니다.")
-
-async def _download_first_youtube_audio_to_wav(url: str) -> Tuple[str, str]:
-    tmp_dir = tempfile.mkdtemp()
-    outtmpl = os.path.join(tmp_dir, "%(id)s.%(ext)s")
-
-    # bestaudio 그대로 받아서 ffmpeg로 wav 변환
-    ydl_opts = {
-        "outtmpl": outtmpl,
-        "format": "bestaudio/best",
-        "playlist_items": "1",
-        "noplaylist": False,
-        "prefer_ffmpeg": True,
-        "quiet": True,
-    }
-
-    def _run():
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=True)
-            entry = info["entries"][0] if info.get("_type") == "playlist" and info.get("entries") else info
-            vid_id = entry["id"]
-            title = entry.get("title") or vid_id
-
-            # 다운로드된 원본 파일 경로 추적
-            for root, _, files in os.walk(tmp_dir):
-                for fname in files:
-                    if fname.startswith(vid_id):
-                        return os.path.join(root, fname), title
-            raise HTTPException(500, "YouTube 오디오 다운로드 실패")
-
-    return await asyncio.to_thread(_run)
 
-# ------- endpoint -------
-@router.post("/upload", status_code=HTTP_201_CREATED)
-async def upload_track(file: UploadFile = File(...)):
-    ext = os.path.splitext(file.filename)[1].lower()
-    if ext not in [".mp3", ".wav", ".flac"]:
-        raise HTTPException(400, "Unsupported file type")
+    digest = hashlib.sha256(f"{sr}:1:".encode())
+    too_large = False
+
+    async def _feed():
+        nonlocal too_large
+        received = 0
+        try:
+            async for chunk in chunks:
+                received += len(chunk)
+                if received > settings.MAX_UPLOAD_BYTES:
+                    too_large = True
+                    proc.kill()
+                    return
+                proc.stdin.write(chunk)
+                await proc.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # ffmpeg가 먼저 종료 (디코딩 실패) -> returncode로 판단
+        finally:
+            proc.stdin.close()
+
+    def _open_wav():
+        w = wave.open(dst_path, "wb")
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sr)
+        return w
+
+    def _write_pcm(w, pcm: bytes):
+        digest.update(pcm)
+        w.writeframesraw(pcm)
+
+    async def _drain_pcm():
+        w = await asyncio.to_thread(_open_wav)
+        try:
+            while True:
+                pcm = await proc.stdout.read(_INGEST_CHUNK)
+                if not pcm:
+                    break
+                await asyncio.to_thread(_write_pcm, w, pcm)
+        finally:
+            await asyncio.to_thread(w.close)  # close 시 RIFF/data 크기 헤더 보정
 
-    original_name = file.filename
-    track_id = await _create_stub_record(filename=original_name, source_type=SourceType.upload)
-
-    dest_dir = _tracks_dir()
-    final_path = os.path.join(dest_dir, f"{track_id}.wav")
-
-    with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as tmp:
-        tmp_path = tmp.name
-        def _save_tmp():
-            with open(tmp_path, "wb") as f:
-                shutil.copyfileobj(file.file, f)
-        await asyncio.to_thread(_save_tmp)
+    try:
+        _, _, err = await asyncio.gather(_feed(), _drain_pcm(), proc.stderr.read())
+        await proc.wait()
+    except BaseException:
+        if proc.returncode is None:
+            proc.kill()
+        if os.path.exists(dst_path):
+            os.remove(dst_path)
+        raise
 
+    if too_large or proc.returncode != 0:
+        if os.path.exists(dst_path):
+            os.remove(dst_path)
+        if too_large:
+            raise HTTPException(413, f"Upload exceeds {settings.MAX_UPLOAD_BYTES} bytes")
+        reason = (err.decode(errors="ignore").strip().splitlines() or ["ffmpeg failed"])[-1]
+        raise HTTPException(400, f"Unsupported or corrupt audio: {reason[:200]}")
+    return digest.hexdigest()
+
+async def _ingest_stream(chunks: AsyncIterator[bytes], filename: str) -> dict:
+    track_id = await _create_stub_record(filename=filename, source_type=SourceType.upload)
+    final_path = os.path.join(tracks_dir(), f"{track_id}.wav")
     try:
-        await _ffmpeg_convert_to_wav(tmp_path, final_path)
-        os.remove(tmp_path)
+        audio_hash = await _stream_convert_to_wav(chunks, final_path)
     except Exception:
-        if os.path.exists(tmp_path):
-            os.remove(tmp_path)
+        await _finalize_record(track_id, "", status="failed")
         raise
+    return await _finalize_ingest(track_id, final_path, audio_hash)
 
-    await _finalize_record(track_id, final_path)
-    return {"id": track_id, "status": "pending"}
-
-@router.post("/upload_yt", status_code=HTTP_201_CREATED)
-async def upload_track_youtube(url: str):
-    tmp_audio_path, video_title = await _download_first_youtube_audio_to_wav(url)
-    track_id = await _create_stub_record(filename=video_title, source_type=SourceType.youtube)
-
-    dest_dir = _tracks_dir()
-    final_path = os.path.join(dest_dir, f"{track_id}.wav")
+# ------- endpoint -------
+@router.post("/upload", status_code=HTTP_201_CREATED)
+async def upload_track(file: UploadFile = File(...)):
+    """multipart 업로드. 본문은 이미 스풀된 상태라 MAX_UPLOAD_BYTES는 ffmpeg에 넘기는 양만 제한한다"""
+    async def _chunks():
+        while chunk := await file.read(_INGEST_CHUNK):
+            yield chunk
+    return await _ingest_stream(_chunks(), file.filename)
 
-    await _ffmpeg_convert_to_wav(tmp_audio_path, final_path)
+@router.post("/upload_stream", status_code=HTTP_201_CREATED)
+async def upload_track_stream(request: Request, filename: str = "upload"):
+    """multipart 없이 요청 본문(raw bytes)을 그대로 ffmpeg로 스트리밍"""
+    return await _ingest_stream(request.stream(), filename)
 
-    # 원본 삭제
+@router.post("/upload_yt", status_code=HTTP_201_CREATED)
+async def upload_track_youtube(url: str, analyze: bool = False):
+    """
+    다운로드/변환은 워커 잡으로 넘기고 트랙 id를 바로 돌려준다.
+    analyze=true면 다운로드가 끝난 뒤 분석 잡까지 이어서 큐잉한다.
+    """
+    track_id = await _create_stub_record(filename=url, source_type=SourceType.youtube, status="downloading")
     try:
-        os.remove(tmp_audio_path)
-        os.rmdir(os.path.dirname(tmp_audio_path))
+        job = await asyncio.to_thread(enqueue_youtube_ingest, track_id, url, analyze)
     except Exception:
-        pass
-
-    await _finalize_record(track_id, final_path)
-    return {"id": track_id, "status": "pending"}
\ No newline at end of file
+        await _finalize_record(track_id, "", status="failed")
+        raise
+    return {"id": track_id, "status": "downloading", "job_id": job.id}
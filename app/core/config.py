@@ -6,15 +6,71 @@ class Settings(BaseSettings):
     APP_ENV: str = "dev"
 
     REDIS_URL: str = "redis://localhost:6379/0"
-    RQ_QUEUE: str = "analysis"
+    RQ_QUEUE: str = "analysis"              # 가벼운 DSP/DB 단계
+    RQ_HEAVY_QUEUE: str = "analysis_heavy"  # stem 분리 (Demucs)
+    RQ_LOW_QUEUE: str = "analysis_low"      # 일괄 재분석 (priority=low)
+    RQ_HEAVY_LOW_QUEUE: str = "analysis_heavy_low"  # 일괄 재분석의 stem 분리 (개별 요청의 분리보다 뒤)
+    ANALYSIS_BATCH_MAX: int = 1000          # POST /analysis/batch 한 번에 받는 트랙 수
+    # "dag": prepare -> (beats | separate) -> join 단계 잡으로 나눠 큐잉 | "single": 잡 하나로 전 단계
+    ANALYSIS_PIPELINE: str = "dag"
+    # 워커가 단계별 진행 이벤트를 Redis로 발행 (/analysis/{id}/events SSE)
+    PROGRESS_EVENTS: bool = True
+    # worker.py 실행 모델: "fork"(잡마다 work horse fork) | "simple"(워커 프로세스에서 직접 실행)
+    WORKER_MODE: str = "fork"
+    WORKER_PROCESSES: int = 1            # >1이면 웜업한 부모에서 워커를 미리 fork (WorkerPool)
+    WORKER_WARMUP: bool = True           # 잡을 받기 전에 오디오 스택 임포트 + JIT 웜업
+    WORKER_PRELOAD_DEMUCS: bool = False  # 웜업 때 상주 Demucs 모델까지 로드
+    WORKER_METRICS_PORT: int = 9108      # 워커 Prometheus 사이드 포트 (0이면 끔)
 
+    # 오디오 저장소: "local"(WAV 그대로) | "flac"(무손실 FLAC로 압축) | "object"(STORAGE_URL로 PUT/GET)
     STORAGE_BACKEND: str = "local"
-    STORAGE_DIR: str = "./data"
+    STORAGE_DIR: str = "./data"          # 로컬 파일 (object면 내려받은 캐시도 같은 배치로)
+    STORAGE_URL: str = ""                # object: '<STORAGE_URL>/<key>'로 PUT/GET/DELETE
+    STORAGE_OBJECT_FLAC: bool = True     # object: 올리기 전에 FLAC로 압축
+    STORAGE_TIMEOUT: float = 60.0
 
     FFMPEG_BIN: str = "ffmpeg"
+    MAX_UPLOAD_BYTES: int = 512 * 1024 * 1024
 
     TARGET_SR: int = 22050
+    AUDIO_CACHE_DIR: str = ""  # 잡별 디코딩 캐시(memmap) 위치, 비우면 시스템 임시 디렉터리
     PEAKS_DOWNSAMPLE: int = 4000
+    # 줌 피라미드: level 0 = PEAKS_BASE_SAMPLES 샘플/bin, 레벨마다 PEAKS_LEVEL_FACTOR배씩 거칠게
+    PEAKS_BASE_SAMPLES: int = 256
+    PEAKS_LEVELS: int = 6
+    PEAKS_LEVEL_FACTOR: int = 4
+    PEAKS_CACHE_MAX_AGE: int = 86400
+    # /stems/{track_id}/{stem_type}/audio
+    STEM_AUDIO_MAX_AGE: int = 86400
+    STEM_AUDIO_ACCEL_PREFIX: str = ""  # nginx internal location (예: "/_stems/") -> X-Accel-Redirect로 sendfile 위임
+    STEM_OPUS_BITRATE: str = "96k"
+    STEM_TRANSCODE_WORKERS: int = 2     # 동시 ffmpeg 수
+    STEM_TRANSCODE_QUEUE: int = 8       # 이보다 많이 밀리면 503
+    PHASE_RESOLUTION_MS: float = 1.0  # estimate_phase_shift 결과 해상도
+
+    # stem onset 추출: "batch"(다채널 한 번에) | "serial" | "pool"(stem별 프로세스 병렬)
+    # pool은 잡마다 work horse 안에서 프로세스 풀을 새로 띄우므로 코어가 남을 때만 켠다
+    ONSET_MODE: str = "batch"
+    ONSET_WORKERS: int = 0  # 0이면 min(cpu 수, stem 수)
+    # 이벤트는 Stem.events_packed에 저장. stem_event 행도 계속 쓸지 (이전 버전 리더 호환용)
+    PERSIST_EVENT_ROWS: bool = True
+    # 분석 잡의 sample_rate/duration 커밋 직후 재조회 로그 (DB 가시성 디버깅용, 평소엔 왕복만 늘림)
+    JOB_DB_READBACK: bool = False
+
+    # Demucs stem 분리
+    DEMUCS_MODEL: str = "mdx_q"     # 속도 우선 mdx_q, 품질 우선 htdemucs_ft
+    DEMUCS_DEVICE: str = "mps"      # "cuda" | "mps" | "cpu"
+    DEMUCS_SEGMENT: float = 6       # seconds
+    DEMUCS_OVERLAP: float = 0.10    # 0~0.25
+    DEMUCS_SHIFTS: int = 1
+    DEMUCS_JOBS: int = 2            # 병렬 작업 수
+    # "auto": 워커 프로세스에 모델을 상주시켜 Python API로 분리, torch/demucs가 없거나 실패하면 CLI
+    # "inprocess": Python API만 | "cli": 잡마다 demucs CLI 실행 (기존 방식)
+    DEMUCS_ENGINE: str = "auto"
+    DEMUCS_THREADS: int = 0         # torch CPU 스레드 수, 0이면 torch 기본값
+    # 세그먼트 병렬 분리 (CPU 코어별 프로세스, 분리 중에 피크/onset을 앞부분부터 계산)
+    DEMUCS_CHUNKED: bool = False
+    DEMUCS_SEGMENT_WORKERS: int = 0  # 0이면 cpu 수
 
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
@@ -1,8 +1,12 @@
 import logging
 
+from app.core.tracing import TraceIdFilter
+
 logging.basicConfig(
     level=logging.INFO,
-    format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
+    format="%(asctime)s | %(levelname)s | %(name)s | trace=%(trace_id)s | %(message)s",
 )
+for _handler in logging.getLogger().handlers:
+    _handler.addFilter(TraceIdFilter())
 
-logger = logging.getLogger("dancer")
\ No newline at end of file
+logger = logging.getLogger("dancer")
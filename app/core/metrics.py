@@ -0,0 +1,99 @@
+"""
+Prometheus 메트릭 (API: GET /metrics, 워커: WORKER_METRICS_PORT 사이드 포트)
+
+워커는 잡을 fork된 work horse에서 돌리므로 prometheus_client 멀티프로세스 모드로 쓴다.
+worker.py가 이 모듈을 임포트하기 전에 PROMETHEUS_MULTIPROC_DIR를 설정하고,
+프로세스별로 파일에 쌓인 값을 스크레이프 때 합친다 (API도 여러 프로세스로 띄우면 같은 방식).
+"""
+import os
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event
+
+from app.core.logging import logger
+
+_DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600, 1200, 1800)
+_FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+
+STAGE_SECONDS = Histogram(
+    "beatmap_stage_seconds", "Analysis pipeline stage duration", ["stage"], buckets=_DURATION_BUCKETS,
+)
+JOB_SECONDS = Histogram(
+    "beatmap_job_seconds", "RQ job run time (perform_job)", ["job", "outcome"], buckets=_DURATION_BUCKETS,
+)
+QUEUE_WAIT_SECONDS = Histogram(
+    "beatmap_queue_wait_seconds", "Time from enqueue to a worker picking the job up", ["queue"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 1800, 3600),
+)
+DB_STATEMENTS = Counter("beatmap_db_statements", "SQL statements sent to the database", ["engine"])
+REDIS_SECONDS = Histogram("beatmap_redis_seconds", "Redis round trip per operation", ["op"], buckets=_FAST_BUCKETS)
+HTTP_SECONDS = Histogram(
+    "beatmap_http_request_seconds", "API request latency", ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+
+
+def stage_timer(stage: str):
+    """데코레이터/컨텍스트 매니저: beatmap_stage_seconds{stage}"""
+    return STAGE_SECONDS.labels(stage=stage).time()
+
+
+def redis_timer(op: str):
+    return REDIS_SECONDS.labels(op=op).time()
+
+
+def instrument_engine(engine, name: str) -> None:
+    """SQLAlchemy (동기) 엔진의 문장 수. executemany는 한 문장으로 센다"""
+    counter = DB_STATEMENTS.labels(engine=name)
+    event.listen(engine, "before_cursor_execute", lambda *args: counter.inc())
+
+
+class QueueCollector:
+    """
+    스크레이프 때 큐별 대기/의존 대기/실행 중 잡 수 + Redis PING 왕복 (파이프라인 한 번)
+    queues/connection: 큐 목록/Redis 클라이언트를 돌려주는 함수 (스크레이프 때 호출)
+    """
+
+    def __init__(self, queues, connection):
+        self.get_queues, self.get_connection = queues, connection
+
+    def collect(self):
+        depth = GaugeMetricFamily("beatmap_queue_depth", "RQ jobs per queue and state", labels=["queue", "state"])
+        ping = GaugeMetricFamily("beatmap_redis_ping_seconds", "Redis round trip measured at scrape time")
+        try:
+            queues = self.get_queues()
+            s = time.perf_counter()
+            with self.get_connection().pipeline(transaction=False) as pipe:
+                pipe.ping()
+                for q in queues:
+                    pipe.llen(q.key)
+                    pipe.zcard(q.deferred_job_registry.key)
+                    pipe.zcard(q.started_job_registry.key)
+                replies = pipe.execute()
+            ping.add_metric([], time.perf_counter() - s)
+            for i, q in enumerate(queues):
+                for state, n in zip(("queued", "deferred", "started"), replies[1 + 3 * i: 4 + 3 * i]):
+                    depth.add_metric([q.name, state], n)
+        except Exception as e:
+            logger.warning(f"[metrics] queue depth unavailable: {e}")
+            return
+        yield depth
+        yield ping
+
+
+def metrics_registry() -> CollectorRegistry:
+    """멀티프로세스 모드면 프로세스별 파일을 합치는 레지스트리, 아니면 기본 레지스트리"""
+    if not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        return REGISTRY
+    from prometheus_client import multiprocess
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def render_metrics(*registries: CollectorRegistry) -> bytes:
+    return b"".join(generate_latest(r) for r in registries)
+
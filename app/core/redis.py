@@ -0,0 +1,36 @@
+from typing import Optional
+
+from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
+from app.core.config import settings
+
+# 클라이언트는 임포트 때가 아니라 처음 쓸 때 만든다 (API는 lifespan 시작 때, 워커는 첫 잡에서).
+# 실제 TCP 연결은 첫 명령 때 맺어진다.
+_redis: Optional[Redis] = None
+_async_redis: Optional[AsyncRedis] = None
+
+
+def get_redis() -> Redis:
+    """API/워커 공용 동기 클라이언트 (RQ 큐잉, single-flight, 진행 이벤트 발행)"""
+    global _redis
+    if _redis is None:
+        _redis = Redis.from_url(settings.REDIS_URL)
+    return _redis
+
+
+def get_async_redis() -> AsyncRedis:
+    """API 전용 비동기 클라이언트 (진행 이벤트 SSE 구독)"""
+    global _async_redis
+    if _async_redis is None:
+        _async_redis = AsyncRedis.from_url(settings.REDIS_URL)
+    return _async_redis
+
+
+async def close_redis() -> None:
+    """API lifespan 종료 때 연결 풀 정리"""
+    global _async_redis
+    if _async_redis is not None:
+        await _async_redis.aclose()
+        _async_redis = None
+    if _redis is not None:
+        _redis.close()  # 큐 객체가 같은 클라이언트를 들고 있으므로 객체는 유지 (다시 쓰면 재연결)
@@ -0,0 +1,31 @@
+"""
+trace id: API 요청 -> 잡 meta["trace_id"] -> 워커 로그
+
+- API 미들웨어가 X-Trace-Id 헤더(없으면 새 id)로 설정하고 응답 헤더로 돌려준다
+- enqueue_analyses()가 현재 trace id를 잡 meta에 싣고, 워커가 잡 실행 동안 다시 설정한다
+- 로그 포맷의 trace=... 로 한 분석의 API/워커 로그를 묶어 볼 수 있다
+"""
+import logging
+from contextvars import ContextVar
+from typing import Optional
+from uuid import uuid4
+
+TRACE_HEADER = "X-Trace-Id"
+
+trace_id_var: ContextVar[Optional[str]] = ContextVar("trace_id", default=None)
+
+
+def new_trace_id() -> str:
+    return uuid4().hex[:16]
+
+
+def current_trace_id() -> Optional[str]:
+    return trace_id_var.get()
+
+
+class TraceIdFilter(logging.Filter):
+    """로그 레코드에 trace_id 속성 추가 (핸들러에 붙임)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.trace_id = trace_id_var.get() or "-"
+        return True
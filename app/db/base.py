@@ -1,4 +1,8 @@
+from sqlalchemy import BigInteger, Integer
 from sqlalchemy.orm import DeclarativeBase
 
+# PK 타입: MySQL은 BIGINT, SQLite(테스트/벤치)는 INTEGER PRIMARY KEY여야 autoincrement 동작
+BigIntPK = BigInteger().with_variant(Integer, "sqlite")
+
 class Base(DeclarativeBase):
-    pass
\ No newline at end of file
+    pass
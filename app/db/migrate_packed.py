@@ -0,0 +1,150 @@
+"""
+packed 컬럼 마이그레이션 / 백필
+
+    python -m app.db.migrate_packed [--batch-size 200] [--delete-rows]
+
+1) analysis.beat_grid, stem.events_packed 컬럼이 없으면 추가 (MySQL: BLOB(16777215) -> MEDIUMBLOB, 최대 16MB)
+   결과 캐시 키 track.audio_hash, analysis.pipeline_version 컬럼과 인덱스가 없으면 추가
+   stem_event(stem_id, ts_ms) 인덱스가 없으면 생성 (타임라인 구간 조회)
+   track.status ENUM에 없는 값(downloading, queued)이 있으면 모델 정의대로 MODIFY
+2) events_packed가 비어 있는 stem을 stem_event 행에서 채운다
+   --delete-rows 를 주면 옮긴 stem_event 행은 삭제 (PERSIST_EVENT_ROWS=False 운영 시)
+
+비트 그리드는 이전 분석에서 저장된 적이 없어 복원할 수 없다.
+beat_grid가 NULL인 분석은 타임라인이 기존처럼 이벤트에서 그리드를 추정한다.
+"""
+import argparse
+from typing import List, Tuple
+
+import numpy as np
+from sqlalchemy import delete, inspect, select, text
+from sqlalchemy.orm import Session
+
+from app.core.logging import logger
+from app.db.models.analysis import Analysis
+from app.db.models.stem import Stem
+from app.db.models.stem_event import StemEvent
+from app.db.models.track import Track
+from app.db.sync import make_sync_engine, make_sync_sessionmaker
+from app.services.audio.packed import pack_events
+
+PACKED_COLUMNS: List[Tuple[str, object]] = [
+    (Analysis.__tablename__, Analysis.__table__.c.beat_grid),
+    (Stem.__tablename__, Stem.__table__.c.events_packed),
+]
+
+# 결과 캐시 조회 키 (업로드 해시 -> 같은 파이프라인 버전의 분석 재사용)
+CACHE_COLUMNS: List[Tuple[str, object]] = [
+    (Track.__tablename__, Track.__table__.c.audio_hash),
+    (Analysis.__tablename__, Analysis.__table__.c.pipeline_version),
+]
+
+
+def add_packed_columns(engine) -> List[str]:
+    """없는 packed/캐시 컬럼만 ALTER TABLE ADD COLUMN. 추가한 'table.column' 목록 반환"""
+    insp = inspect(engine)
+    added = []
+    with engine.begin() as conn:
+        for table, col in PACKED_COLUMNS + CACHE_COLUMNS:
+            existing = {c["name"] for c in insp.get_columns(table)}
+            if col.name in existing:
+                continue
+            ddl = col.type.compile(dialect=engine.dialect)
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {col.name} {ddl} NULL"))
+            added.append(f"{table}.{col.name}")
+    return added
+
+
+def widen_track_status(engine) -> bool:
+    """
+    track.status ENUM을 모델 값 목록으로 넓힌다 (MySQL만. 다른 DB는 ENUM이 VARCHAR+CHECK라 대상 아님)
+    이미 모든 값이 있으면 아무것도 안 함. 변경했으면 True
+    """
+    if engine.dialect.name != "mysql":
+        return False
+    col = Track.__table__.c.status
+    with engine.begin() as conn:
+        current = conn.execute(text(
+            "SELECT COLUMN_TYPE FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :t AND COLUMN_NAME = :c"
+        ), {"t": Track.__tablename__, "c": col.name}).scalar() or ""
+        if all(f"'{v}'" in current for v in col.type.enums):
+            return False
+        conn.execute(text(track_status_ddl(engine.dialect)))
+    return True
+
+
+def track_status_ddl(dialect) -> str:
+    col = Track.__table__.c.status
+    return f"ALTER TABLE {Track.__tablename__} MODIFY {col.name} {col.type.compile(dialect=dialect)} NULL DEFAULT '{col.default.arg}'"
+
+
+def add_timeline_indexes(engine) -> None:
+    """모델에 선언된 stem_event 인덱스 중 없는 것만 생성"""
+    for idx in StemEvent.__table__.indexes:
+        idx.create(engine, checkfirst=True)
+
+
+def add_cache_indexes(engine) -> None:
+    """캐시 컬럼(index=True)의 인덱스 중 없는 것만 생성"""
+    for _, col in CACHE_COLUMNS:
+        for idx in col.table.indexes:
+            if col.name in idx.columns:
+                idx.create(engine, checkfirst=True)
+
+
+def pack_stem_rows(rows) -> bytes:
+    """stem_event 행 (ts_ms, strength, count_in_8, measure_index) -> events blob (NULL은 -1 / 0.0)"""
+    ms = np.array([r[0] for r in rows], dtype=np.int64)
+    strength = np.array([r[1] if r[1] is not None else 0.0 for r in rows], dtype=np.float64)
+    count = np.array([r[2] if r[2] is not None else -1 for r in rows], dtype=np.int64)
+    measure = np.array([r[3] if r[3] is not None else -1 for r in rows], dtype=np.int64)
+    return pack_events(ms, strength, count, measure)
+
+
+def backfill_stem_events(db: Session, batch_size: int = 200, delete_rows: bool = False) -> int:
+    """events_packed가 NULL인 stem을 id 순으로 채운다. 배치마다 커밋. 처리한 stem 수 반환"""
+    done, last_id = 0, 0
+    while True:
+        stems = db.execute(
+            select(Stem)
+            .where(Stem.events_packed.is_(None), Stem.id > last_id)
+            .order_by(Stem.id)
+            .limit(batch_size)
+        ).scalars().all()
+        if not stems:
+            return done
+        for stem in stems:
+            rows = db.execute(
+                select(StemEvent.ts_ms, StemEvent.strength, StemEvent.count_in_8, StemEvent.measure_index)
+                .where(StemEvent.stem_id == stem.id)
+                .order_by(StemEvent.id)
+            ).all()
+            stem.events_packed = pack_stem_rows(rows)
+            if delete_rows:
+                db.execute(delete(StemEvent).where(StemEvent.stem_id == stem.id))
+            last_id = stem.id
+        db.commit()
+        done += len(stems)
+        logger.info(f"[migrate] packed events for {done} stems (last_id={last_id})")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Add packed/cache columns and indexes, widen track.status and backfill stem events")
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--delete-rows", action="store_true", help="delete stem_event rows after packing")
+    args = parser.parse_args(argv)
+
+    engine = make_sync_engine()
+    added = add_packed_columns(engine)
+    logger.info(f"[migrate] added columns: {added or 'none'}")
+    logger.info(f"[migrate] track.status enum widened={widen_track_status(engine)}")
+    add_cache_indexes(engine)
+    add_timeline_indexes(engine)
+    with make_sync_sessionmaker(engine)() as db:
+        n = backfill_stem_events(db, args.batch_size, args.delete_rows)
+    logger.info(f"[migrate] backfill done stems={n}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,16 @@
-from sqlalchemy import BigInteger, Column, Float, Integer, ForeignKey, DateTime
+from sqlalchemy import BigInteger, Column, Float, Integer, ForeignKey, DateTime, String, LargeBinary
 from sqlalchemy.sql import func
-from app.db.base import Base
+from app.db.base import Base, BigIntPK
 
 class Analysis(Base):
     __tablename__ = "analysis"
 
-    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    id = Column(BigIntPK, primary_key=True, autoincrement=True)
     track_id = Column(BigInteger, ForeignKey("track.id", ondelete="CASCADE"), nullable=False)
     bpm = Column(Float)
     beat_confidence = Column(Float)
     beat_phase_shift_ms = Column(Integer, default=0)
     measures = Column(Integer)
+    pipeline_version = Column(String(32), index=True)  # 분석 파라미터 버전 (결과 캐시 키)
+    beat_grid = Column(LargeBinary(length=2**24 - 1))  # 비트별 (ms, count, measure) packed (services/audio/packed.py)
     created_at = Column(DateTime, server_default=func.now())
\ No newline at end of file
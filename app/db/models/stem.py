@@ -1,11 +1,12 @@
 from sqlalchemy import BigInteger, Column, Enum, ForeignKey, String, LargeBinary
-from app.db.base import Base
+from app.db.base import Base, BigIntPK
 
 class Stem(Base):
     __tablename__ = "stem"
 
-    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    id = Column(BigIntPK, primary_key=True, autoincrement=True)
     track_id = Column(BigInteger, ForeignKey("track.id", ondelete="CASCADE"), nullable=False)
     stem_type = Column(Enum("drums","bass","vocals","other", name="stem_type"), nullable=False)
     file_path = Column(String(512))
-    peak_preview = Column(LargeBinary)
\ No newline at end of file
+    peak_preview = Column(LargeBinary)
+    events_packed = Column(LargeBinary(length=2**24 - 1))  # onset 이벤트 packed 열 (services/audio/packed.py)
\ No newline at end of file
@@ -1,13 +1,16 @@
-from sqlalchemy import BigInteger, Column, Float, Integer, ForeignKey, Enum
-from app.db.base import Base
+from sqlalchemy import BigInteger, Column, Float, Integer, ForeignKey, Enum, Index
+from app.db.base import Base, BigIntPK
 
 class StemEvent(Base):
     __tablename__ = "stem_event"
 
-    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    id = Column(BigIntPK, primary_key=True, autoincrement=True)
     stem_id = Column(BigInteger, ForeignKey("stem.id", ondelete="CASCADE"), nullable=False)
     ts_ms = Column(Integer, nullable=False)
     strength = Column(Float)
     event_type = Column(Enum("onset","accent", name="event_type"), default="onset")
     count_in_8 = Column(Integer)
     measure_index = Column(Integer)
+
+    # 타임라인 구간 조회 (stem_id, ts_ms) 범위 스캔
+    __table_args__ = (Index("ix_stem_event_stem_ts", "stem_id", "ts_ms"),)
@@ -1,6 +1,6 @@
-from sqlalchemy import BigInteger, Column, Integer, String, Enum, DateTime, Text
+from sqlalchemy import Column, Integer, String, Enum, DateTime, Text
 from sqlalchemy.sql import func
-from app.db.base import Base
+from app.db.base import Base, BigIntPK
 import enum
 
 class SourceType(str, enum.Enum):
@@ -10,12 +10,13 @@ class SourceType(str, enum.Enum):
 class Track(Base):
     __tablename__ = "track"
 
-    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    id = Column(BigIntPK, primary_key=True, autoincrement=True)
     title = Column(String(255))
     source_type = Column(Enum(SourceType), nullable=False)
     file_path = Column(String(512))
     sample_rate = Column(Integer)
     duration_ms = Column(Integer)
-    status = Column(Enum("pending","processing","done","failed", name="track_status"), default="pending")
+    audio_hash = Column(String(64), index=True)  # canonical WAV PCM sha256 (결과 캐시 키)
+    status = Column(Enum("pending","downloading","queued","processing","done","failed", name="track_status"), default="pending")
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
\ No newline at end of file
@@ -9,10 +9,22 @@ from sqlalchemy.ext.asyncio import (
     create_async_engine,
 )
 
+from app.core.metrics import instrument_engine
 from app.db.config import DatabaseSettings
 settings = DatabaseSettings()
 class DatabaseManager:
+    """
+    엔진은 임포트 때가 아니라 init()에서 만든다 (API lifespan 시작 때, 또는 첫 세션 생성 때).
+    create_async_engine이 드라이버(aiomysql/pymysql)를 임포트하므로 임포트 비용도 같이 미뤄진다.
+    """
+
     def __init__(self):
+        self.engine = None
+        self.session_factory = async_sessionmaker(expire_on_commit=False)
+
+    def init(self) -> None:
+        if self.engine is not None:
+            return
         # Python 3.11 + SQLAlchemy 2.x 권장: aiomysql 사용
         url = settings.url  # mysql이면 driver 자동 보정
         self.engine = create_async_engine(
@@ -23,10 +35,22 @@ class DatabaseManager:
             # 필요시 타임아웃/SSL 등 추가
             # connect_args={"connect_timeout": 5, "ssl": {"ssl": True}},
         )
-        self.session_factory = async_sessionmaker(
-            bind=self.engine,
-            expire_on_commit=False,
-        )
+        instrument_engine(self.engine.sync_engine, "api")
+        self.session_factory.configure(bind=self.engine)
+
+    async def dispose(self) -> None:
+        """lifespan 종료 때 커넥션 풀 정리"""
+        if self.engine is not None:
+            await self.engine.dispose()
+            self.engine = None
+            self.session_factory.configure(bind=None)
+
+    def new_session(self, **kw):
+        self.init()
+        return self.session_factory(**kw)
+
+
+db_manager = DatabaseManager()
 
 
 # 세션 컨텍스트(요청/태스크 스코프)
@@ -60,6 +84,6 @@ def get_session_id() -> str | None:
 
 
 SESSION = async_scoped_session(
-    session_factory=DatabaseManager().session_factory,
+    session_factory=db_manager.new_session,
     scopefunc=get_session_id,
 )
\ No newline at end of file
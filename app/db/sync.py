@@ -0,0 +1,22 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.config import DatabaseSettings
+
+
+def sync_url(url: str) -> str:
+    """aiomysql/기본 mysql URL을 pymysql 드라이버로 (워커/스크립트용 동기 엔진)"""
+    if url.startswith("mysql+aiomysql://"):
+        url = url.replace("mysql+aiomysql://", "mysql+pymysql://", 1)
+    if url.startswith("mysql://"):
+        url = url.replace("mysql://", "mysql+pymysql://", 1)
+    return url
+
+
+def make_sync_engine(url: str | None = None):
+    return create_engine(sync_url(url or DatabaseSettings().url), pool_pre_ping=True, pool_recycle=28000)
+
+
+def make_sync_sessionmaker(engine, expire_on_commit: bool = True):
+    # 워커는 expire_on_commit=False: 커밋 뒤 속성 접근마다 SELECT로 다시 읽지 않음
+    return sessionmaker(bind=engine, autoflush=False, autocommit=False, expire_on_commit=expire_on_commit)
@@ -1,12 +1,31 @@
-from fastapi import FastAPI
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 # from app.core.logging import logger
 # from app.db.base import Base
 # from app.db.session import engine
 from app.api.routes.tracks import router as tracks_router
 from app.api.routes.analysis import router as analysis_router
 from app.api.routes.stems import router as stems_router
+from app.api.routes.metrics import router as metrics_router
+from app.core.metrics import HTTP_SECONDS
+from app.core.redis import close_redis, get_async_redis, get_redis
+from app.db.session import db_manager
+from app.core.tracing import TRACE_HEADER, new_trace_id, trace_id_var
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """DB 엔진/Redis 클라이언트는 임포트가 아니라 여기서 만들고 종료 때 정리 (연결은 첫 요청 때)"""
+    db_manager.init()
+    get_redis()
+    get_async_redis()
+    yield
+    await close_redis()
+    await db_manager.dispose()
+
 
-app = FastAPI(title="Music Analyzer API for dancer")
+app = FastAPI(title="Music Analyzer API for dancer", lifespan=lifespan)
 
 # @app.on_event("startup")
 # async def startup():
@@ -16,6 +35,28 @@ app = FastAPI(title="Music Analyzer API for dancer")
 app.include_router(tracks_router, prefix="/tracks", tags=["tracks"])
 app.include_router(analysis_router, prefix="/analysis", tags=["analysis"])
 app.include_router(stems_router, prefix="/stems", tags=["stems"])
+app.include_router(metrics_router, tags=["metrics"])
+
+
+@app.middleware("http")
+async def trace_and_time(request: Request, call_next):
+    """요청마다 trace id 설정(X-Trace-Id) + 라우트 템플릿별 지연 히스토그램"""
+    token = trace_id_var.set(request.headers.get(TRACE_HEADER) or new_trace_id())
+    s = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers[TRACE_HEADER] = trace_id_var.get()
+        return response
+    finally:
+        route = request.scope.get("route")
+        HTTP_SECONDS.labels(
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),  # 경로 파라미터 값이 라벨로 새지 않게 템플릿만
+            status=str(status),
+        ).observe(time.perf_counter() - s)
+        trace_id_var.reset(token)
 
 
 @app.get("/test")
@@ -0,0 +1,14 @@
+from typing import Dict, List, Literal
+from pydantic import BaseModel, Field
+
+class AnalysisBatchIn(BaseModel):
+    track_ids: List[int] = Field(..., min_length=1)
+    # high: 큐 맨 앞 | normal | low: 일괄 재분석용 낮은 우선순위 큐
+    priority: Literal["high", "normal", "low"] = "normal"
+
+class AnalysisBatchOut(BaseModel):
+    jobs: Dict[int, str]   # track_id -> 완료 기준 잡 id
+    missing: List[int]     # 존재하지 않는 트랙 id
+    not_ready: List[int] = []  # 오디오가 아직 없어(다운로드 중) 건너뛴 트랙 id
+    inflight: List[int] = []  # 이미 분석 중이라 새로 큐잉하지 않은 트랙 id (jobs에는 기존 잡 id)
+    status: str = "queued"
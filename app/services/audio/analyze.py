@@ -1,6 +1,10 @@
 import numpy as np
 import librosa
 from dataclasses import dataclass
+from typing import Optional
+
+from app.services.audio.grid import map_to_8count_array, counts_to_tuples
+from app.services.audio.phase import phase_shift
 
 @dataclass
 class BeatGrid:
@@ -10,11 +14,13 @@ class BeatGrid:
     confidence: float
 
 
-def compute_beat_grid(wav_path: str, sr: int) -> BeatGrid:
+def compute_beat_grid(wav_path: str, sr: int, y: Optional[np.ndarray] = None) -> BeatGrid:
     # 통일된 hop_length 사용 (librosa 기본값 512과 동일)
     HOP = 512
 
-    y, _ = librosa.load(wav_path, sr=sr, mono=True)
+    # y: 이미 디코딩된 mono 신호(sr 기준, 예: AudioBufferCache)가 있으면 재사용
+    if y is None:
+        y, _ = librosa.load(wav_path, sr=sr, mono=True)
     # NaN/Inf 방지 및 정규화
     if np.allclose(y, 0):
         y = np.zeros_like(y)
@@ -74,36 +80,12 @@ def compute_beat_grid(wav_path: str, sr: int) -> BeatGrid:
     )
 
 
-def estimate_phase_shift(beat_times: np.ndarray, onset_times: np.ndarray) -> float:
-    if len(beat_times) < 2 or len(onset_times) == 0:
-        return 0.0
-    period = float(np.median(np.diff(beat_times)))
-    if period <= 0:
-        return 0.0
-
-    shifts = np.linspace(-period, period, 41)
-    best_shift, best_score = 0.0, -1.0
-    base = float(beat_times[0])
-
-    for s in shifts:
-        snapped = np.round((onset_times - (base + s)) / period)
-        recon = (base + s) + snapped * period
-        score = float(np.mean(np.abs(onset_times - recon) < 0.07))
-        if score > best_score:
-            best_shift, best_score = float(s), score
-    return best_shift
+def estimate_phase_shift(beat_times: np.ndarray, onset_times: np.ndarray, resolution: float | None = None) -> float:
+    # 원형 위상 히스토그램 기반 (app.services.audio.phase), 해상도와 무관한 O(N log N)
+    shift, _ = phase_shift(beat_times, onset_times, resolution=resolution)
+    return shift
 
 
 def map_to_8count(beat_times: np.ndarray, phase_shift: float):
-    if len(beat_times) == 0:
-        return []
-    period = float(np.median(np.diff(beat_times))) if len(beat_times) > 1 else 0.5
-    base = float(beat_times[0] + phase_shift)
-
-    out = []
-    for i, t in enumerate(beat_times):
-        idx = int(np.round((float(t) - base) / period)) if period > 0 else i
-        count = (idx % 8) + 1
-        measure = idx // 8
-        out.append((i, int(float(t) * 1000), count, measure))
-    return out
\ No newline at end of file
+    # 기존 튜플 API: list[(idx, ms, count, measure)]
+    return counts_to_tuples(map_to_8count_array(beat_times, phase_shift))
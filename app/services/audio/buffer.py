@@ -0,0 +1,112 @@
+import itertools, os, shutil, tempfile
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import numpy as np, soundfile as sf, librosa
+from app.core.config import settings
+
+_BLOCK = 1 << 18  # 디코딩 블록 (frames)
+
+
+@dataclass(frozen=True)
+class AudioBuffer:
+    """
+    로컬 디스크의 raw float32 파일 하나 (frames x channels, C-order).
+    pickle 가능하므로 프로세스 풀에는 경로만 넘기고 각자 memmap으로 연다.
+    """
+    path: str
+    sr: int
+    channels: int
+    frames: int
+
+    def array(self) -> np.ndarray:
+        """읽기 전용 memmap. mono면 1-D, 아니면 (frames, channels)"""
+        if self.frames == 0:
+            return np.zeros((0,) if self.channels == 1 else (0, self.channels), dtype=np.float32)
+        mm = np.memmap(self.path, dtype="<f4", mode="r", shape=(self.frames, self.channels))
+        return mm[:, 0] if self.channels == 1 else mm
+
+
+class AudioBufferCache:
+    """
+    잡 하나 동안 쓰는 디코딩 캐시.
+    - 원본 파일은 한 번만 디코딩해 memmap(float32)으로 보관
+    - mono/리샘플 버전은 원본 memmap에서 파생 (재디코딩 없음)
+    - 이미 요청 sr과 같으면 리샘플하지 않음
+    - close() 시 임시 디렉터리 삭제
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        base = root or settings.AUDIO_CACHE_DIR or None
+        if base:
+            os.makedirs(base, exist_ok=True)
+        self.dir = tempfile.mkdtemp(prefix="beatmap-audio-", dir=base)
+        self._entries: Dict[Tuple[str, Optional[int], bool], AudioBuffer] = {}
+        self._seq = itertools.count()
+
+    def __enter__(self) -> "AudioBufferCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._entries.clear()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def _new_path(self) -> str:
+        return os.path.join(self.dir, f"{next(self._seq)}.f32")
+
+    def _store(self, data: np.ndarray, sr: int) -> AudioBuffer:
+        data = data.reshape(len(data), -1)
+        buf = AudioBuffer(path=self._new_path(), sr=int(sr), channels=data.shape[1], frames=data.shape[0])
+        if buf.frames:
+            mm = np.memmap(buf.path, dtype="<f4", mode="w+", shape=data.shape)
+            mm[:] = data
+            mm.flush()
+            del mm
+        return buf
+
+    def _decode(self, src: str) -> AudioBuffer:
+        with sf.SoundFile(src) as f:
+            buf = AudioBuffer(path=self._new_path(), sr=int(f.samplerate), channels=f.channels, frames=f.frames)
+            if buf.frames:
+                mm = np.memmap(buf.path, dtype="<f4", mode="w+", shape=(buf.frames, buf.channels))
+                pos = 0
+                while pos < buf.frames:
+                    block = f.read(out=mm[pos : pos + _BLOCK])
+                    if len(block) == 0:
+                        break
+                    pos += len(block)
+                mm.flush()
+                del mm
+        return buf
+
+    def get(self, src: str, sr: Optional[int] = None, mono: bool = True) -> AudioBuffer:
+        """
+        src를 (sr, mono) 조건으로 돌려준다. sr=None이면 원본 샘플레이트.
+        librosa.load(src, sr=sr, mono=mono)와 같은 값(다운믹스 -> soxr_hq 리샘플)이 나온다.
+        """
+        src = os.path.abspath(src)
+        key = (src, sr, mono)
+        if key in self._entries:
+            return self._entries[key]
+
+        native_key = (src, None, False)
+        native = self._entries.get(native_key)
+        if native is None:
+            native = self._entries[native_key] = self._decode(src)
+
+        buf = native
+        if mono and native.channels > 1:
+            mono_key = (src, None, True)
+            buf = self._entries.get(mono_key)
+            if buf is None:
+                buf = self._entries[mono_key] = self._store(native.array().mean(axis=1), native.sr)
+        if sr and sr != buf.sr:
+            y = buf.array()
+            y = librosa.resample(np.ascontiguousarray(y.T), orig_sr=buf.sr, target_sr=sr)
+            buf = self._store(y.T, sr)
+
+        self._entries[key] = buf
+        return buf
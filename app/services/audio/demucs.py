@@ -1,29 +1,327 @@
-import subprocess, os, shutil
+import importlib.util, subprocess, os, shutil, threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import soundfile as sf
 from app.core.config import settings
+from app.core.logging import logger
+from app.services.audio.buffer import AudioBuffer, AudioBufferCache
 
 STEMS = ["drums","bass","vocals","other"]
+# pretrained Demucs 모델은 모두 44.1kHz 스테레오 (청크 분리 시 모델 로드 없이 입력 준비용)
+MODEL_SR = 44100
+MODEL_CHANNELS = 2
 
 def _pick_device() -> str:
-    # 환경에 맞게 하드코딩하거나, settings로 관리해도 됨
     # CUDA 사용 가능 서버: "cuda", Apple Silicon: "mps", 그 외: "cpu"
-    return getattr(settings, "DEMUCS_DEVICE", "mps")
+    return settings.DEMUCS_DEVICE
 
 def _pick_model() -> str:
     # 속도 우선이면 mdx_q, 품질 우선이면 htdemucs_ft 등으로 스위치
-    return getattr(settings, "DEMUCS_MODEL", "mdx_q")
+    return settings.DEMUCS_MODEL
 
-def separate_stems(wav_path: str) -> dict:
+
+# ── 상주 엔진 (Python API) ─────────────────────────────────────────
+# 잡마다 CLI를 띄우면 인터프리터 기동 + torch import + 가중치 로드가 매번 반복된다.
+# 워커 프로세스당 모델을 한 번만 올려 두고 apply_model로 바로 분리한다.
+
+class DemucsEngine:
+    def __init__(self, model_name: str, device: str, threads: int = 0):
+        import torch  # 무거운 import는 엔진을 실제로 만들 때만
+        from demucs.pretrained import get_model
+
+        if threads > 0:
+            torch.set_num_threads(threads)
+        self.model_name = model_name
+        self.device = device
+        self.model = get_model(model_name)
+        self.model.to(device)
+        self.model.eval()
+        self._lock = threading.Lock()  # 모델 하나를 여러 스레드가 동시에 쓰지 않도록
+
+    @property
+    def samplerate(self) -> int:
+        return self.model.samplerate
+
+    def separate_array(
+        self, data: np.ndarray, mean: Optional[float] = None, std: Optional[float] = None, split: bool = True
+    ) -> np.ndarray:
+        """
+        data: (n, ch) float32, samplerate = self.samplerate
+        mean/std: 정규화 통계 (청크 분리 시 전체 트랙 기준 값을 넘겨 세그먼트 간 레벨을 맞춘다)
+        Returns: (len(STEMS), audio_channels, n) float32, STEMS 순서
+        """
+        import torch
+        from demucs.apply import apply_model
+
+        data = _fit_channels(data, self.model.audio_channels)
+        wav = torch.from_numpy(np.ascontiguousarray(data.T))
+        if mean is None or std is None:
+            ref = wav.mean(0)
+            mean, std = float(ref.mean()), float(ref.std())
+        std = std + 1e-8
+        with self._lock, torch.inference_mode():
+            sources = apply_model(
+                self.model,
+                ((wav - mean) / std)[None],
+                device=self.device,
+                shifts=settings.DEMUCS_SHIFTS,
+                split=split,
+                overlap=settings.DEMUCS_OVERLAP,
+                segment=settings.DEMUCS_SEGMENT,
+                num_workers=settings.DEMUCS_JOBS if split else 0,
+                progress=False,
+            )[0]
+        sources = (sources * std + mean).cpu().numpy()
+        return np.stack([sources[self.model.sources.index(name)] for name in STEMS]).astype(np.float32)
+
+    def separate(self, wav_path: str, out_dir: str) -> Dict[str, str]:
+        """stem WAV를 out_dir/<model>/<name>_<stem>.wav 로 저장 (CLI 결과와 같은 탐색 규칙)"""
+        import soxr
+
+        data, sr = sf.read(wav_path, dtype="float32", always_2d=True)  # (n, ch)
+        if sr != self.samplerate:
+            data = soxr.resample(data, sr, self.samplerate)
+        sources = self.separate_array(data)
+
+        stem_files = _stem_paths(wav_path, out_dir, self.model_name)
+        for name, source in zip(STEMS, sources):
+            sf.write(stem_files[name], source.T.clip(-1, 1), self.samplerate, subtype="PCM_16")
+        return stem_files
+
+
+def _fit_channels(data: np.ndarray, channels: int) -> np.ndarray:
+    data = data.reshape(len(data), -1)
+    if data.shape[1] < channels:
+        return np.repeat(data[:, :1], channels, axis=1)
+    return data[:, :channels]
+
+
+def _stem_paths(wav_path: str, out_dir: str, model_name: str) -> Dict[str, str]:
+    model_dir = os.path.join(out_dir, model_name)
+    os.makedirs(model_dir, exist_ok=True)
+    base = os.path.splitext(os.path.basename(wav_path))[0]
+    return {name: os.path.join(model_dir, f"{base}_{name}.wav") for name in STEMS}
+
+
+_engine: Optional[DemucsEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> DemucsEngine:
+    """워커 프로세스당 하나. 모델/디바이스 설정이 바뀌면 다시 로드"""
+    global _engine
+    model, device = _pick_model(), _pick_device()
+    with _engine_lock:
+        if _engine is None or (_engine.model_name, _engine.device) != (model, device):
+            logger.info(f"[demucs] loading model={model} device={device}")
+            _engine = DemucsEngine(model, device, settings.DEMUCS_THREADS)
+        return _engine
+
+
+# ── 청크(세그먼트 병렬) 분리 ─────────────────────────────────────────
+# 트랙을 DEMUCS_SEGMENT초 세그먼트(DEMUCS_OVERLAP 비율만큼 겹침)로 나눠 프로세스 풀에서 분리하고,
+# 겹친 구간은 선형 크로스페이드로 이어 붙인다. 이어 붙인 결과는 시간 순서대로 바로 내보내
+# 피크/onset 계산이 뒤쪽 세그먼트 분리와 동시에 진행된다.
+
+def plan_segments(n_frames: int, sr: int, segment_s: float, overlap: float) -> List[Tuple[int, int]]:
+    """[(start, end)] - 이웃 세그먼트는 정확히 overlap 길이만큼 겹친다"""
+    seg = max(1, int(round(segment_s * sr)))
+    ov = min(seg - 1, max(0, int(round(overlap * seg))))
+    out, start = [], 0
+    while True:
+        end = min(start + seg, n_frames)
+        out.append((start, end))
+        if end >= n_frames:
+            return out
+        start += seg - ov
+
+
+class CrossfadeStitcher:
+    """세그먼트를 순서대로 push하면 확정된 구간 (..., n)을 돌려준다. 마지막에 flush()"""
+
+    def __init__(self, overlap: int):
+        self.overlap = overlap
+        self._tail: Optional[np.ndarray] = None
+
+    def push(self, seg: np.ndarray) -> np.ndarray:
+        if self._tail is not None:
+            k = self._tail.shape[-1]
+            w = np.linspace(0.0, 1.0, k + 2, dtype=np.float32)[1:-1]
+            head = self._tail * (1.0 - w) + seg[..., :k] * w
+            seg = np.concatenate([head, seg[..., k:]], axis=-1)
+        cut = max(0, seg.shape[-1] - self.overlap)
+        self._tail = seg[..., cut:]
+        return seg[..., :cut]
+
+    def flush(self) -> np.ndarray:
+        tail, self._tail = self._tail, None
+        return tail
+
+
+def _init_segment_worker(threads: int) -> None:
+    settings.DEMUCS_THREADS = threads
+    get_engine()  # 프로세스당 모델 한 번 로드
+
+
+# 세그먼트 풀은 워커 프로세스당 하나를 만들어 잡 사이에 재사용한다 (자식마다 모델 로드는 한 번).
+# WORKER_MODE="simple"이면 워커가 살아 있는 동안, "fork"면 work horse(잡) 동안 유지된다.
+_segment_pool: Optional[ProcessPoolExecutor] = None
+_segment_pool_key: Optional[tuple] = None
+_segment_pool_lock = threading.Lock()
+
+
+def _engine_importable() -> bool:
+    # 자식 initializer의 ImportError는 부모에선 BrokenProcessPool로만 보이므로 풀을 띄우기 전에 확인
+    return all(importlib.util.find_spec(m) is not None for m in ("torch", "demucs"))
+
+
+def _get_segment_pool(workers: int) -> ProcessPoolExecutor:
+    """workers/모델/디바이스가 바뀌면 다시 만든다. torch/demucs가 없으면 ImportError"""
+    global _segment_pool, _segment_pool_key
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    key = (workers, threads, _pick_model(), _pick_device())
+    with _segment_pool_lock:
+        if _segment_pool is None or _segment_pool_key != key:
+            if not _engine_importable():
+                raise ImportError("torch/demucs not installed")
+            if _segment_pool is not None:
+                _segment_pool.shutdown(wait=True)
+            logger.info(f"[demucs] starting segment pool workers={workers} threads={threads}")
+            _segment_pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_segment_worker, initargs=(threads,))
+            _segment_pool_key = key
+        return _segment_pool
+
+
+def shutdown_segment_pool() -> None:
+    global _segment_pool, _segment_pool_key
+    with _segment_pool_lock:
+        pool, _segment_pool, _segment_pool_key = _segment_pool, None, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _separate_segment(buf: AudioBuffer, start: int, end: int, mean: float, std: float) -> np.ndarray:
+    data = np.asarray(buf.array()[start:end], dtype=np.float32)
+    # 세그먼트 안에서 다시 쪼개지 않는다 (세그먼트 = 모델 입력 단위)
+    return get_engine().separate_array(data, mean, std, split=False)
+
+
+def _segment_results(buf: AudioBuffer, segments, mean: float, std: float, workers: int) -> Iterator[np.ndarray]:
+    """
+    세그먼트 분리 결과를 (완료 순서와 무관하게) 시간 순서대로.
+    workers: 풀 크기 (세그먼트가 하나뿐이거나 workers <= 1이면 이 프로세스의 상주 엔진으로 순서대로)
+    """
+    if workers <= 1 or len(segments) <= 1:
+        for start, end in segments:
+            yield _separate_segment(buf, start, end, mean, std)
+        return
+    ex = _get_segment_pool(workers)
+    futs = {ex.submit(_separate_segment, buf, s, e, mean, std): i for i, (s, e) in enumerate(segments)}
+    try:
+        done, next_i = {}, 0
+        for fut in as_completed(futs):
+            done[futs[fut]] = fut.result()
+            while next_i in done:
+                yield done.pop(next_i)
+                next_i += 1
+    except BrokenProcessPool:
+        shutdown_segment_pool()  # 자식이 죽은 풀은 다음 잡에서 새로 만든다
+        raise
+    finally:
+        for fut in futs:
+            fut.cancel()  # 중간에 실패/중단되면 남은 세그먼트는 버린다 (풀은 유지)
+
+
+def iter_separated_chunks(buf: AudioBuffer, workers: Optional[int] = None) -> Iterator[Tuple[int, np.ndarray]]:
+    """
+    buf: MODEL_SR로 디코딩된 입력 (AudioBufferCache.get(..., sr=MODEL_SR, mono=False))
+    yield (시작 frame, (len(STEMS), MODEL_CHANNELS, n) float32) - 시간 순서, 빈틈 없이 이어짐
+    """
+    if buf.frames == 0:
+        return
+    segments = plan_segments(buf.frames, buf.sr, settings.DEMUCS_SEGMENT, settings.DEMUCS_OVERLAP)
+    overlap = segments[0][1] - segments[1][0] if len(segments) > 1 else 0
+    ref = buf.array()
+    ref = ref.mean(axis=1) if ref.ndim > 1 else ref
+    mean, std = float(ref.mean()), float(ref.std())
+
+    n = workers or settings.DEMUCS_SEGMENT_WORKERS or (os.cpu_count() or 1)
+    stitcher, pos = CrossfadeStitcher(overlap), 0
+    for seg in _segment_results(buf, segments, mean, std, max(1, n)):
+        out = stitcher.push(seg)
+        if out.shape[-1]:
+            yield pos, out
+            pos += out.shape[-1]
+    tail = stitcher.flush()
+    if tail is not None and tail.shape[-1]:
+        yield pos, tail
+
+
+def separate_stems_chunked(
+    wav_path: str,
+    audio: AudioBufferCache,
+    on_chunk: Optional[Callable[[int, Dict[str, np.ndarray]], None]] = None,
+    workers: Optional[int] = None,
+) -> Dict[str, str]:
+    """
+    세그먼트 병렬 분리. stem WAV는 청크가 나오는 대로 이어 쓰고,
+    on_chunk(start_frame, {stem: (n, ch) float32})로 후속 처리(피크/onset)에 바로 넘긴다.
+    파일 배치는 separate_stems와 같다.
+    DEMUCS_ENGINE="cli"이거나 ("auto"에서) torch/demucs가 없으면 separate_stems로 폴백한다.
+    이때 on_chunk는 한 번도 불리지 않는다 (호출자가 stem 파일에서 계산).
+    """
+    mode = settings.DEMUCS_ENGINE
+    if mode == "cli":
+        return separate_stems(wav_path)
     out_dir = os.path.splitext(wav_path)[0] + "_stems"
-    os.makedirs(out_dir, exist_ok=True)
+    paths = _stem_paths(wav_path, out_dir, _pick_model())
+    buf = audio.get(wav_path, sr=MODEL_SR, mono=False)
+
+    # stem 파일은 첫 청크가 나온 뒤에 연다: 엔진 없이 폴백할 때 빈 <base>_<stem>.wav가 남으면
+    # _separate_cli가 접미사로 찾다가 그 빈 파일을 결과로 집는다
+    writers: Dict[str, sf.SoundFile] = {}
+
+    def open_writers() -> None:
+        for name, path in paths.items():
+            writers[name] = sf.SoundFile(path, "w", MODEL_SR, MODEL_CHANNELS, subtype="PCM_16")
+
+    try:
+        for start, chunk in iter_separated_chunks(buf, workers):
+            if not writers:
+                open_writers()
+            stems = {name: chunk[i].T for i, name in enumerate(STEMS)}
+            for name, data in stems.items():
+                writers[name].write(data.clip(-1, 1))
+            if on_chunk is not None:
+                on_chunk(start, stems)
+        if not writers:
+            open_writers()  # 빈 입력: 0 프레임 stem
+    except ImportError as e:
+        if mode == "inprocess" or writers:
+            raise
+        logger.warning(f"[demucs] in-process engine unavailable ({e}), falling back to separate_stems")
+    else:
+        return paths
+    finally:
+        for w in writers.values():
+            w.close()
+    return separate_stems(wav_path)
+
 
+# ── CLI (기존 방식, fallback) ───────────────────────────────────────
+
+def _separate_cli(wav_path: str, out_dir: str) -> dict:
     device = _pick_device()          # "cuda" | "mps" | "cpu"
     model  = _pick_model()           # "mdx_q" | "htdemucs_ft" | ...
 
     # 속도 최적화 옵션
-    segment = str(getattr(settings, "DEMUCS_SEGMENT", 6))     # seconds
-    overlap = str(getattr(settings, "DEMUCS_OVERLAP", 0.10))  # 0~0.25
-    shifts  = str(getattr(settings, "DEMUCS_SHIFTS", 1))      # >=1
-    jobs    = str(getattr(settings, "DEMUCS_JOBS", 2))        # 병렬 작업 수
+    segment = str(settings.DEMUCS_SEGMENT)   # seconds
+    overlap = str(settings.DEMUCS_OVERLAP)   # 0~0.25
+    shifts  = str(settings.DEMUCS_SHIFTS)    # >=1
+    jobs    = str(settings.DEMUCS_JOBS)      # 병렬 작업 수
 
     # 예: demucs -n mdx_q -d cuda --segment 6 --overlap 0.1 --shifts 1 -j 2 -o out_dir wav_path
     cmd = [
@@ -54,4 +352,23 @@ def separate_stems(wav_path: str) -> dict:
         cands = [f for f in os.listdir(model_dir) if f.endswith(f"{s}.wav")]
         if cands:
             stem_files[s] = os.path.join(model_dir, cands[0])
-    return stem_files
\ No newline at end of file
+    return stem_files
+
+
+def separate_stems(wav_path: str) -> dict:
+    out_dir = os.path.splitext(wav_path)[0] + "_stems"
+    os.makedirs(out_dir, exist_ok=True)
+
+    mode = settings.DEMUCS_ENGINE
+    if mode != "cli":
+        try:
+            return get_engine().separate(wav_path, out_dir)
+        except ImportError as e:
+            if mode == "inprocess":
+                raise
+            logger.warning(f"[demucs] in-process engine unavailable ({e}), falling back to CLI")
+        except Exception:
+            if mode == "inprocess":
+                raise
+            logger.exception("[demucs] in-process separation failed, falling back to CLI")
+    return _separate_cli(wav_path, out_dir)
@@ -1,27 +1,194 @@
-import numpy as np, librosa
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, Optional, Tuple, Union
+
+import numpy as np, librosa, soxr
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
+from app.core.config import settings
 from app.db.models.stem_event import StemEvent
+from app.services.audio.buffer import AudioBuffer
+from app.services.audio.grid import COUNT_DTYPE, snap_events
+from app.services.audio.packed import pack_events
 
+# (onset 시각[s], onset 강도)
+Onsets = Tuple[np.ndarray, np.ndarray]
+# 파일 경로 또는 이미 (sr, mono)로 디코딩된 AudioBuffer
+StemSource = Union[str, AudioBuffer]
 
-def _extract_onsets(wav_path: str, sr: int):
-    y, _ = librosa.load(wav_path, sr=sr, mono=True)
-    onset_env = librosa.onset.onset_strength(y=y, sr=sr, aggregate=np.median)
+
+def _load_stem(src: StemSource, sr: int) -> np.ndarray:
+    if isinstance(src, AudioBuffer) and src.sr == sr and src.channels == 1:
+        return src.array()
+    path = src.path if isinstance(src, AudioBuffer) else src
+    y, _ = librosa.load(path, sr=sr, mono=True)
+    return y
+
+
+def _pick_onsets(onset_env: np.ndarray, sr: int) -> Onsets:
     peaks = librosa.onset.onset_detect(onset_envelope=onset_env, sr=sr)
     times = librosa.frames_to_time(peaks, sr=sr)
     strength = onset_env[peaks] if len(peaks) else np.array([])
     return times, strength
 
 
-def extract_events_and_map(db: Session, analysis, beat_counts, stems_paths: dict, stem_rows: dict, sr: int):
-    # beat_counts: list[(idx, ms, count, measure)] from map_to_8count
-    beat_times = np.array([ms for _,ms,_,_ in beat_counts]) / 1000.0
-    for name, path in stems_paths.items():
-        times, strength = _extract_onsets(path, sr)
+def _extract_onsets(src: StemSource, sr: int) -> Onsets:
+    y = _load_stem(src, sr)
+    onset_env = librosa.onset.onset_strength(y=y, sr=sr, aggregate=np.median)
+    return _pick_onsets(onset_env, sr)
+
+
+class OnsetAccumulator:
+    """
+    분리 중인 stem을 청크 단위로 받아 onset envelope용 mel 파워를 미리 계산해 둔다.
+    (STFT/mel이 onset 추출 비용의 대부분 - 분리가 끝나기 전에 앞부분부터 처리)
+    finish()는 dB 변환 + onset_strength(S=...) + peak picking만 한다.
+    _extract_onsets와 같은 설정: n_fft=2048, hop=512, center=True(0 패딩), median 집계.
+    src_sr != sr이면 soxr 스트림으로 리샘플.
+    """
+
+    N_FFT = 2048
+    HOP = 512
+
+    def __init__(self, src_sr: int, sr: int):
+        self.sr = sr
+        self.n_samples = 0
+        self._rs = soxr.ResampleStream(src_sr, sr, 1, dtype="float32", quality="HQ") if src_sr != sr else None
+        self._mel = librosa.filters.mel(sr=sr, n_fft=self.N_FFT, fmax=0.5 * sr)
+        self._buf = np.zeros(self.N_FFT // 2, dtype=np.float32)  # center=True 앞쪽 패딩
+        self._power = []
+
+    def push(self, data: np.ndarray) -> None:
+        y = np.asarray(data, dtype=np.float32)
+        y = y.mean(axis=1) if y.ndim > 1 else y
+        if self._rs is not None:
+            y = self._rs.resample_chunk(y)
+        self.n_samples += len(y)
+        self._feed(y)
+
+    def _feed(self, y: np.ndarray) -> None:
+        buf = np.concatenate([self._buf, y])
+        if len(buf) >= self.N_FFT:
+            n_frames = 1 + (len(buf) - self.N_FFT) // self.HOP
+            seg = buf[: (n_frames - 1) * self.HOP + self.N_FFT]
+            spec = np.abs(librosa.stft(seg, n_fft=self.N_FFT, hop_length=self.HOP, center=False)) ** 2
+            self._power.append(self._mel @ spec)
+            buf = buf[n_frames * self.HOP :]
+        self._buf = buf
+
+    def finish(self) -> Onsets:
+        if self._rs is not None:
+            tail = self._rs.resample_chunk(np.zeros(0, dtype=np.float32), last=True)
+            self.n_samples += len(tail)
+            self._feed(tail)
+        self._feed(np.zeros(self.N_FFT // 2, dtype=np.float32))  # 뒤쪽 패딩
+        n_frames = 1 + self.n_samples // self.HOP
+        power = np.concatenate(self._power, axis=1)[:, :n_frames] if self._power else np.zeros((self._mel.shape[0], 0))
+        onset_env = librosa.onset.onset_strength(S=librosa.power_to_db(power), sr=self.sr, aggregate=np.median)
+        return _pick_onsets(onset_env, self.sr)
+
+
+def extract_onsets_batched(stems_paths: Dict[str, StemSource], sr: int) -> Dict[str, Onsets]:
+    """
+    모든 stem을 (n_stems, n_samples) 배열로 쌓아 onset envelope를 한 번에 계산한다.
+    - 디코딩/리샘플은 스레드로 병렬 처리 (soundfile/soxr는 GIL 해제)
+    - 길이가 다른 stem은 0으로 패딩하고, envelope는 각자 프레임 수로 잘라 쓴다
+    """
+    names = list(stems_paths)
+    if not names:
+        return {}
+    with ThreadPoolExecutor(max_workers=len(names)) as ex:
+        ys = list(ex.map(lambda n: _load_stem(stems_paths[n], sr), names))
+
+    length = max(len(y) for y in ys)
+    stacked = np.zeros((len(ys), length), dtype=np.float32)
+    for i, y in enumerate(ys):
+        stacked[i, : len(y)] = y
+
+    # STFT/mel만 다채널로 한 번에. dB 변환(top_db 클리핑)은 stem별로 해야 serial과 같은 값이 나온다
+    power = librosa.feature.melspectrogram(y=stacked, sr=sr, fmax=0.5 * sr)  # (n_stems, mels, frames)
+    hop = 512
+    out: Dict[str, Onsets] = {}
+    for i, name in enumerate(names):
+        n_frames = 1 + len(ys[i]) // hop
+        env = librosa.onset.onset_strength(S=librosa.power_to_db(power[i, :, :n_frames]), sr=sr, aggregate=np.median)
+        out[name] = _pick_onsets(env, sr)
+    return out
+
+
+def iter_stem_onsets(
+    stems_paths: Dict[str, StemSource],
+    sr: int,
+    mode: Optional[str] = None,
+    workers: Optional[int] = None,
+) -> Iterator[Tuple[str, np.ndarray, np.ndarray]]:
+    """
+    stem별 onset을 (name, times, strength)로 내보낸다.
+    - pool  : stem마다 별도 프로세스에서 디코딩+onset, 끝나는 순서대로 yield
+    - batch : 다채널로 쌓아 한 번에 계산 후 yield
+    - serial: 기존과 동일하게 하나씩
+    """
+    mode = mode or settings.ONSET_MODE
+    names = list(stems_paths)
+    if not names:
+        return
+
+    if mode == "pool":
+        n = workers or settings.ONSET_WORKERS or (os.cpu_count() or 1)
+        n = max(1, min(n, len(names)))
+        if n > 1:
+            with ProcessPoolExecutor(max_workers=n) as ex:
+                futs = {ex.submit(_extract_onsets, stems_paths[name], sr): name for name in names}
+                for fut in as_completed(futs):
+                    times, strength = fut.result()
+                    yield futs[fut], times, strength
+            return
+        mode = "serial"
+
+    if mode == "batch":
+        for name, (times, strength) in extract_onsets_batched(stems_paths, sr).items():
+            yield name, times, strength
+        return
+
+    for name in names:
+        times, strength = _extract_onsets(stems_paths[name], sr)
+        yield name, times, strength
+
+
+def extract_events_and_map(
+    db: Session, analysis, beat_counts, stems_paths: dict, stem_rows: dict, sr: int,
+    onsets: Optional[Dict[str, Onsets]] = None,
+):
+    # beat_counts: COUNT_DTYPE 배열(map_to_8count_array) 또는 list[(idx, ms, count, measure)]
+    # onsets: 이미 계산된 stem별 onset (OnsetAccumulator). 주면 stems_paths는 다시 읽지 않음
+    # 커밋하지 않는다: 호출자가 완료 상태와 함께 한 트랜잭션으로 커밋
+    counts = _as_counts_array(beat_counts)
+    if len(counts) == 0:
+        return
+    # Stem.events_packed 한 컬럼, 필요하면 stem_event 행도 (전 stem을 모아 executemany 한 번)
+    found = ((n, t, s) for n, (t, s) in onsets.items()) if onsets is not None else iter_stem_onsets(stems_paths, sr)
+    rows = []
+    for name, times, strength in found:
         if len(times) == 0:
             continue
-        for t, s in zip(times, strength):
-            # snap to nearest beat
-            idx = int(np.argmin(np.abs(beat_times - t)))
-            _, ms, count, measure = beat_counts[idx]
-            db.add(StemEvent(stem_id=stem_rows[name].id, ts_ms=ms, strength=float(s), count_in_8=count, measure_index=measure))
-        db.commit()
\ No newline at end of file
+        snapped = snap_events(counts, times)  # nearest beat (searchsorted)
+        stem = stem_rows[name]
+        stem.events_packed = pack_events(snapped["ms"], strength, snapped["count"], snapped["measure"])
+        if settings.PERSIST_EVENT_ROWS:
+            rows.extend(
+                {"stem_id": stem.id, "ts_ms": ms, "strength": s, "count_in_8": count, "measure_index": measure}
+                for ms, count, measure, s in zip(
+                    snapped["ms"].tolist(), snapped["count"].tolist(), snapped["measure"].tolist(), np.asarray(strength).tolist()
+                )
+            )
+    if rows:
+        db.execute(insert(StemEvent), rows)  # pymysql: multi-row INSERT로 묶어 보냄
+
+
+def _as_counts_array(beat_counts) -> np.ndarray:
+    if isinstance(beat_counts, np.ndarray) and beat_counts.dtype == COUNT_DTYPE:
+        return beat_counts
+    out = np.empty(len(beat_counts), dtype=COUNT_DTYPE)
+    for i, (_, ms, count, measure) in enumerate(beat_counts):
+        out[i] = (ms, count, measure)
+    return out
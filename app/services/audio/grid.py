@@ -0,0 +1,74 @@
+import numpy as np
+
+# 8카운트 맵핑 결과: beat(또는 snap된 이벤트) 하나당 한 행
+COUNT_DTYPE = np.dtype([("ms", "<i8"), ("count", "<i4"), ("measure", "<i4")])
+
+
+def beat_period(beat_times: np.ndarray, default: float = 0.5) -> float:
+    if len(beat_times) < 2:
+        return default
+    return float(np.median(np.diff(beat_times)))
+
+
+def map_to_8count_array(beat_times: np.ndarray, phase_shift: float) -> np.ndarray:
+    """
+    beat 시각 배열 -> COUNT_DTYPE 구조화 배열 (ms, count, measure).
+    행 순서가 곧 beat idx.
+    """
+    beat_times = np.asarray(beat_times, dtype=float)
+    out = np.empty(len(beat_times), dtype=COUNT_DTYPE)
+    if len(beat_times) == 0:
+        return out
+    period = beat_period(beat_times)
+    base = float(beat_times[0] + phase_shift)
+
+    if period > 0:
+        idx = np.round((beat_times - base) / period).astype(np.int64)
+    else:
+        idx = np.arange(len(beat_times), dtype=np.int64)
+    out["ms"] = (beat_times * 1000).astype(np.int64)
+    out["count"] = idx % 8 + 1
+    out["measure"] = idx // 8
+    return out
+
+
+def snap_to_beats(beat_times: np.ndarray, times: np.ndarray) -> np.ndarray:
+    """
+    각 시각에 가장 가까운 beat의 인덱스 (searchsorted, O(n log m)).
+    beat_times는 오름차순이어야 하며, 거리가 같으면 앞쪽 beat를 고른다.
+    """
+    beat_times = np.asarray(beat_times, dtype=float)
+    times = np.asarray(times, dtype=float)
+    if len(beat_times) == 0:
+        raise ValueError("beat_times is empty")
+    last = len(beat_times) - 1
+    right = np.clip(np.searchsorted(beat_times, times, side="left"), 0, last)
+    left = np.clip(right - 1, 0, last)
+    take_left = np.abs(times - beat_times[left]) <= np.abs(beat_times[right] - times)
+    return np.where(take_left, left, right)
+
+
+def snap_events(counts: np.ndarray, times: np.ndarray) -> np.ndarray:
+    """onset 시각들을 가장 가까운 beat의 (ms, count, measure)로 맵핑 (COUNT_DTYPE)"""
+    if len(times) == 0 or len(counts) == 0:
+        return np.empty(0, dtype=COUNT_DTYPE)
+    return counts[snap_to_beats(counts["ms"] / 1000.0, times)]
+
+
+def beat_grid_from_events(ms: np.ndarray, count: np.ndarray, measure: np.ndarray) -> np.ndarray:
+    """이벤트의 (ms, count, measure) 조합에서 중복을 제거해 ms 순으로 정렬한 그리드 (COUNT_DTYPE)"""
+    grid = np.empty(len(ms), dtype=COUNT_DTYPE)
+    grid["ms"] = ms
+    grid["count"] = count
+    grid["measure"] = measure
+    return np.unique(grid)  # 필드 순서(ms -> count -> measure)로 정렬됨
+
+
+def counts_to_tuples(counts: np.ndarray) -> list:
+    """COUNT_DTYPE 배열 -> 기존 list[(idx, ms, count, measure)] 형식"""
+    return list(zip(
+        range(len(counts)),
+        counts["ms"].tolist(),
+        counts["count"].tolist(),
+        counts["measure"].tolist(),
+    ))
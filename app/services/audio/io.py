@@ -1,3 +1,5 @@
+import hashlib
+import os
 from pathlib import Path
 from typing import Optional, Tuple
 
@@ -5,6 +7,13 @@ import soundfile as sf
 from app.core.config import settings
 
 
+def tracks_dir() -> str:
+    """canonical WAV 저장 위치 (STORAGE_DIR/tracks)"""
+    dest_dir = os.path.join(settings.STORAGE_DIR, "tracks")
+    os.makedirs(dest_dir, exist_ok=True)
+    return dest_dir
+
+
 def ensure_wav(
     input_path: str,
     target_sr: Optional[int] = None,
@@ -13,7 +22,7 @@ def ensure_wav(
 ) -> Tuple[str, int, int]:
     """
     매우 빠른 .wav 보장 함수 (변환 없이 메타만 확인)
-    - 입력 파일이 .wav가 아니면 에러
+    - 입력 파일이 .wav/.flac(STORAGE_BACKEND=flac|object)가 아니면 에러
     - 메타데이터만 읽어 sample_rate, duration_ms 계산
     - (옵션) target_sr/mono 요구 조건 검증:
         * strict=True 이면 불일치 시 예외 발생
@@ -25,8 +34,8 @@ def ensure_wav(
     in_path = Path(input_path)
     if not in_path.exists():
         raise FileNotFoundError(f"Input audio not found: {in_path}")
-    if in_path.suffix.lower() != ".wav":
-        raise ValueError(f"Expected .wav input, got: {in_path.suffix}")
+    if in_path.suffix.lower() not in (".wav", ".flac"):
+        raise ValueError(f"Expected .wav/.flac input, got: {in_path.suffix}")
 
     # 메타만 읽기 (빠름)
     info = sf.info(str(in_path))
@@ -52,4 +61,17 @@ def ensure_wav(
         # logger.warning(f"...")  # 로거 사용 중이면 주석 해제
         pass
 
-    return str(in_path), sr, duration_ms
\ No newline at end of file
+    return str(in_path), sr, duration_ms
+
+def hash_wav(input_path: str, block_frames: int = 1 << 16) -> str:
+    """
+    canonical WAV의 오디오 내용 해시 (sha256).
+    헤더/메타데이터가 아니라 int16 PCM 프레임 + (sr, channels)만 해싱하므로
+    같은 곡을 다시 변환해도 같은 값이 나온다.
+    """
+    h = hashlib.sha256()
+    with sf.SoundFile(input_path) as f:
+        h.update(f"{f.samplerate}:{f.channels}:".encode())
+        for block in f.blocks(blocksize=block_frames, dtype="int16", always_2d=True):
+            h.update(block.astype("<i2", copy=False).tobytes())
+    return h.hexdigest()
@@ -0,0 +1,94 @@
+import struct
+from typing import NamedTuple
+
+import numpy as np
+
+from app.services.audio.grid import COUNT_DTYPE
+
+# 비트 그리드 / stem 이벤트를 타입 지정 바이너리 배열로 묶어 한 컬럼(BLOB)에 저장
+#   header(12B): magic(4s) version(u8) reserved(u8) reserved(u16) n(u32)
+#   beats : ms <i4[n] | measure <i4[n] | count <i1[n]
+#   events: ms <i4[n] | measure <i4[n] | strength <f2[n] | count <i1[n]
+# int32 열을 앞에 둬서 헤더 뒤 정렬이 맞고, np.frombuffer로 복사 없이 읽는다.
+# count/measure가 없는(NULL) 이벤트는 -1로 저장한다.
+PACKED_FORMAT_VERSION = 1
+BEATS_MAGIC = b"BMBG"
+EVENTS_MAGIC = b"BMEV"
+_HEADER = struct.Struct("<4sBBHI")
+
+
+class PackedBeats(NamedTuple):
+    ms: np.ndarray
+    count: np.ndarray
+    measure: np.ndarray
+
+
+class PackedEvents(NamedTuple):
+    ms: np.ndarray
+    strength: np.ndarray
+    count: np.ndarray
+    measure: np.ndarray
+
+
+def _header(magic: bytes, n: int) -> bytes:
+    return _HEADER.pack(magic, PACKED_FORMAT_VERSION, 0, 0, n)
+
+
+def _read_header(blob: bytes, magic: bytes) -> int:
+    got, version, _, _, n = _HEADER.unpack_from(blob, 0)
+    if got != magic:
+        raise ValueError(f"Unexpected packed magic: {got!r}")
+    if version != PACKED_FORMAT_VERSION:
+        raise ValueError(f"Unsupported packed format version: {version}")
+    return n
+
+
+def _cols(blob: bytes, n: int, dtypes) -> list:
+    out, offset = [], _HEADER.size
+    for dt in dtypes:
+        dt = np.dtype(dt)
+        out.append(np.frombuffer(blob, dtype=dt, count=n, offset=offset))
+        offset += dt.itemsize * n
+    return out
+
+
+def pack_beats(counts: np.ndarray) -> bytes:
+    """COUNT_DTYPE 배열(map_to_8count_array) -> bytes"""
+    n = len(counts)
+    return b"".join([
+        _header(BEATS_MAGIC, n),
+        np.asarray(counts["ms"], dtype="<i4").tobytes(),
+        np.asarray(counts["measure"], dtype="<i4").tobytes(),
+        np.asarray(counts["count"], dtype="<i1").tobytes(),
+    ])
+
+
+def unpack_beats(blob: bytes) -> PackedBeats:
+    n = _read_header(blob, BEATS_MAGIC)
+    ms, measure, count = _cols(blob, n, ("<i4", "<i4", "<i1"))
+    return PackedBeats(ms=ms, count=count, measure=measure)
+
+
+def pack_events(ms, strength, count, measure) -> bytes:
+    n = len(ms)
+    return b"".join([
+        _header(EVENTS_MAGIC, n),
+        np.asarray(ms, dtype="<i4").tobytes(),
+        np.asarray(measure, dtype="<i4").tobytes(),
+        np.asarray(strength, dtype="<f2").tobytes(),
+        np.asarray(count, dtype="<i1").tobytes(),
+    ])
+
+
+def unpack_events(blob: bytes) -> PackedEvents:
+    n = _read_header(blob, EVENTS_MAGIC)
+    ms, measure, strength, count = _cols(blob, n, ("<i4", "<i4", "<f2", "<i1"))
+    return PackedEvents(ms=ms, strength=strength, count=count, measure=measure)
+
+
+def unpack_counts(blob: bytes) -> np.ndarray:
+    """beats blob -> COUNT_DTYPE 배열 (map_to_8count_array 결과와 같은 형태)"""
+    b = unpack_beats(blob)
+    out = np.empty(len(b.ms), dtype=COUNT_DTYPE)
+    out["ms"], out["count"], out["measure"] = b.ms, b.count, b.measure
+    return out
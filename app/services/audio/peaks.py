@@ -1,17 +1,190 @@
+import os, struct
+from typing import List, Optional, Tuple
+
 import numpy as np, soundfile as sf
 from app.core.config import settings
 
 # Return small binary (int16) preview peaks for fast waveform rendering
 
-def compute_peak_preview(wav_path: str) -> bytes:
-    data, sr = sf.read(wav_path, dtype='float32', always_2d=False)
-    if data.ndim > 1:
-        data = data.mean(axis=1)
+# 줌 레벨별 min/max 피크 피라미드 (stem 파일 옆 "<stem>.peaks" 로 저장)
+#   header: magic, version, n_levels, reserved, sample_rate, base_samples_per_bin, level_factor
+#   levels: n_bins(u32) * n_levels
+#   data  : level 0..n 순서로 [min, max] int16 little-endian 쌍
+PYRAMID_MAGIC = b"BMPK"
+PYRAMID_VERSION = 1
+_HEADER = struct.Struct("<4sBBHIII")
+_LEVEL = struct.Struct("<I")
+
+
+def _mono(data: np.ndarray) -> np.ndarray:
+    return data.mean(axis=1) if data.ndim > 1 else data
+
+
+def _to_i16(x: np.ndarray) -> np.ndarray:
+    return (np.clip(x, -1.0, 1.0) * 32767.0).astype("<i2")
+
+
+def compute_peak_preview(wav_path: str, data: Optional[np.ndarray] = None) -> bytes:
+    if data is None:
+        data, _ = sf.read(wav_path, dtype='float32', always_2d=False)
+    data = _mono(data)
     n = settings.PEAKS_DOWNSAMPLE
     step = max(1, len(data)//n)
-    # compute peak (max abs) in each window
-    peaks = [float(np.max(np.abs(data[i:i+step]))) for i in range(0, len(data), step)]
-    peaks = np.array(peaks[:n])
+    # compute peak (max abs) in each window (마지막 부분 윈도우는 0 패딩 - abs max에 영향 없음)
+    n_win = min(n, -(-len(data) // step))
+    window = np.zeros(n_win * step, dtype=np.float32)
+    used = min(len(data), len(window))
+    window[:used] = data[:used]
+    peaks = np.abs(window).reshape(n_win, step).max(axis=1).astype(np.float64) if n_win else np.zeros(0)
     # scale to int16
     peaks_i16 = (peaks * 32767.0).astype('<i2')
-    return peaks_i16.tobytes()
\ No newline at end of file
+    return peaks_i16.tobytes()
+
+
+def _reduce_minmax(mins: np.ndarray, maxs: np.ndarray, size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """size개씩 묶어 min/max (끝은 마지막 값으로 패딩해 값이 바뀌지 않게)"""
+    n_bins = -(-len(mins) // size)
+    pad = n_bins * size - len(mins)
+    if pad:
+        mins = np.concatenate([mins, np.repeat(mins[-1:], pad)])
+        maxs = np.concatenate([maxs, np.repeat(maxs[-1:], pad)])
+    return mins.reshape(n_bins, size).min(axis=1), maxs.reshape(n_bins, size).max(axis=1)
+
+
+def build_peak_pyramid(y: np.ndarray, base_samples: int, n_levels: int, factor: int) -> List[np.ndarray]:
+    """mono 신호 -> 레벨별 (n_bins, 2) int16 [min, max] 배열. level 0이 가장 촘촘함"""
+    if len(y) == 0:
+        return [np.zeros((0, 2), dtype="<i2") for _ in range(n_levels)]
+    mins, maxs = _reduce_minmax(y, y, base_samples)
+    return _levels_from_base(mins, maxs, n_levels, factor)
+
+
+def _levels_from_base(mins: np.ndarray, maxs: np.ndarray, n_levels: int, factor: int) -> List[np.ndarray]:
+    levels = []
+    for lv in range(n_levels):
+        if lv:
+            mins, maxs = _reduce_minmax(mins, maxs, factor)
+        levels.append(np.stack([_to_i16(mins), _to_i16(maxs)], axis=1))
+    return levels
+
+
+def encode_pyramid(levels: List[np.ndarray], sr: int, base_samples: int, factor: int) -> bytes:
+    head = _HEADER.pack(PYRAMID_MAGIC, PYRAMID_VERSION, len(levels), 0, sr, base_samples, factor)
+    sizes = b"".join(_LEVEL.pack(len(lv)) for lv in levels)
+    return head + sizes + b"".join(np.ascontiguousarray(lv, dtype="<i2").tobytes() for lv in levels)
+
+
+def pyramid_path(stem_path: str) -> str:
+    return stem_path + ".peaks"
+
+
+def compute_stem_peaks(wav_path: str, data: Optional[np.ndarray] = None, sr: Optional[int] = None) -> Tuple[bytes, str]:
+    """
+    stem 파일을 한 번만 읽어 기존 미리보기(bytes)와 줌 피라미드(.peaks 파일)를 함께 만든다.
+    data/sr: 이미 디코딩된 원본 샘플레이트 신호가 있으면 파일을 다시 읽지 않는다.
+    Returns: (peak_preview bytes, pyramid 파일 경로)
+    """
+    if data is None:
+        data, sr = sf.read(wav_path, dtype="float32", always_2d=False)
+    y = _mono(data)
+    preview = compute_peak_preview(wav_path, data=y)
+
+    levels = build_peak_pyramid(y, settings.PEAKS_BASE_SAMPLES, settings.PEAKS_LEVELS, settings.PEAKS_LEVEL_FACTOR)
+    return preview, _write_pyramid(wav_path, levels, sr)
+
+
+def _write_pyramid(wav_path: str, levels: List[np.ndarray], sr: int) -> str:
+    out_path = pyramid_path(wav_path)
+    tmp_path = out_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(encode_pyramid(levels, int(sr), settings.PEAKS_BASE_SAMPLES, settings.PEAKS_LEVEL_FACTOR))
+    os.replace(tmp_path, out_path)
+    return out_path
+
+
+class PeakAccumulator:
+    """
+    분리 중인 stem을 청크 단위로 받아 compute_stem_peaks와 같은 미리보기/피라미드를 만든다.
+    total_frames: 최종 길이 (미리보기 윈도우 크기가 전체 길이에 의존)
+    """
+
+    def __init__(self, total_frames: int, sr: int):
+        self.sr = sr
+        self.frames = 0
+        self._base = settings.PEAKS_BASE_SAMPLES
+        self._step = max(1, total_frames // settings.PEAKS_DOWNSAMPLE)
+        self._base_carry = np.zeros(0, dtype=np.float32)
+        self._step_carry = np.zeros(0, dtype=np.float32)
+        self._mins: List[np.ndarray] = []
+        self._maxs: List[np.ndarray] = []
+        self._absmax: List[np.ndarray] = []
+
+    def push(self, data: np.ndarray) -> None:
+        y = _mono(np.asarray(data, dtype=np.float32))
+        self.frames += len(y)
+
+        c = np.concatenate([self._base_carry, y])
+        k = len(c) // self._base * self._base
+        if k:
+            bins = c[:k].reshape(-1, self._base)
+            self._mins.append(bins.min(axis=1))
+            self._maxs.append(bins.max(axis=1))
+        self._base_carry = c[k:]
+
+        c = np.concatenate([self._step_carry, y])
+        k = len(c) // self._step * self._step
+        if k:
+            self._absmax.append(np.abs(c[:k]).reshape(-1, self._step).max(axis=1))
+        self._step_carry = c[k:]
+
+    def finish(self, wav_path: str) -> Tuple[bytes, str]:
+        """Returns: (peak_preview bytes, pyramid 파일 경로) - compute_stem_peaks와 같은 형식"""
+        if len(self._base_carry):
+            self._mins.append(self._base_carry.min(keepdims=True))
+            self._maxs.append(self._base_carry.max(keepdims=True))
+        if len(self._step_carry):
+            self._absmax.append(np.abs(self._step_carry).max(keepdims=True))
+        self._base_carry = self._step_carry = np.zeros(0, dtype=np.float32)
+
+        n_levels = settings.PEAKS_LEVELS
+        if self.frames == 0:
+            levels = [np.zeros((0, 2), dtype="<i2") for _ in range(n_levels)]
+            return b"", _write_pyramid(wav_path, levels, self.sr)
+        levels = _levels_from_base(np.concatenate(self._mins), np.concatenate(self._maxs), n_levels, settings.PEAKS_LEVEL_FACTOR)
+        peaks = np.concatenate(self._absmax)[: settings.PEAKS_DOWNSAMPLE].astype(np.float64)
+        preview = (peaks * 32767.0).astype("<i2").tobytes()
+        return preview, _write_pyramid(wav_path, levels, self.sr)
+
+
+class PeakPyramid:
+    """.peaks 파일 헤더만 읽고, 요청 구간은 seek로 필요한 바이트만 읽는다"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            magic, version, n_levels, _, sr, base, factor = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != PYRAMID_MAGIC or version != PYRAMID_VERSION:
+                raise ValueError(f"Unsupported peaks file: {path}")
+            sizes = [_LEVEL.unpack(f.read(_LEVEL.size))[0] for _ in range(n_levels)]
+        self.sample_rate = sr
+        self.base_samples = base
+        self.factor = factor
+        self.level_bins = sizes
+        self._data_offset = _HEADER.size + _LEVEL.size * n_levels
+
+    def samples_per_bin(self, level: int) -> int:
+        return self.base_samples * self.factor ** level
+
+    def read(self, level: int, from_ms: int = 0, to_ms: Optional[int] = None) -> Tuple[bytes, int]:
+        """Returns: (raw '<i2' [min,max] 쌍 bytes, 시작 bin 인덱스)"""
+        if not 0 <= level < len(self.level_bins):
+            raise IndexError(f"level must be in [0, {len(self.level_bins) - 1}]")
+        n_bins = self.level_bins[level]
+        spb = self.samples_per_bin(level)
+        start = min(n_bins, max(0, from_ms) * self.sample_rate // (1000 * spb))
+        stop = n_bins if to_ms is None else min(n_bins, -(-max(0, to_ms) * self.sample_rate // (1000 * spb)))
+        stop = max(start, stop)
+        offset = self._data_offset + 4 * (sum(self.level_bins[:level]) + start)
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            return f.read(4 * (stop - start)), start
@@ -0,0 +1,114 @@
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.audio.grid import beat_period
+
+# onset이 그리드에 "맞았다"고 보는 허용 오차 (초)
+PHASE_TOL = 0.07
+
+
+def _circular_phases(beat_times: np.ndarray, onset_times: np.ndarray) -> Tuple[np.ndarray, float]:
+    """onset을 beat 주기로 접은 위상 [0, period)"""
+    period = beat_period(beat_times, default=0.0)
+    if period <= 0:
+        return np.empty(0), period
+    phases = np.mod(np.asarray(onset_times, dtype=float) - float(beat_times[0]), period)
+    return np.where(phases >= period, phases - period, phases), period
+
+
+def phase_shifts_batch(
+    tracks: Sequence[Tuple[np.ndarray, np.ndarray]],
+    resolution: Optional[float] = None,
+    tol: float = PHASE_TOL,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    여러 트랙의 (beat_times, onset_times)를 한 번에 채점해 (shifts, scores)를 돌려준다.
+
+    원형 히스토그램의 연속 버전: onset 위상 φ마다 "맞는" shift 구간 (φ-tol, φ+tol)을
+    원 위에 올려두고, 구간 경계만 정렬/누적합해서 겹침 수가 최대인 구간을 찾는다.
+    - 점수 함수가 경계에서만 바뀌므로 스캔 없이 정확한 최댓값을 얻는다
+    - 비용은 O(N log N) (N = onset 수), resolution과 무관
+    - 최대 구간이 여러 개면 가장 넓은 구간의 중앙을 고른다
+    - shift는 기존 41-step 스캔과 같은 범위 [-period, 0)로 돌려준다
+    - resolution(초)은 결과 반올림 단위 (기본 settings.PHASE_RESOLUTION_MS)
+    """
+    if resolution is None:
+        resolution = settings.PHASE_RESOLUTION_MS / 1000.0
+    n_tracks = len(tracks)
+    shifts = np.zeros(n_tracks)
+    scores = np.zeros(n_tracks)
+
+    pos_parts, delta_parts, gid_parts = [], [], []
+    periods = np.zeros(n_tracks)
+    init = np.zeros(n_tracks)
+    n_onsets = np.zeros(n_tracks)
+    for g, (beat_times, onset_times) in enumerate(tracks):
+        if len(beat_times) < 2 or len(onset_times) == 0:
+            continue
+        phases, period = _circular_phases(beat_times, onset_times)
+        if period <= 0:
+            continue
+        width = 2.0 * tol
+        if width >= period:  # 모든 shift가 만점 -> 구분 불가
+            scores[g] = 1.0
+            continue
+        start = np.mod(phases - tol, period)
+        start = np.where(start >= period, start - period, start)
+        end = start + width
+        wrapped = end > period
+        # 구간 (start, end): 시작 +1 / 끝 -1, 0을 넘어 감긴 구간은 처음부터 열려 있음
+        pos_parts += [start, np.where(wrapped, end - period, end)]
+        delta_parts += [np.ones(len(start)), -np.ones(len(start))]
+        gid_parts += [np.full(2 * len(start), g)]
+        periods[g] = period
+        init[g] = float(np.count_nonzero(wrapped))
+        n_onsets[g] = len(start)
+
+    if not pos_parts:
+        return shifts, scores
+
+    pos = np.concatenate(pos_parts)
+    delta = np.concatenate(delta_parts)
+    gid = np.concatenate(gid_parts)
+    order = np.lexsort((pos, gid))
+    pos, delta, gid = pos[order], delta[order], gid[order]
+
+    # 그룹(트랙)별 누적합
+    first = np.flatnonzero(np.r_[True, gid[1:] != gid[:-1]])
+    csum = np.cumsum(delta)
+    prefix = np.r_[0.0, csum]
+    group_first = np.repeat(first, np.diff(np.r_[first, len(gid)]))
+    count = init[gid] + csum - prefix[group_first]
+
+    # 다음 경계 (그룹의 마지막은 첫 경계 + period 로 감김)
+    nxt = np.r_[pos[1:], 0.0]
+    last = np.r_[first[1:] - 1, len(gid) - 1]
+    nxt[last] = pos[first] + periods[gid[first]]
+    length = nxt - pos
+    count = np.where(length > 1e-12, count, -1.0)
+
+    # 그룹별 (count, length) 최대
+    best = np.lexsort((length, count, gid))
+    best = best[np.r_[np.flatnonzero(gid[best][1:] != gid[best][:-1]), len(best) - 1]]
+
+    g = gid[best]
+    period = periods[g]
+    center = np.mod((pos[best] + nxt[best]) / 2.0, period)
+    if resolution > 0:
+        center = np.round(center / resolution) * resolution
+    shifts[g] = np.mod(center, period) - period
+    scores[g] = count[best] / n_onsets[g]
+    return shifts, scores
+
+
+def phase_shift(
+    beat_times: np.ndarray,
+    onset_times: np.ndarray,
+    resolution: Optional[float] = None,
+    tol: float = PHASE_TOL,
+) -> Tuple[float, float]:
+    """단일 트랙 (shift[s], score)"""
+    shifts, scores = phase_shifts_batch([(beat_times, onset_times)], resolution=resolution, tol=tol)
+    return float(shifts[0]), float(scores[0])
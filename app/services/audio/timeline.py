@@ -1,37 +1,303 @@
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import msgpack
+import numpy as np
+from sqlalchemy import and_, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.db.models.track import Track
 from app.db.models.analysis import Analysis
 from app.db.models.stem import Stem
 from app.db.models.stem_event import StemEvent
-from app.schemas.timeline import TimelineOut, BeatItem, StemLane, EventItem
+from app.schemas.timeline import TimelineOut
+from app.services.audio.grid import beat_grid_from_events
+from app.services.audio.packed import unpack_beats, unpack_events
 
 
-def build_timeline(db: Session, track_id: int):
-    t = db.get(Track, track_id)
-    if not t or t.status != "done":
-        return None
-    a = db.query(Analysis).filter_by(track_id=track_id).order_by(Analysis.id.desc()).first()
+# ── 쿼리 (동기/비동기 세션 공용) ─────────────────────────────────────
+
+def latest_analysis_stmt(track_id: int):
+    """완료된 트랙의 최신 분석 (id, bpm). 트랙 상태 확인까지 한 번에"""
+    return (
+        select(Analysis.id, Analysis.bpm)
+        .join(Track, Track.id == Analysis.track_id)
+        .where(Track.id == track_id, Track.status == "done")
+        .order_by(Analysis.id.desc())
+        .limit(1)
+    )
+
+
+def _latest_stems(track_id: int):
+    return (
+        select(func.max(Stem.id))
+        .where(Stem.track_id == track_id)
+        .group_by(Stem.stem_type)
+    )
+
+
+def beat_grid_stmt(analysis_id: int):
+    return select(Analysis.beat_grid).where(Analysis.id == analysis_id)
+
+
+def packed_lanes_stmt(track_id: int, stems: Optional[Sequence[str]] = None):
+    """stem_type별 최신 stem의 (id, stem_type, events_packed). stems를 주면 그 타입만"""
+    stmt = (
+        select(Stem.id, Stem.stem_type, Stem.events_packed)
+        .where(Stem.id.in_(_latest_stems(track_id)))
+        .order_by(Stem.id)
+    )
+    if stems is not None:
+        stmt = stmt.where(Stem.stem_type.in_(stems))
+    return stmt
+
+
+def lane_rows_stmt(
+    track_id: int,
+    stem_ids: Optional[List[int]] = None,
+    from_ms: Optional[int] = None,
+    to_ms: Optional[int] = None,
+):
+    """
+    stem_type별 최신 stem의 이벤트를 한 번의 조인으로 (N+1 제거).
+    이벤트가 없는 stem도 빈 lane으로 나오도록 outer join.
+    stem_ids를 주면 그 stem들만 (events_packed가 없는 이전 분석 결과용).
+    [from_ms, to_ms) 구간 조건은 ON 절에 넣어 ix_stem_event_stem_ts 범위 스캔으로 처리.
+    """
+    target = _latest_stems(track_id) if stem_ids is None else stem_ids
+    on = [StemEvent.stem_id == Stem.id]
+    if from_ms is not None:
+        on.append(StemEvent.ts_ms >= from_ms)
+    if to_ms is not None:
+        on.append(StemEvent.ts_ms < to_ms)
+    return (
+        select(Stem.stem_type, StemEvent.ts_ms, StemEvent.strength, StemEvent.count_in_8, StemEvent.measure_index)
+        .outerjoin(StemEvent, and_(*on))
+        .where(Stem.id.in_(target))
+        .order_by(Stem.id, StemEvent.id)
+    )
+
+
+# ── 조립 ─────────────────────────────────────────────────────────
+# DB(packed 컬럼/이전 stem_event 행) -> TimelineColumns(열 배열) -> JSON(TimelineOut) 또는 msgpack
+# count/measure가 없는(NULL) 값은 열 배열에서 -1
+
+class LaneColumns(NamedTuple):
+    ms: np.ndarray        # int
+    strength: np.ndarray  # float
+    count: np.ndarray     # int, NULL=-1
+    measure: np.ndarray   # int, NULL=-1
+
+
+class TimelineColumns(NamedTuple):
+    track_id: int
+    bpm: float
+    beat_idx0: int        # 첫 비트의 전체 그리드 기준 idx (구간 조회 시 0이 아님)
+    beats: LaneColumns    # strength 열은 비어 있음
+    lanes: Dict[str, LaneColumns]
+
+
+_EMPTY_LANE = LaneColumns(*(np.array([], dtype=dt) for dt in (np.int64, np.float64, np.int64, np.int64)))
+
+
+def _window(ms: np.ndarray, from_ms: Optional[int], to_ms: Optional[int]) -> slice:
+    """정렬된 ms 배열에서 [from_ms, to_ms) 구간 (이진 탐색)"""
+    lo = 0 if from_ms is None else int(np.searchsorted(ms, from_ms, side="left"))
+    hi = len(ms) if to_ms is None else int(np.searchsorted(ms, to_ms, side="left"))
+    return slice(lo, max(lo, hi))
+
+
+def _packed_lane(blob: bytes, from_ms: Optional[int] = None, to_ms: Optional[int] = None) -> LaneColumns:
+    ev = unpack_events(blob)
+    w = _window(ev.ms, from_ms, to_ms)  # 이벤트 ms는 snap 결과라 정렬돼 있음
+    return LaneColumns(ev.ms[w], ev.strength[w], ev.count[w], ev.measure[w])
+
+
+def _row_lanes(rows) -> Dict[str, LaneColumns]:
+    """lane_rows_stmt 결과 -> stem_type별 열 배열 (이벤트 없는 stem은 빈 lane)"""
+    grouped: Dict[str, list] = {}
+    for stem_type, ms, strength, count, measure in rows:
+        lane = grouped.setdefault(stem_type, [])
+        if ms is not None:
+            lane.append((ms, strength if strength is not None else 0.0,
+                         count if count is not None else -1, measure if measure is not None else -1))
+    out = {}
+    for stem_type, events in grouped.items():
+        cols = list(zip(*events)) or [(), (), (), ()]
+        out[stem_type] = LaneColumns(
+            np.array(cols[0], dtype=np.int64), np.array(cols[1], dtype=np.float64),
+            np.array(cols[2], dtype=np.int64), np.array(cols[3], dtype=np.int64),
+        )
+    return out
+
+
+def _inferred_beat_grid(lanes: Dict[str, LaneColumns]) -> np.ndarray:
+    # lightweight beat grid: infer from events' (ms, count, measure) - dedupe & sort in numpy
+    # (count/measure가 NULL인 이벤트는 제외). beat_grid 컬럼이 없는 이전 분석 결과용
+    if not lanes:
+        return beat_grid_from_events(np.array([], dtype=np.int64), np.array([], dtype=np.int64), np.array([], dtype=np.int64))
+    ms, count, measure = (np.concatenate([getattr(l, f).astype(np.int64) for l in lanes.values()]) for f in ("ms", "count", "measure"))
+    keep = (count >= 0) & (measure >= 0)
+    return beat_grid_from_events(ms[keep], count[keep], measure[keep])
+
+
+def collect_timeline(
+    track_id: int,
+    bpm: Optional[float],
+    rows,
+    beat_grid: Optional[bytes] = None,
+    packed_lanes=(),
+    from_ms: Optional[int] = None,
+    to_ms: Optional[int] = None,
+) -> TimelineColumns:
+    """
+    rows: lane_rows_stmt 결과 (stem_type, ms, strength, count, measure) - 이미 구간으로 걸러진 상태
+    beat_grid: Analysis.beat_grid (없으면 이벤트에서 추정)
+    packed_lanes: packed_lanes_stmt 결과 (id, stem_type, events_packed)
+    from_ms/to_ms: [from_ms, to_ms) 구간만. beatGrid의 idx는 전체 그리드 기준 그대로
+    """
+    row_lanes = _row_lanes(rows)
+    lanes: Dict[str, LaneColumns] = {}
+    for _, stem_type, blob in packed_lanes:
+        lanes[stem_type] = _packed_lane(blob, from_ms, to_ms) if blob is not None else row_lanes.pop(stem_type, _EMPTY_LANE)
+    lanes.update(row_lanes)
+
+    empty = np.array([], dtype=np.float64)
+    if beat_grid is not None:
+        b = unpack_beats(beat_grid)
+        w = _window(b.ms, from_ms, to_ms)
+        beats, idx0 = LaneColumns(b.ms[w], empty, b.count[w], b.measure[w]), w.start
+    else:
+        # 추정 그리드는 구간 안 이벤트로만 만들어지므로 idx도 구간 기준
+        grid = _inferred_beat_grid(lanes)
+        beats, idx0 = LaneColumns(grid["ms"], empty, grid["count"], grid["measure"]), 0
+    return TimelineColumns(track_id, bpm or 0.0, idx0, beats, lanes)
+
+
+def _nullable(a: np.ndarray) -> list:
+    out = a.tolist()
+    if len(a) and a.min() < 0:
+        out = [v if v >= 0 else None for v in out]
+    return out
+
+
+def timeline_model(cols: TimelineColumns) -> TimelineOut:
+    b = cols.beats
+    beat_grid_items = [
+        {"idx": i, "ms": m, "count": c, "measure": me}
+        for i, (m, c, me) in enumerate(zip(b.ms.tolist(), b.count.tolist(), b.measure.tolist()), start=cols.beat_idx0)
+    ]
+    lanes = {
+        stem_type: {"events": [
+            {"ms": m, "strength": s, "count": c, "measure": me}
+            for m, s, c, me in zip(
+                lane.ms.tolist(), lane.strength.astype(np.float64).tolist(), _nullable(lane.count), _nullable(lane.measure)
+            )
+        ]}
+        for stem_type, lane in cols.lanes.items()
+    }
+    # 중첩 모델은 pydantic-core가 dict에서 한 번에 검증/생성
+    return TimelineOut.model_validate(
+        {"trackId": cols.track_id, "bpm": cols.bpm, "beatGrid": beat_grid_items, "stems": lanes}
+    )
+
+
+def assemble_timeline(track_id: int, bpm: Optional[float], rows, **kw) -> TimelineOut:
+    """collect_timeline + timeline_model (인자는 collect_timeline과 같음)"""
+    return timeline_model(collect_timeline(track_id, bpm, rows, **kw))
+
+
+def encode_timeline(timeline: TimelineOut) -> bytes:
+    return timeline.model_dump_json().encode()
+
+
+# ── 바이너리(msgpack) 인코딩 ──────────────────────────────────────
+# 키 이름은 문서당 한 번만, 이벤트는 lane별 little-endian 병렬 배열(bin)로:
+#   {"format": "beatmap.timeline", "v": 1, "trackId", "bpm",
+#    "beatGrid": {"idx0", "n", "ms": <i4, "count": <i1, "measure": <i4},
+#    "stems": {stem_type: {"n", "ms": <i4, "strength": <f4, "count": <i1, "measure": <i4}}}
+# count/measure의 NULL은 -1. 클라이언트는 Int32Array/Float32Array로 바로 감싸면 된다.
+TIMELINE_BINARY_VERSION = 1
+TIMELINE_MEDIA_TYPES = {"json": "application/json", "msgpack": "application/x-msgpack"}
+
+
+def _bin_columns(lane: LaneColumns, strength: bool = True) -> dict:
+    out = {"n": len(lane.ms), "ms": lane.ms.astype("<i4").tobytes()}
+    if strength:
+        out["strength"] = lane.strength.astype("<f4").tobytes()
+    out["count"] = lane.count.astype("<i1").tobytes()
+    out["measure"] = lane.measure.astype("<i4").tobytes()
+    return out
+
+
+def encode_timeline_msgpack(cols: TimelineColumns) -> bytes:
+    beat_grid = _bin_columns(cols.beats, strength=False)
+    beat_grid["idx0"] = cols.beat_idx0
+    return msgpack.packb({
+        "format": "beatmap.timeline",
+        "v": TIMELINE_BINARY_VERSION,
+        "trackId": cols.track_id,
+        "bpm": float(cols.bpm),
+        "beatGrid": beat_grid,
+        "stems": {stem_type: _bin_columns(lane) for stem_type, lane in cols.lanes.items()},
+    })
+
+
+def render_timeline(cols: TimelineColumns, fmt: str = "json") -> bytes:
+    """fmt: TIMELINE_MEDIA_TYPES 키"""
+    if fmt == "msgpack":
+        return encode_timeline_msgpack(cols)
+    return encode_timeline(timeline_model(cols))
+
+
+def _legacy_stem_ids(packed_lanes) -> List[int]:
+    return [stem_id for stem_id, _, blob in packed_lanes if blob is None]
+
+
+# ── 로더 ─────────────────────────────────────────────────────────
+# from_ms/to_ms: [from_ms, to_ms) 구간, stems: 포함할 stem_type 목록 (None이면 전체)
+
+async def load_timeline(
+    db: AsyncSession,
+    track_id: int,
+    a,
+    from_ms: Optional[int] = None,
+    to_ms: Optional[int] = None,
+    stems: Optional[Sequence[str]] = None,
+) -> TimelineColumns:
+    """a: latest_analysis_stmt 결과 행. 응답 형식별 인코딩은 render_timeline"""
+    grid = (await db.execute(beat_grid_stmt(a.id))).scalar()
+    packed = (await db.execute(packed_lanes_stmt(track_id, stems))).all()
+    legacy = _legacy_stem_ids(packed)
+    rows = (await db.execute(lane_rows_stmt(track_id, legacy, from_ms, to_ms))).all() if legacy else []
+    return collect_timeline(track_id, a.bpm, rows, beat_grid=grid, packed_lanes=packed, from_ms=from_ms, to_ms=to_ms)
+
+
+def load_timeline_sync(
+    db: Session,
+    track_id: int,
+    a,
+    from_ms: Optional[int] = None,
+    to_ms: Optional[int] = None,
+    stems: Optional[Sequence[str]] = None,
+) -> TimelineColumns:
+    grid = db.execute(beat_grid_stmt(a.id)).scalar()
+    packed = db.execute(packed_lanes_stmt(track_id, stems)).all()
+    legacy = _legacy_stem_ids(packed)
+    rows = db.execute(lane_rows_stmt(track_id, legacy, from_ms, to_ms)).all() if legacy else []
+    return collect_timeline(track_id, a.bpm, rows, beat_grid=grid, packed_lanes=packed, from_ms=from_ms, to_ms=to_ms)
+
+
+async def build_timeline(db: AsyncSession, track_id: int, **window) -> Optional[Tuple[int, TimelineOut]]:
+    """(analysis_id, TimelineOut) 또는 아직 준비 안 됐으면 None. window: from_ms/to_ms/stems"""
+    a = (await db.execute(latest_analysis_stmt(track_id))).first()
     if not a:
         return None
+    return a.id, timeline_model(await load_timeline(db, track_id, a, **window))
 
-    # beat grid reconstructed from DB (we didn't persist per-beat rows to simplify MVP)
-    # For MVP timeline, we rebuild a simple grid using bpm + phase assuming constant tempo.
-    # (Optional: persist detailed beat_grid in DB for perfect recall.)
-
-    # Pull events
-    stems = db.query(Stem).filter_by(track_id=track_id).all()
-    lanes = {}
-    for s in stems:
-        events = db.query(StemEvent).filter_by(stem_id=s.id).all()
-        lanes[s.stem_type] = StemLane(events=[EventItem(ms=e.ts_ms, strength=e.strength, count=e.count_in_8, measure=e.measure_index) for e in events])
-
-    # lightweight beat grid: infer from events' ms if needed - here we emit empty grid for MVP front to render from events
-    beat_grid = [BeatItem(idx=i, ms=e.ms, count=e.count, measure=e.measure) 
-                 for lane in lanes.values() for i, e in enumerate(lane.events)]
-    # Deduplicate & sort
-    seen = {}
-    for b in beat_grid:
-        seen[(b.ms, b.count, b.measure)] = b
-    beat_grid = sorted(seen.values(), key=lambda x: x.ms)
-
-    return TimelineOut(trackId=track_id, bpm=a.bpm or 0.0, beatGrid=beat_grid, stems=lanes)
\ No newline at end of file
+
+def build_timeline_sync(db: Session, track_id: int, **window) -> Optional[Tuple[int, TimelineOut]]:
+    """build_timeline의 동기 세션 버전"""
+    a = db.execute(latest_analysis_stmt(track_id)).first()
+    if not a:
+        return None
+    return a.id, timeline_model(load_timeline_sync(db, track_id, a, **window))
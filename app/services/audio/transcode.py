@@ -0,0 +1,102 @@
+"""
+stem 오디오 Opus 변환 (모바일 재생용, /stems/{track_id}/{stem_type}/audio?format=opus)
+
+요청 때 ffmpeg로 한 번 변환해 원본 옆 <stem>.opus 로 캐시하고, 이후에는 파일 그대로 (Range 가능) 서빙한다.
+- 동시 ffmpeg 프로세스 수: STEM_TRANSCODE_WORKERS (세마포어)
+- 같은 파일 동시 요청은 한 번만 변환 (경로별 Future 공유)
+- 대기열이 STEM_TRANSCODE_QUEUE를 넘으면 TranscodeBusy (API는 503)
+"""
+import asyncio
+import os
+from typing import Dict, Optional
+
+from app.core.config import settings
+from app.core.logging import logger
+
+MEDIA_TYPES = {
+    ".wav": "audio/wav",
+    ".flac": "audio/flac",
+    ".opus": "audio/ogg; codecs=opus",
+}
+
+
+class TranscodeBusy(RuntimeError):
+    pass
+
+
+class TranscodeError(RuntimeError):
+    pass
+
+
+def opus_path(src: str) -> str:
+    return os.path.splitext(src)[0] + ".opus"
+
+
+def _fresh(dst: str, src: str) -> bool:
+    try:
+        return os.stat(dst).st_mtime_ns >= os.stat(src).st_mtime_ns
+    except FileNotFoundError:
+        return False
+
+
+class TranscodePool:
+    def __init__(self, workers: int, queue: int):
+        self.workers, self.queue = max(1, workers), max(0, queue)
+        self._sem: Optional[asyncio.Semaphore] = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    @property
+    def pending(self) -> int:
+        return len(self._inflight)
+
+    async def to_opus(self, src: str) -> str:
+        """캐시된 .opus 경로 (없거나 원본보다 오래됐으면 변환)"""
+        dst = opus_path(src)
+        if _fresh(dst, src):
+            return dst
+        fut = self._inflight.get(dst)
+        if fut is None:
+            if self.pending >= self.workers + self.queue:
+                raise TranscodeBusy(f"{self.pending} transcodes pending")
+            fut = asyncio.get_running_loop().create_task(self._run(src, dst))
+            self._inflight[dst] = fut
+            fut.add_done_callback(lambda _: self._inflight.pop(dst, None))
+        return await asyncio.shield(fut)  # 한 클라이언트가 끊겨도 다른 대기자를 위해 계속
+
+    async def _run(self, src: str, dst: str) -> str:
+        if self._sem is None:
+            self._sem = asyncio.Semaphore(self.workers)
+        async with self._sem:
+            tmp = f"{dst}.{os.getpid()}.part"
+            args = [
+                settings.FFMPEG_BIN, "-nostdin", "-hide_banner", "-loglevel", "error", "-y",
+                "-i", src, "-vn", "-c:a", "libopus", "-b:a", settings.STEM_OPUS_BITRATE,
+                "-f", "ogg", tmp,
+            ]
+            try:
+                proc = await asyncio.create_subprocess_exec(
+                    *args, stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE,
+                )
+            except OSError as e:  # ffmpeg 바이너리 없음/실행 불가 -> 404(파일 없음)가 아니라 변환 실패로
+                raise TranscodeError(f"cannot run {settings.FFMPEG_BIN}: {e}") from e
+            _, err = await proc.communicate()
+            if proc.returncode != 0:
+                try:
+                    os.remove(tmp)
+                except FileNotFoundError:
+                    pass
+                reason = (err.decode(errors="ignore").strip().splitlines() or ["ffmpeg failed"])[-1]
+                raise TranscodeError(reason[:200])
+            os.replace(tmp, dst)
+        logger.info(f"[transcode] opus {os.path.basename(src)} -> {os.path.getsize(dst)}B")
+        return dst
+
+
+_pool: Optional[TranscodePool] = None
+
+
+def get_transcode_pool() -> TranscodePool:
+    global _pool
+    if _pool is None:
+        _pool = TranscodePool(settings.STEM_TRANSCODE_WORKERS, settings.STEM_TRANSCODE_QUEUE)
+    return _pool
@@ -0,0 +1,40 @@
+import os
+from typing import Tuple
+
+import yt_dlp
+from app.core.config import settings
+
+
+def download_youtube_wav(url: str, out_base: str) -> Tuple[str, str]:
+    """
+    YouTube(또는 재생목록 첫 항목) 오디오를 받아 yt-dlp의 FFmpegExtractAudio 후처리로
+    canonical WAV(s16 mono TARGET_SR)를 '<out_base>.wav'에 바로 쓴다.
+    중간 원본은 yt-dlp가 후처리 후 삭제하므로 따로 찾거나 지울 필요가 없다.
+
+    Returns:
+        (wav_path, title)
+    """
+    ydl_opts = {
+        "outtmpl": f"{out_base}.%(ext)s",
+        "format": "bestaudio/best",
+        "playlist_items": "1",
+        "noplaylist": False,
+        "prefer_ffmpeg": True,
+        "quiet": True,
+        "postprocessors": [{"key": "FFmpegExtractAudio", "preferredcodec": "wav"}],
+        "postprocessor_args": {
+            "extractaudio+ffmpeg_o": ["-ac", "1", "-ar", str(settings.TARGET_SR), "-sample_fmt", "s16"],
+        },
+    }
+    if os.path.sep in settings.FFMPEG_BIN:
+        ydl_opts["ffmpeg_location"] = settings.FFMPEG_BIN
+
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        info = ydl.extract_info(url, download=True)
+    entry = info["entries"][0] if info.get("_type") == "playlist" and info.get("entries") else info
+    title = entry.get("title") or entry["id"]
+
+    wav_path = f"{out_base}.wav"
+    if not os.path.exists(wav_path):
+        raise RuntimeError(f"YouTube 오디오 변환 결과가 없습니다: {wav_path}")
+    return wav_path, title
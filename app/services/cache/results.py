@@ -0,0 +1,168 @@
+import asyncio, hashlib, json
+from typing import List, Optional
+
+from sqlalchemy import insert, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.logging import logger
+from app.core.redis import get_redis
+from app.db.models.track import Track
+from app.db.models.analysis import Analysis
+from app.db.models.stem import Stem
+from app.db.models.stem_event import StemEvent
+
+# 분석 로직(알고리즘/저장 형식)이 바뀌면 올린다 -> 이전 캐시 결과는 자동으로 무효
+PIPELINE_PARAMS_VERSION = 1
+
+CACHE_COUNTERS_KEY = "beatmap:analysis_cache"
+
+# 복사하지 않는 컬럼
+_SKIP_COLUMNS = {"id", "track_id", "created_at", "updated_at"}
+
+
+def pipeline_version() -> str:
+    """결과에 영향을 주는 파라미터들의 버전 문자열 (Analysis.pipeline_version)"""
+    params = {
+        "v": PIPELINE_PARAMS_VERSION,
+        "target_sr": settings.TARGET_SR,
+        "demucs_model": settings.DEMUCS_MODEL,
+        # 세그먼트/겹침/shift는 청크 경로가 아니어도 apply_model(CLI) 인자로 stem에 영향, 청크 경로는 경계 처리가 다름
+        "demucs": [settings.DEMUCS_SEGMENT, settings.DEMUCS_OVERLAP, settings.DEMUCS_SHIFTS, settings.DEMUCS_CHUNKED],
+        "phase_resolution_ms": settings.PHASE_RESOLUTION_MS,  # 위상 보정 -> 카운트/마디
+        "peaks": [settings.PEAKS_DOWNSAMPLE, settings.PEAKS_BASE_SAMPLES, settings.PEAKS_LEVELS, settings.PEAKS_LEVEL_FACTOR],
+    }
+    digest = hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()[:12]
+    return f"{PIPELINE_PARAMS_VERSION}-{digest}"
+
+
+def record_cache_result(hit: bool) -> None:
+    """hit/miss 카운터 (Redis HINCRBY). 카운터 실패가 파이프라인을 막으면 안 됨"""
+    try:
+        get_redis().hincrby(CACHE_COUNTERS_KEY, "hit" if hit else "miss", 1)
+    except Exception:
+        logger.warning("[cache] failed to record analysis cache %s", "hit" if hit else "miss")
+
+
+def cache_counters() -> dict:
+    raw = get_redis().hgetall(CACHE_COUNTERS_KEY)
+    return {k.decode(): int(v) for k, v in raw.items()}
+
+
+# ── 쿼리 ──────────────────────────────────────────────────────────
+
+def _cached_analysis_stmt(audio_hash: str, version: str, exclude_track_id: Optional[int]):
+    stmt = (
+        select(Analysis, Track)
+        .join(Track, Track.id == Analysis.track_id)
+        .where(
+            Track.audio_hash == audio_hash,
+            Track.status == "done",
+            Analysis.pipeline_version == version,
+        )
+        .order_by(Analysis.id.desc())
+        .limit(1)
+    )
+    if exclude_track_id is not None:
+        stmt = stmt.where(Track.id != exclude_track_id)
+    return stmt
+
+
+def _latest_stems_stmt(track_id: int):
+    # 재분석으로 stem 세트가 여러 개면 stem_type별 최신 행만 (_pick_latest)
+    return select(Stem.stem_type, Stem.id).where(Stem.track_id == track_id).order_by(Stem.id.desc())
+
+
+def _copy_row(obj, **overrides):
+    values = {
+        c.key: getattr(obj, c.key)
+        for c in obj.__table__.columns
+        if c.key not in _SKIP_COLUMNS
+    }
+    values.update(overrides)
+    return type(obj)(**values)
+
+
+def _copy_events_stmt(src_stem_id: int, dst_stem_id: int):
+    """stem_event 행을 INSERT ... SELECT 한 문장으로 복제"""
+    cols = [c for c in StemEvent.__table__.columns if c.key not in ("id", "stem_id")]
+    return insert(StemEvent).from_select(
+        ["stem_id"] + [c.key for c in cols],
+        select(literal(dst_stem_id), *cols).where(StemEvent.stem_id == src_stem_id),
+    )
+
+
+def _pick_latest(rows) -> List[int]:
+    seen, ids = set(), []
+    for stem_type, stem_id in rows:
+        if stem_type not in seen:
+            seen.add(stem_type)
+            ids.append(stem_id)
+    return ids
+
+
+def _clone_track_meta(dst: Track, src: Track) -> None:
+    dst.sample_rate = src.sample_rate
+    dst.duration_ms = src.duration_ms
+    dst.status = "done"
+
+
+# ── 동기(워커) ────────────────────────────────────────────────────
+
+def clone_cached_analysis(
+    db: Session, track: Track, audio_hash: str, version: Optional[str] = None
+) -> Optional[Analysis]:
+    """
+    같은 (audio_hash, pipeline_version)의 완료된 분석이 있으면 track으로 복제하고 done 처리.
+    Stem 파일/피크는 경로를 그대로 참조하고, 이벤트는 INSERT ... SELECT로 복사한다.
+    커밋은 호출자가 한다. 없으면 None.
+    """
+    version = version or pipeline_version()
+    row = db.execute(_cached_analysis_stmt(audio_hash, version, track.id)).first()
+    if row is None:
+        record_cache_result(False)
+        return None
+    src_analysis, src_track = row
+
+    analysis = _copy_row(src_analysis, track_id=track.id)
+    db.add(analysis)
+    stem_ids = _pick_latest(db.execute(_latest_stems_stmt(src_track.id)).all())
+    for src_stem in db.execute(select(Stem).where(Stem.id.in_(stem_ids))).scalars().all():
+        stem = _copy_row(src_stem, track_id=track.id)
+        db.add(stem)
+        db.flush()
+        db.execute(_copy_events_stmt(src_stem.id, stem.id))
+    _clone_track_meta(track, src_track)
+    db.flush()
+    record_cache_result(True)
+    logger.info(f"[cache] HIT track={track.id} <- track={src_track.id} analysis={src_analysis.id}")
+    return analysis
+
+
+# ── 비동기(API) ───────────────────────────────────────────────────
+
+async def clone_cached_analysis_async(
+    db: AsyncSession, track: Track, audio_hash: str, version: Optional[str] = None
+) -> Optional[Analysis]:
+    """clone_cached_analysis의 AsyncSession 버전 (ingest 경로용)"""
+    version = version or pipeline_version()
+    row = (await db.execute(_cached_analysis_stmt(audio_hash, version, track.id))).first()
+    if row is None:
+        await asyncio.to_thread(record_cache_result, False)
+        return None
+    src_analysis, src_track = row
+
+    analysis = _copy_row(src_analysis, track_id=track.id)
+    db.add(analysis)
+    stem_ids = _pick_latest((await db.execute(_latest_stems_stmt(src_track.id))).all())
+    for src_stem in (await db.execute(select(Stem).where(Stem.id.in_(stem_ids)))).scalars().all():
+        stem = _copy_row(src_stem, track_id=track.id)
+        db.add(stem)
+        await db.flush()
+        await db.execute(_copy_events_stmt(src_stem.id, stem.id))
+    _clone_track_meta(track, src_track)
+    await db.flush()
+    await asyncio.to_thread(record_cache_result, True)
+    logger.info(f"[cache] HIT track={track.id} <- track={src_track.id} analysis={src_analysis.id}")
+    return analysis
@@ -0,0 +1,58 @@
+import os, shutil, tempfile
+from typing import Optional, Tuple
+
+from app.core.config import settings
+from app.utils.http import make_etag
+
+# 완료된 타임라인 문서를 미리 인코딩해 디스크에 보관
+#   STORAGE_DIR/timelines/<track_id>/<analysis_id>.json
+# 분석 id가 바뀌면(재분석) 키가 달라지고, 재분석 시작 시 트랙 디렉터리를 통째로 지운다.
+
+
+def _track_dir(track_id: int) -> str:
+    return os.path.join(settings.STORAGE_DIR, "timelines", str(track_id))
+
+
+def timeline_cache_path(track_id: int, analysis_id: int, fmt: str = "json") -> str:
+    return os.path.join(_track_dir(track_id), f"{analysis_id}.{fmt}")
+
+
+def cached_timeline_etag(track_id: int, analysis_id: int, fmt: str = "json") -> Optional[str]:
+    """stat만으로 ETag 계산 (304 응답은 파일을 읽지 않음)"""
+    try:
+        st = os.stat(timeline_cache_path(track_id, analysis_id, fmt))
+    except FileNotFoundError:
+        return None
+    return make_etag("timeline", track_id, analysis_id, fmt, st.st_mtime_ns, st.st_size)
+
+
+def read_cached_timeline(track_id: int, analysis_id: int, fmt: str = "json") -> Optional[Tuple[bytes, str]]:
+    path = timeline_cache_path(track_id, analysis_id, fmt)
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    return data, cached_timeline_etag(track_id, analysis_id, fmt)
+
+
+def write_cached_timeline(track_id: int, analysis_id: int, data: bytes, fmt: str = "json") -> str:
+    """원자적 교체로 저장하고 ETag 반환 (같은 프로세스의 동시 호출도 임시 파일이 겹치지 않음)"""
+    path = timeline_cache_path(track_id, analysis_id, fmt)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+    return cached_timeline_etag(track_id, analysis_id, fmt)
+
+
+def invalidate_timeline(track_id: int) -> None:
+    shutil.rmtree(_track_dir(track_id), ignore_errors=True)
@@ -0,0 +1,191 @@
+"""
+오디오 파일 저장소 (settings.STORAGE_BACKEND)
+
+DB의 file_path(Track/Stem)에는 경로 대신 '참조(ref)'를 저장한다.
+- local : 로컬 WAV 경로 그대로 (기존 방식)
+- flac  : 로컬 FLAC 경로 (무손실 압축, soundfile로 블록/seek 디코딩)
+- object: object://<key> (HTTP PUT/GET 오브젝트 스토어, STORAGE_DIR에 같은 배치로 로컬 캐시)
+이전에 저장된 로컬 경로 ref는 어떤 백엔드에서도 그대로 읽힌다.
+
+생산자(업로드/YouTube/Demucs)는 지금처럼 STORAGE_DIR 아래에 WAV를 쓰고 store_audio()로 넘긴다.
+소비자(분석/피크/onset)는 local_path(ref)로 읽을 수 있는 로컬 경로를 받는다.
+"""
+import os
+import shutil
+import tempfile
+import urllib.error
+import urllib.request
+from typing import Optional
+from urllib.parse import quote
+
+import soundfile as sf
+
+from app.core.config import settings
+from app.core.logging import logger
+
+OBJECT_SCHEME = "object://"
+_BLOCK = 1 << 16
+
+
+def is_object_ref(ref: str) -> bool:
+    return ref.startswith(OBJECT_SCHEME)
+
+
+def flac_encode(src: str, dst: Optional[str] = None) -> str:
+    """WAV -> FLAC (블록 단위 스트리밍). PCM_16/24는 비트 그대로, float/기타는 PCM_24로"""
+    dst = dst or os.path.splitext(src)[0] + ".flac"
+    tmp = dst + ".tmp"
+    with sf.SoundFile(src) as f:
+        subtype = f.subtype if f.subtype in ("PCM_16", "PCM_24") else "PCM_24"
+        dtype = "int16" if subtype == "PCM_16" else "int32"
+        with sf.SoundFile(tmp, "w", f.samplerate, f.channels, format="FLAC", subtype=subtype) as out:
+            for block in f.blocks(blocksize=_BLOCK, dtype=dtype, always_2d=True):
+                out.write(block)
+    os.replace(tmp, dst)
+    return dst
+
+
+class StorageBackend:
+    """local: 파일을 옮기거나 바꾸지 않는다"""
+    name = "local"
+
+    def store_audio(self, local_path: str) -> str:
+        """생산자가 쓴 로컬 오디오 파일을 저장소에 넣고 ref 반환"""
+        return local_path
+
+    def store_file(self, local_path: str, ref: str) -> str:
+        """부속 파일(.peaks 등)을 ref 위치에 저장 (ref는 보통 오디오 ref에서 파생)"""
+        dst = self.local_path(ref) if is_object_ref(ref) else ref
+        if os.path.abspath(local_path) != os.path.abspath(dst):
+            os.replace(local_path, dst)
+        return ref
+
+    def local_path(self, ref: str) -> str:
+        """ref를 읽을 수 있는 로컬 경로로 (object ref면 캐시에 없을 때 내려받음)"""
+        if is_object_ref(ref):
+            return ObjectStorage.from_settings().local_path(ref)
+        return ref
+
+    def delete(self, ref: str) -> None:
+        try:
+            os.remove(self.local_path(ref))
+        except FileNotFoundError:
+            pass
+
+
+class LocalFlacStorage(StorageBackend):
+    name = "flac"
+
+    def store_audio(self, local_path: str) -> str:
+        if local_path.lower().endswith(".flac"):
+            return local_path
+        out = flac_encode(local_path)
+        before, after = os.path.getsize(local_path), os.path.getsize(out)
+        os.remove(local_path)
+        logger.info(f"[storage] flac {os.path.basename(out)} {before}B -> {after}B ({after / max(before, 1):.0%})")
+        return out
+
+
+class ObjectStorage(StorageBackend):
+    """
+    '<STORAGE_URL>/<key>'에 PUT/GET/DELETE하는 단순 오브젝트 스토어 (WebDAV/프리사인 없는 버킷 게이트웨이 등).
+    key는 STORAGE_DIR 기준 상대 경로, 로컬 캐시도 STORAGE_DIR에 같은 배치로 둔다.
+    """
+    name = "object"
+
+    def __init__(self, url: str, root: str, flac: bool = True, timeout: float = 60.0):
+        if not url:
+            raise ValueError("STORAGE_URL is required for STORAGE_BACKEND=object")
+        self.url = url.rstrip("/")
+        self.root = os.path.abspath(root)
+        self.flac = flac
+        self.timeout = timeout
+
+    @classmethod
+    def from_settings(cls) -> "ObjectStorage":
+        return cls(settings.STORAGE_URL, settings.STORAGE_DIR, settings.STORAGE_OBJECT_FLAC, settings.STORAGE_TIMEOUT)
+
+    def key_for(self, local_path: str) -> str:
+        rel = os.path.relpath(os.path.abspath(local_path), self.root)
+        if rel.startswith(".."):
+            raise ValueError(f"{local_path} is outside STORAGE_DIR")
+        return rel.replace(os.sep, "/")
+
+    def _cache_path(self, ref: str) -> str:
+        return os.path.join(self.root, *ref[len(OBJECT_SCHEME):].split("/"))
+
+    def _request(self, method: str, key: str, data=None, headers=None):
+        req = urllib.request.Request(f"{self.url}/{quote(key)}", data=data, method=method, headers=headers or {})
+        return urllib.request.urlopen(req, timeout=self.timeout)
+
+    def _upload(self, path: str, key: str) -> None:
+        with open(path, "rb") as f:
+            headers = {"Content-Length": str(os.path.getsize(path)), "Content-Type": "application/octet-stream"}
+            self._request("PUT", key, data=f, headers=headers).close()
+
+    def store_audio(self, local_path: str) -> str:
+        path = local_path
+        if self.flac and not path.lower().endswith(".flac"):
+            path = flac_encode(local_path)
+            os.remove(local_path)
+        key = self.key_for(path)
+        self._upload(path, key)  # 로컬 파일은 캐시로 남김
+        logger.info(f"[storage] PUT {key} {os.path.getsize(path)}B")
+        return OBJECT_SCHEME + key
+
+    def store_file(self, local_path: str, ref: str) -> str:
+        cache = self._cache_path(ref)
+        if os.path.abspath(local_path) != cache:
+            os.makedirs(os.path.dirname(cache), exist_ok=True)
+            os.replace(local_path, cache)
+        self._upload(cache, ref[len(OBJECT_SCHEME):])
+        return ref
+
+    def local_path(self, ref: str) -> str:
+        if not is_object_ref(ref):
+            return ref
+        cache = self._cache_path(ref)
+        if not os.path.exists(cache):
+            os.makedirs(os.path.dirname(cache), exist_ok=True)
+            # 같은 ref를 동시에 내려받아도(요청 스레드끼리) 임시 파일이 겹치지 않게 호출마다 고유 이름
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(cache), prefix=os.path.basename(cache) + ".", suffix=".part")
+            try:
+                try:
+                    with os.fdopen(fd, "wb") as f, self._request("GET", ref[len(OBJECT_SCHEME):]) as resp:
+                        shutil.copyfileobj(resp, f, length=1 << 20)
+                except urllib.error.HTTPError as e:
+                    if e.code == 404:
+                        raise FileNotFoundError(ref) from e
+                    raise
+                os.replace(tmp, cache)
+            except BaseException:
+                try:
+                    os.unlink(tmp)
+                except FileNotFoundError:
+                    pass
+                raise
+            logger.info(f"[storage] GET {ref} -> cache")
+        return cache
+
+    def delete(self, ref: str) -> None:
+        if is_object_ref(ref):
+            self._request("DELETE", ref[len(OBJECT_SCHEME):]).close()
+        super().delete(ref)
+
+
+_BACKENDS = {"local": StorageBackend, "flac": LocalFlacStorage, "object": ObjectStorage}
+_storage = None
+_storage_key = None
+
+
+def get_storage() -> StorageBackend:
+    """프로세스당 하나 (설정이 바뀌면 다시 만든다)"""
+    global _storage, _storage_key
+    key = (settings.STORAGE_BACKEND, settings.STORAGE_URL, settings.STORAGE_DIR, settings.STORAGE_OBJECT_FLAC)
+    if _storage is None or _storage_key != key:
+        if settings.STORAGE_BACKEND not in _BACKENDS:
+            raise ValueError(f"unknown STORAGE_BACKEND {settings.STORAGE_BACKEND!r}")
+        cls = _BACKENDS[settings.STORAGE_BACKEND]
+        _storage = cls.from_settings() if cls is ObjectStorage else cls()
+        _storage_key = key
+    return _storage
@@ -1,36 +1,44 @@
 from __future__ import annotations
 
+import os
 import time
 import logging
-from typing import Dict
+from typing import Dict, Optional
 
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker
+from rq.job import Job
+from sqlalchemy import select, text
 
+from app.core.config import settings
 from app.core.logging import logger
-from app.db.config import DatabaseSettings
+from app.core.metrics import instrument_engine, stage_timer
+from app.core.redis import get_redis
+from app.db.sync import make_sync_engine, make_sync_sessionmaker
 
 # 동기 엔진/세션 (워커 전용, 반드시 pymysql)
-_settings = DatabaseSettings()
-_sync_url = _settings.url
-if _sync_url.startswith("mysql+aiomysql://"):
-    _sync_url = _sync_url.replace("mysql+aiomysql://", "mysql+pymysql://", 1)
-if _sync_url.startswith("mysql://"):
-    _sync_url = _sync_url.replace("mysql://", "mysql+pymysql://", 1)
-
-_engine = create_engine(_sync_url, pool_pre_ping=True, pool_recycle=28000)
-_Session = sessionmaker(bind=_engine, autoflush=False, autocommit=False)
+_engine = make_sync_engine()
+instrument_engine(_engine, "worker")
+_Session = make_sync_sessionmaker(_engine, expire_on_commit=False)
 
 # ── 동기 분석 파이프라인 함수들 ──────────────────────────────────────
-from app.services.audio.io import ensure_wav            # 동기
+from app.services.audio.io import ensure_wav, hash_wav, tracks_dir  # 동기
+from app.services.audio.buffer import AudioBufferCache  # 잡 단위 디코딩 캐시
 from app.services.audio.analyze import (                # 동기
     compute_beat_grid,
     estimate_phase_shift,
-    map_to_8count,
 )
-from app.services.audio.demucs import separate_stems    # 동기
-from app.services.audio.events import extract_events_and_map  # 동기
-from app.services.audio.peaks import compute_peak_preview      # 동기
+from app.services.audio.grid import map_to_8count_array
+from app.services.audio.packed import pack_beats, unpack_counts
+from app.services.audio.demucs import MODEL_SR, STEMS, separate_stems, separate_stems_chunked  # 동기
+from app.services.audio.events import Onsets, OnsetAccumulator, extract_events_and_map, iter_stem_onsets  # 동기
+from app.services.audio.peaks import PeakAccumulator, compute_stem_peaks, pyramid_path  # 동기
+from app.services.audio.youtube import download_youtube_wav       # 동기
+from app.services.cache.results import clone_cached_analysis, pipeline_version
+from app.services.cache.timeline import invalidate_timeline, write_cached_timeline
+from app.services.audio.timeline import TIMELINE_MEDIA_TYPES, latest_analysis_stmt, load_timeline_sync, render_timeline
+from app.services.tasks.progress import STAGE_PERCENT, publish_progress
+from app.services.tasks.queue import enqueue_analysis
+from app.services.tasks.singleflight import owns_run, release_run
+from app.services.storage.backends import get_storage
 
 # ── ORM 모델 ──────────────────────────────────────────────────────
 from app.db.models.track import Track
@@ -38,17 +46,263 @@ from app.db.models.analysis import Analysis
 from app.db.models.stem import Stem
 
 
+def _precompute_timeline(db, track_id: int) -> None:
+    """완료된 타임라인을 형식별(JSON/msgpack)로 한 번 직렬화해 캐시 (실패해도 첫 조회 때 다시 만들어지므로 잡은 계속)"""
+    s = time.time()
+    try:
+        a = db.execute(latest_analysis_stmt(track_id)).first()
+        if a is None:
+            return
+        cols = load_timeline_sync(db, track_id, a)
+        for fmt in TIMELINE_MEDIA_TYPES:
+            data = render_timeline(cols, fmt)
+            write_cached_timeline(track_id, a.id, data, fmt)
+            logger.info(f"[jobs] timeline cached analysis={a.id} fmt={fmt} bytes={len(data)} dt={time.time()-s:.2f}s")
+    except Exception:
+        logger.exception(f"[jobs] timeline precompute failed track={track_id}")
+
+
+def _separate_progressive(wav_path: str, sr: int, audio: AudioBufferCache, on_progress=None):
+    """
+    separate_stems_chunked로 분리하면서 청크마다 피크/onset을 누적.
+    on_progress(fraction): 청크마다 분리된 비율 (0~1)
+    Returns: (stem 경로들, stem별 peak_preview, stem별 onset) - 폴백으로 청크가 없었으면 ({}, None)
+    """
+    frames = audio.get(wav_path, sr=MODEL_SR, mono=False).frames
+    peaks = {name: PeakAccumulator(frames, MODEL_SR) for name in STEMS}
+    onset_acc = {name: OnsetAccumulator(MODEL_SR, sr) for name in STEMS}
+    n_chunks = 0
+
+    def on_chunk(start: int, chunk: dict) -> None:
+        nonlocal n_chunks
+        for name, data in chunk.items():
+            peaks[name].push(data)
+            onset_acc[name].push(data)
+        n_chunks += 1
+        n = len(next(iter(chunk.values())))
+        logger.info(f"[jobs] separated chunk #{n_chunks} start={start / MODEL_SR:.1f}s len={n / MODEL_SR:.1f}s")
+        if on_progress is not None:
+            on_progress(min(1.0, (start + n) / max(frames, 1)))
+
+    stems = separate_stems_chunked(wav_path, audio, on_chunk=on_chunk)
+    if n_chunks == 0:  # separate_stems로 폴백 (상주 엔진 없음) -> 피크/onset은 stem 파일에서
+        return stems, {}, None
+    previews = {name: peaks[name].finish(path)[0] for name, path in stems.items()}
+    onsets = {name: onset_acc[name].finish() for name in stems}
+    return stems, previews, onsets
+
+
+# ── 파이프라인 단계 ───────────────────────────────────────────────
+# analyze_track_job(단일 잡)과 DAG 단계 잡들이 같은 함수를 쓴다.
+# dt: _Clock (dt()는 로그용 경과 시간 문자열, dt.elapsed는 초)
+
+class _Clock:
+    def __init__(self) -> None:
+        self.t0 = time.time()
+
+    @property
+    def elapsed(self) -> float:
+        return time.time() - self.t0
+
+    def __call__(self) -> str:
+        return f"{self.elapsed:.2f}s"
+
+
+def _progress(t: Track, stage: str, dt, percent: Optional[float] = None, **extra) -> None:
+    publish_progress(t.id, stage, dt.elapsed, percent, **extra)
+
+@stage_timer("prepare")
+def _prepare(db, t: Track, dt) -> bool:
+    """processing 전이 + WAV 메타 + 결과 캐시 확인. 캐시 HIT면 done까지 처리하고 True"""
+    # 1) 상태 전이: queued -> processing
+    s = time.time()
+    t.status = "processing"
+    db.commit()
+    invalidate_timeline(t.id)  # 재분석이면 이전 타임라인 캐시 폐기
+    logger.info(f"[jobs] status=processing COMMIT ok dt={time.time()-s:.2f}s total={dt()}")
+    _progress(t, "processing", dt)
+
+    # 2) 입력 보장 (WAV 생성/샘플레이트/길이 저장)
+    s = time.time()
+    logger.info(f"[jobs] ensure_wav START src='{t.file_path}'")
+    wav_path, sr, duration_ms = ensure_wav(get_storage().local_path(t.file_path))
+    logger.info(
+        f"[jobs] ensure_wav DONE out='{wav_path}' sr={sr} dur={duration_ms}ms "
+        f"dt={time.time()-s:.2f}s total={dt()}"
+    )
+
+    # 2-1) 결과 캐시: 같은 오디오 + 같은 파이프라인 버전이면 재계산 없이 복제
+    #      sample_rate/duration/audio_hash(+ HIT면 복제 결과)는 아래 커밋 한 번으로
+    s = time.time()
+    t.sample_rate = sr
+    t.duration_ms = duration_ms
+    if not t.audio_hash:
+        t.audio_hash = hash_wav(wav_path)
+    if clone_cached_analysis(db, t, t.audio_hash) is not None:
+        db.commit()
+        logger.info(f"[jobs] analysis cache HIT status=done dt={time.time()-s:.2f}s TOTAL={dt()}")
+        _precompute_timeline(db, t.id)
+        release_run(t.id)
+        _progress(t, "done", dt, cached=True)
+        return True
+    db.commit()
+    logger.info(f"[jobs] analysis cache MISS hash={t.audio_hash[:12]} sr/duration COMMIT ok dt={time.time()-s:.2f}s total={dt()}")
+
+    if settings.JOB_DB_READBACK:
+        # (디버그) 커밋 값 즉시 재확인 (다른 세션 가시성 이슈 추적용)
+        row = db.execute(
+            text("SELECT sample_rate, duration_ms FROM track WHERE id=:id"),
+            {"id": t.id},
+        ).fetchone()
+        logger.info(f"[jobs] readback sr={getattr(row,'sample_rate',None)} dur={getattr(row,'duration_ms',None)} total={dt()}")
+    _progress(t, "prepare", dt, durationMs=t.duration_ms)
+    return False
+
+
+@stage_timer("beats")
+def _analyze_beats(db, t: Track, audio: AudioBufferCache, dt):
+    """비트/위상/8카운트 분석 후 Analysis 저장 (커밋되는 순간 BPM/비트 그리드 조회 가능). Returns: (analysis, counts)"""
+    # 3) 비트/온셋/위상/8카운트 분석
+    s = time.time()
+    wav_path, sr = get_storage().local_path(t.file_path), t.sample_rate
+    logger.info(f"[jobs] compute_beat_grid START")
+    track_buf = audio.get(wav_path, sr=sr, mono=True)  # sr이 같으면 리샘플 없음
+    beat = compute_beat_grid(wav_path, sr, y=track_buf.array())
+    logger.info(
+        f"[jobs] compute_beat_grid DONE bpm={beat.bpm:.2f} "
+        f"beats={len(beat.beat_times)} conf={beat.confidence:.3f} "
+        f"dt={time.time()-s:.2f}s total={dt()}"
+    )
+
+    s = time.time()
+    phase = estimate_phase_shift(beat.beat_times, beat.onset_times)
+    counts = map_to_8count_array(beat.beat_times, phase)
+    measures = int(counts["measure"].max()) + 1 if len(counts) else 0
+    logger.info(
+        f"[jobs] phase/counts DONE phase={phase:.4f}s counts={len(counts)} measures={measures} "
+        f"dt={time.time()-s:.2f}s total={dt()}"
+    )
+
+    # 4) Analysis 저장
+    s = time.time()
+    analysis = Analysis(
+        track_id=t.id,
+        bpm=beat.bpm,
+        beat_confidence=beat.confidence,
+        beat_phase_shift_ms=int(phase * 1000),
+        measures=measures,
+        pipeline_version=pipeline_version(),
+        beat_grid=pack_beats(counts),  # 비트 그리드 전체를 한 컬럼에 (타임라인이 그대로 사용)
+    )
+    db.add(analysis)
+    db.commit()
+    logger.info(f"[jobs] analysis INSERT COMMIT ok id={analysis.id} dt={time.time()-s:.2f}s total={dt()}")
+    _progress(t, "beats", dt, analysisId=analysis.id, bpm=round(beat.bpm, 2))
+    return analysis, counts
+
+
+@stage_timer("separate")
+def _separate(db, t: Track, audio: AudioBufferCache, dt):
+    """stem 분리 + 피크 + Stem 저장. Returns: (stem_rows, onsets 또는 None)"""
+    # 5) Stem 분리 및 저장
+    s = time.time()
+    storage = get_storage()
+    wav_path, sr = storage.local_path(t.file_path), t.sample_rate
+    logger.info(f"[jobs] separate_stems START")
+    previews: Dict[str, bytes] = {}
+    onsets = None
+    if settings.DEMUCS_CHUNKED:
+        # 세그먼트 병렬 분리 + 청크가 나오는 대로 피크/onset 계산
+        lo, hi = STAGE_PERCENT["beats"], STAGE_PERCENT["separate"]
+        stems, previews, onsets = _separate_progressive(
+            wav_path, sr, audio, on_progress=lambda f: _progress(t, "separating", dt, percent=lo + (hi - lo) * f),
+        )
+    else:
+        stems: Dict[str, str] = separate_stems(wav_path)  # {"vocals": path, ...}
+    logger.info(f"[jobs] separate_stems DONE stems={list(stems.keys())} dt={time.time()-s:.2f}s total={dt()}")
+
+    stem_rows: dict[str, Stem] = {}
+    for name, path in stems.items():
+        s_each = time.time()
+        preview_bytes = previews.get(name)
+        if preview_bytes is None:
+            native = audio.get(path, sr=None, mono=True)
+            preview_bytes, _ = compute_stem_peaks(path, data=native.array(), sr=native.sr)  # 미리보기 + 줌 피라미드(.peaks)
+        # 분리 결과(WAV) + 피라미드를 저장소로 (flac/object면 압축/업로드, 피라미드는 ref 옆에)
+        ref = storage.store_audio(path)
+        storage.store_file(pyramid_path(path), pyramid_path(ref))
+        stem_rows[name] = Stem(track_id=t.id, stem_type=name, file_path=ref, peak_preview=preview_bytes)
+        logger.info(f"[jobs] stem peaks+store type={name} ref='{ref}' dt={time.time()-s_each:.2f}s total={dt()}")
+
+    # 전 stem을 한 트랜잭션으로 (flush로 id 확보 -> 이벤트 행이 참조)
+    s = time.time()
+    db.add_all(stem_rows.values())
+    db.commit()
+    logger.info(
+        f"[jobs] stems saved ids={[row.id for row in stem_rows.values()]} "
+        f"COMMIT ok dt={time.time()-s:.2f}s total={dt()}"
+    )
+    _progress(t, "separate", dt, stems=list(stem_rows))
+    return stem_rows, onsets
+
+
+@stage_timer("onsets")
+def _stem_onsets(stem_rows: Dict[str, Stem], sr: int, audio: AudioBufferCache) -> Dict[str, Onsets]:
+    storage = get_storage()
+    bufs = {name: audio.get(storage.local_path(row.file_path), sr=sr, mono=True) for name, row in stem_rows.items()}
+    return {name: (times, strength) for name, times, strength in iter_stem_onsets(bufs, sr)}
+
+
+@stage_timer("events")
+def _map_events(db, t: Track, analysis: Analysis, counts, stem_rows, onsets, audio: AudioBufferCache, dt) -> None:
+    # 6) Stem 이벤트 추출/8카운트 맵핑 (커밋은 _finish에서 완료 상태와 함께)
+    s = time.time()
+    sr = t.sample_rate
+    logger.info(f"[jobs] extract_events_and_map START")
+    storage = get_storage()
+    stem_bufs = {} if onsets is not None else {
+        name: audio.get(storage.local_path(row.file_path), sr=sr, mono=True) for name, row in stem_rows.items()
+    }
+    extract_events_and_map(db, analysis, counts, stem_bufs, stem_rows, sr, onsets=onsets)
+    logger.info(f"[jobs] extract_events_and_map DONE dt={time.time()-s:.2f}s total={dt()}")
+    _progress(t, "events", dt)
+
+
+@stage_timer("finish")
+def _finish(db, t: Track, dt) -> None:
+    # 7) 완료 (이벤트 + status=done을 한 트랜잭션으로)
+    s = time.time()
+    t.status = "done"
+    db.commit()
+    logger.info(f"[jobs] status=done COMMIT ok dt={time.time()-s:.2f}s TOTAL={dt()}")
+    _precompute_timeline(db, t.id)
+    release_run(t.id)
+    _progress(t, "done", dt)  # 타임라인 캐시까지 만든 뒤 (done을 받은 클라이언트의 첫 조회가 캐시 HIT)
+    logger.info(f"[jobs] track={t.id} COMPLETE total={dt()}")
+
+
+def _mark_failed(db, t: Optional[Track], dt) -> None:
+    try:
+        if t is not None:
+            db.rollback()
+            t.status = "failed"
+            db.commit()
+            logger.info(f"[jobs] status=failed COMMIT ok total={dt()}")
+            release_run(t.id)
+            _progress(t, "failed", dt)
+    except Exception:
+        logger.exception("[jobs] failed to mark track as failed")
+
+
 def analyze_track_job(track_id: int) -> None:
     """
-    RQ 워커에서 실행되는 '동기' 잡 함수.
+    RQ 워커에서 실행되는 '동기' 잡 함수 (ANALYSIS_PIPELINE="single": 한 워커에서 전 단계 순서대로).
     각 단계 전/후로 상세 로그와 경과 시간을 남긴다.
     """
     db = _Session()
+    audio = AudioBufferCache()  # 같은 파일은 잡 안에서 한 번만 디코딩 (memmap)
     t: Track | None = None
-    t0 = time.time()
-
-    def dt() -> str:
-        return f"{time.time() - t0:.2f}s"
+    dt = _Clock()
 
     try:
         logger.info(f"[jobs] track={track_id} START")
@@ -60,110 +314,168 @@ def analyze_track_job(track_id: int) -> None:
         if not t:
             logger.error(f"[jobs] Track {track_id} not found — ABORT total={dt()}")
             return
+        if not owns_run(track_id):
+            logger.warning(f"[jobs] track={track_id} already being analyzed by another run — SKIP total={dt()}")
+            return
 
-        # 1) 상태 전이: queued -> processing
-        s = time.time()
-        t.status = "processing"
-        db.commit()
-        logger.info(f"[jobs] status=processing COMMIT ok dt={time.time()-s:.2f}s total={dt()}")
+        if _prepare(db, t, dt):
+            return
+        analysis, counts = _analyze_beats(db, t, audio, dt)
+        stem_rows, onsets = _separate(db, t, audio, dt)
+        _map_events(db, t, analysis, counts, stem_rows, onsets, audio, dt)
+        _finish(db, t, dt)
 
-        # 2) 입력 보장 (WAV 생성/샘플레이트/길이 저장)
-        s = time.time()
-        logger.info(f"[jobs] ensure_wav START src='{t.file_path}'")
-        wav_path, sr, duration_ms = ensure_wav(t.file_path)
-        logger.info(
-            f"[jobs] ensure_wav DONE out='{wav_path}' sr={sr} dur={duration_ms}ms "
-            f"dt={time.time()-s:.2f}s total={dt()}"
-        )
+    except Exception as e:
+        logger.exception(f"[jobs] analyze_track_job FAILED: {e} total={dt()}")
+        _mark_failed(db, t, dt)
+        raise
+    finally:
+        audio.close()
+        db.close()
 
-        s = time.time()
-        t.sample_rate = sr
-        t.duration_ms = duration_ms
-        db.commit()
-        logger.info(f"[jobs] sample_rate/duration COMMIT ok dt={time.time()-s:.2f}s total={dt()}")
 
-        # (선택) 커밋 값 즉시 재확인 (다른 세션 가시성 이슈 추적용)
-        row = db.execute(
-            text("SELECT sample_rate, duration_ms FROM track WHERE id=:id"),
-            {"id": t.id},
-        ).fetchone()
-        logger.info(f"[jobs] readback sr={getattr(row,'sample_rate',None)} dur={getattr(row,'duration_ms',None)} total={dt()}")
+# ── DAG 단계 잡 (ANALYSIS_PIPELINE="dag", queue.enqueue_analyses) ──────
+#   prepare ─┬─ beats    (light 큐) ─┬─ join (light 큐: 이벤트 매핑 + 완료)
+#            └─ separate (heavy 큐) ─┘
+# beats가 커밋되면 separate가 끝나기 전에도 BPM/비트 그리드를 조회할 수 있다.
+# 앞 단계가 실패(failed)하거나 캐시 HIT(done)면 뒤 단계는 processing이 아니므로 건너뛴다.
 
-        # 3) 비트/온셋/위상/8카운트 분석
-        s = time.time()
-        logger.info(f"[jobs] compute_beat_grid START")
-        beat = compute_beat_grid(wav_path, sr)
-        logger.info(
-            f"[jobs] compute_beat_grid DONE bpm={beat.bpm:.2f} "
-            f"beats={len(beat.beat_times)} conf={beat.confidence:.3f} "
-            f"dt={time.time()-s:.2f}s total={dt()}"
-        )
+def _run_stage(name: str, track_id: int, fn, require_processing: bool = True):
+    db = _Session()
+    audio = AudioBufferCache()
+    t: Track | None = None
+    dt = _Clock()
 
-        s = time.time()
-        phase = estimate_phase_shift(beat.beat_times, beat.onset_times)
-        counts = map_to_8count(beat.beat_times, phase)
-        measures = (max(c[3] for c in counts) + 1) if counts else 0
-        logger.info(
-            f"[jobs] phase/counts DONE phase={phase:.4f}s counts={len(counts)} measures={measures} "
-            f"dt={time.time()-s:.2f}s total={dt()}"
-        )
+    try:
+        logger.info(f"[jobs] track={track_id} stage={name} START")
+        t = db.get(Track, track_id)
+        if not t:
+            logger.error(f"[jobs] Track {track_id} not found — ABORT total={dt()}")
+            return None
+        if require_processing and t.status != "processing":
+            logger.info(f"[jobs] track={track_id} stage={name} SKIP status={t.status}")
+            return None
+        if not owns_run(track_id):
+            logger.warning(f"[jobs] track={track_id} stage={name} already being analyzed by another run — SKIP")
+            return None
+        result = fn(db, t, audio, dt)
+        logger.info(f"[jobs] track={track_id} stage={name} DONE total={dt()}")
+        return result
+    except Exception as e:
+        logger.exception(f"[jobs] stage={name} FAILED: {e} total={dt()}")
+        _mark_failed(db, t, dt)
+        raise
+    finally:
+        audio.close()
+        db.close()
 
-        # 4) Analysis 저장
-        s = time.time()
-        analysis = Analysis(
-            track_id=t.id,
-            bpm=beat.bpm,
-            beat_confidence=beat.confidence,
-            beat_phase_shift_ms=int(phase * 1000),
-            measures=measures,
-        )
-        db.add(analysis)
-        db.flush()   # PK 필요시 확보
-        db.commit()
-        logger.info(f"[jobs] analysis INSERT COMMIT ok id={analysis.id} dt={time.time()-s:.2f}s total={dt()}")
 
-        # 5) Stem 분리 및 저장
-        s = time.time()
-        logger.info(f"[jobs] separate_stems START")
-        stems: Dict[str, str] = separate_stems(wav_path)  # {"vocals": path, ...}
-        logger.info(f"[jobs] separate_stems DONE stems={list(stems.keys())} dt={time.time()-s:.2f}s total={dt()}")
-
-        stem_rows: dict[str, Stem] = {}
-        for name, path in stems.items():
-            s_each = time.time()
-            preview_bytes = compute_peak_preview(path)
-            srow = Stem(track_id=t.id, stem_type=name, file_path=path, peak_preview=preview_bytes)
-            db.add(srow)
-            db.flush()
-            db.commit()
-            stem_rows[name] = srow
-            logger.info(
-                f"[jobs] stem saved type={name} id={srow.id} "
-                f"dt={time.time()-s_each:.2f}s total={dt()}"
-            )
+def _dependency_result(job_id: Optional[str]):
+    """앞 단계 잡의 반환값 (만료/없음이면 None -> DB에서 다시 찾는다)"""
+    if not job_id:
+        return None
+    try:
+        return Job.fetch(job_id, connection=get_redis()).return_value()
+    except Exception:
+        logger.warning(f"[jobs] dependency result unavailable job={job_id}")
+        return None
 
-        # 6) Stem 이벤트 추출/8카운트 맵핑
-        s = time.time()
-        logger.info(f"[jobs] extract_events_and_map START")
-        extract_events_and_map(db, analysis, counts, stems, stem_rows, sr)
-        logger.info(f"[jobs] extract_events_and_map DONE dt={time.time()-s:.2f}s total={dt()}")
 
-        # 7) 완료
+def prepare_stage_job(track_id: int) -> bool:
+    """Returns: 결과 캐시 HIT 여부"""
+    return bool(_run_stage("prepare", track_id, lambda db, t, audio, dt: _prepare(db, t, dt), require_processing=False))
+
+
+def beat_stage_job(track_id: int) -> Optional[int]:
+    """Returns: analysis id"""
+    def run(db, t, audio, dt):
+        analysis, _ = _analyze_beats(db, t, audio, dt)
+        return analysis.id
+    return _run_stage("beats", track_id, run)
+
+
+def separate_stage_job(track_id: int) -> Optional[dict]:
+    """
+    분리 + 피크 + onset까지 (모두 비트 그리드와 무관).
+    Returns: {"stems": {stem_type: stem_id}, "onsets": {stem_type: (times, strength)}}
+    """
+    def run(db, t, audio, dt):
+        stem_rows, onsets = _separate(db, t, audio, dt)
+        if onsets is None:
+            s = time.time()
+            onsets = _stem_onsets(stem_rows, t.sample_rate, audio)
+            logger.info(f"[jobs] stem onsets DONE dt={time.time()-s:.2f}s total={dt()}")
+            _progress(t, "onsets", dt)
+        return {"stems": {name: row.id for name, row in stem_rows.items()}, "onsets": onsets}
+    return _run_stage("separate", track_id, run)
+
+
+def join_stage_job(track_id: int, beat_job_id: Optional[str] = None, separate_job_id: Optional[str] = None) -> None:
+    """두 갈래가 끝난 뒤 이벤트 매핑 + 완료 처리"""
+    def run(db, t, audio, dt):
+        analysis_id = _dependency_result(beat_job_id)
+        analysis = db.get(Analysis, analysis_id) if analysis_id else db.execute(
+            select(Analysis).where(Analysis.track_id == t.id).order_by(Analysis.id.desc()).limit(1)
+        ).scalar_one()
+        counts = unpack_counts(analysis.beat_grid)
+
+        separated = _dependency_result(separate_job_id) or {}
+        if separated.get("stems"):
+            stem_rows = {name: db.get(Stem, stem_id) for name, stem_id in separated["stems"].items()}
+        else:
+            stem_rows = {}
+            for row in db.execute(select(Stem).where(Stem.track_id == t.id).order_by(Stem.id)).scalars():
+                stem_rows[row.stem_type] = row  # stem_type별 최신
+        _map_events(db, t, analysis, counts, stem_rows, separated.get("onsets"), audio, dt)
+        _finish(db, t, dt)
+    _run_stage("join", track_id, run)
+
+
+def ingest_youtube_job(track_id: int, url: str, analyze: bool = False) -> None:
+    """
+    YouTube 다운로드 -> canonical WAV (yt-dlp 오디오 후처리로 바로 생성) -> 해시/결과 캐시 확인.
+    analyze=True 이고 캐시 미스면 분석 잡을 이어서 큐잉한다.
+    """
+    db = _Session()
+    t: Track | None = None
+    t0 = time.time()
+
+    def dt() -> str:
+        return f"{time.time() - t0:.2f}s"
+
+    try:
+        logger.info(f"[jobs] youtube track={track_id} START url='{url}'")
+        t = db.get(Track, track_id)
+        if not t:
+            logger.error(f"[jobs] Track {track_id} not found — ABORT total={dt()}")
+            return
+
         s = time.time()
-        t.status = "done"
+        wav_path, title = download_youtube_wav(url, os.path.join(tracks_dir(), str(track_id)))
+        logger.info(f"[jobs] youtube download+convert DONE out='{wav_path}' dt={time.time()-s:.2f}s total={dt()}")
+
+        t.title = title[:255]
+        t.audio_hash = hash_wav(wav_path)
+        t.file_path = get_storage().store_audio(wav_path)
+        t.status = "pending"
+        cached = clone_cached_analysis(db, t, t.audio_hash) is not None
         db.commit()
-        logger.info(f"[jobs] status=done COMMIT ok dt={time.time()-s:.2f}s TOTAL={dt()}")
-        logger.info(f"[jobs] track={t.id} COMPLETE total={dt()}")
+        logger.info(f"[jobs] youtube track={track_id} READY cached={cached} total={dt()}")
+
+        if analyze and not cached:
+            t.status = "queued"
+            db.commit()
+            job = enqueue_analysis(track_id)
+            logger.info(f"[jobs] youtube track={track_id} analysis queued job={job.id} total={dt()}")
 
     except Exception as e:
-        logger.exception(f"[jobs] analyze_track_job FAILED: {e} total={dt()}")
+        logger.exception(f"[jobs] ingest_youtube_job FAILED: {e} total={dt()}")
         try:
             if t is not None:
                 t.status = "failed"
                 db.commit()
-                logger.info(f"[jobs] status=failed COMMIT ok total={dt()}")
         except Exception:
             logger.exception("[jobs] failed to mark track as failed")
         raise
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
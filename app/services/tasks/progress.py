@@ -0,0 +1,120 @@
+"""
+분석 진행 이벤트 (Redis pub/sub)
+
+워커: publish_progress() -> 채널 beatmap:progress:{track_id} 로 PUBLISH + 마지막 이벤트를 키에 저장
+API : stream_progress() -> 마지막 이벤트부터 SSE로 흘려보냄 (DB 조회 없음)
+
+이벤트: {"trackId", "stage", "percent", "elapsed", ...추가 필드}
+stage가 done/failed면 스트림 종료.
+"""
+import asyncio, json, time
+from typing import AsyncIterator, Optional
+
+from app.core.config import settings
+from app.core.logging import logger
+from app.core.metrics import redis_timer
+from app.core.redis import get_redis
+
+# 단계별 전체 진행률 (DAG에서는 beats/separate가 동시에 돌아 순서가 섞일 수 있음)
+STAGE_PERCENT = {
+    "queued": 0,
+    "processing": 2,
+    "prepare": 10,
+    "beats": 30,
+    "separate": 75,
+    "onsets": 85,
+    "events": 95,
+    "done": 100,
+    "failed": 100,
+}
+TERMINAL_STAGES = ("done", "failed")
+
+# 마지막 이벤트 보관 시간 (늦게 붙은 클라이언트가 현재 상태를 바로 받도록)
+PROGRESS_TTL_S = 24 * 3600
+# SSE 연결 유지용 주석 라인 간격
+HEARTBEAT_S = 15.0
+
+
+def progress_channel(track_id: int) -> str:
+    return f"beatmap:progress:{track_id}"
+
+
+def progress_key(track_id: int) -> str:
+    return f"beatmap:progress:last:{track_id}"
+
+
+def progress_event(track_id: int, stage: str, elapsed: float = 0.0, percent: Optional[float] = None, **extra) -> dict:
+    return {
+        "trackId": track_id,
+        "stage": stage,
+        "percent": STAGE_PERCENT.get(stage, 0) if percent is None else round(percent, 1),
+        "elapsed": round(elapsed, 3),
+        "ts": round(time.time(), 3),
+        **extra,
+    }
+
+
+def publish_progress(
+    track_id: int, stage: str, elapsed: float = 0.0, percent: Optional[float] = None, pipeline=None, **extra
+) -> None:
+    """
+    SET(마지막 이벤트) + PUBLISH를 한 번의 왕복으로. 진행 이벤트 실패가 잡을 막으면 안 됨
+    pipeline: 호출자의 Redis 파이프라인에 명령만 추가 (실행은 호출자)
+    """
+    if not settings.PROGRESS_EVENTS:
+        return
+    payload = json.dumps(progress_event(track_id, stage, elapsed, percent, **extra))
+    if pipeline is not None:
+        pipeline.set(progress_key(track_id), payload, ex=PROGRESS_TTL_S)
+        pipeline.publish(progress_channel(track_id), payload)
+        return
+    try:
+        with redis_timer("progress"):
+            pipe = get_redis().pipeline(transaction=False)
+            pipe.set(progress_key(track_id), payload, ex=PROGRESS_TTL_S)
+            pipe.publish(progress_channel(track_id), payload)
+            pipe.execute()
+    except Exception:
+        logger.warning(f"[progress] publish failed track={track_id} stage={stage}")
+
+
+def sse_message(data: str, event: str = "progress") -> str:
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+def _is_terminal(data: str) -> bool:
+    try:
+        return json.loads(data).get("stage") in TERMINAL_STAGES
+    except ValueError:
+        return False
+
+
+async def stream_progress(track_id: int, aredis, heartbeat_s: float = HEARTBEAT_S) -> AsyncIterator[str]:
+    """
+    SSE 메시지 제너레이터. aredis: redis.asyncio 클라이언트
+    구독을 먼저 건 뒤 마지막 이벤트를 읽어 그 사이 이벤트를 놓치지 않는다.
+    """
+    pubsub = aredis.pubsub()
+    await pubsub.subscribe(progress_channel(track_id))
+    try:
+        last = await aredis.get(progress_key(track_id))
+        if last is not None:
+            last = last.decode() if isinstance(last, bytes) else last
+            yield sse_message(last)
+            if _is_terminal(last):
+                return
+        while True:
+            msg = await pubsub.get_message(ignore_subscribe_messages=True, timeout=heartbeat_s)
+            if msg is None:
+                yield ": keep-alive\n\n"
+                continue
+            data = msg["data"].decode() if isinstance(msg["data"], bytes) else msg["data"]
+            yield sse_message(data)
+            if _is_terminal(data):
+                return
+    finally:
+        try:
+            await pubsub.unsubscribe(progress_channel(track_id))
+            await pubsub.aclose()
+        except Exception:
+            logger.warning(f"[progress] pubsub close failed track={track_id}")
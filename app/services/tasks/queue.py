@@ -0,0 +1,195 @@
+from typing import Dict, Iterable, List, Optional
+
+from rq import Queue
+from rq.job import Dependency, Job, JobStatus
+
+from app.core.config import settings
+from app.core.metrics import redis_timer
+from app.core.redis import get_redis
+from app.core.tracing import current_trace_id
+from app.services.tasks.progress import publish_progress
+from app.services.tasks.singleflight import claim_analyses, release_analyses
+
+# 큐 객체는 처음 쓸 때 만든다 (임포트만으로 Redis 클라이언트를 만들지 않게)
+#   queue / heavy_queue / low_queue / heavy_low_queue 속성으로도 접근 가능 (모듈 __getattr__)
+_QUEUE_SETTINGS = {
+    "queue": "RQ_QUEUE",
+    "heavy_queue": "RQ_HEAVY_QUEUE",
+    "low_queue": "RQ_LOW_QUEUE",
+    "heavy_low_queue": "RQ_HEAVY_LOW_QUEUE",
+}
+_queues: Dict[str, Queue] = {}
+
+
+def get_queue(name: str) -> Queue:
+    if name not in _queues:
+        _queues[name] = Queue(name, connection=get_redis())
+    return _queues[name]
+
+
+def analysis_queues() -> List[Queue]:
+    return [get_queue(getattr(settings, key)) for key in _QUEUE_SETTINGS.values()]
+
+
+def __getattr__(attr: str) -> Queue:
+    if attr in _QUEUE_SETTINGS:
+        return get_queue(getattr(settings, _QUEUE_SETTINGS[attr]))
+    raise AttributeError(f"module {__name__!r} has no attribute {attr!r}")
+
+# 분석 잡 공통 옵션 (Queue.create_job 인자)
+ANALYSIS_JOB_OPTS = dict(
+    timeout=60 * 30,
+    result_ttl=60 * 60,  # 선택: 결과 보존 1h
+    failure_ttl=24 * 60 * 60,  # 선택: 실패 보존 1d
+)
+
+# high: 모든 단계를 큐 맨 앞에 | normal | low: RQ_LOW_QUEUE + RQ_HEAVY_LOW_QUEUE
+#   (대량 재분석이 개별 요청을 밀어내지 않게, stem 분리 단계까지)
+PRIORITIES = ("high", "normal", "low")
+
+
+# 잡 함수는 경로 문자열로 지정 (jobs.py <-> queue.py 순환 임포트 방지)
+ANALYZE_TRACK_JOB = "app.services.tasks.jobs.analyze_track_job"
+INGEST_YOUTUBE_JOB = "app.services.tasks.jobs.ingest_youtube_job"
+PREPARE_STAGE_JOB = "app.services.tasks.jobs.prepare_stage_job"
+BEAT_STAGE_JOB = "app.services.tasks.jobs.beat_stage_job"
+SEPARATE_STAGE_JOB = "app.services.tasks.jobs.separate_stage_job"
+JOIN_STAGE_JOB = "app.services.tasks.jobs.join_stage_job"
+
+
+def _analysis_jobs(
+    track_id: int,
+    light: Queue,
+    opts: dict,
+    run_id: Optional[str] = None,
+    trace_id: Optional[str] = None,
+    heavy: Optional[Queue] = None,
+    at_front: bool = False,
+):
+    """
+    트랙 하나의 잡들을 만든다 (아직 Redis에 쓰지 않음). Returns: (바로 큐잉할 잡, 대기 잡들, 완료 기준 잡)
+    run_id: single-flight run id = 완료 기준 잡의 id. 모든 단계 잡의 meta["run_id"]로 전달
+    trace_id: 요청 trace id -> meta["trace_id"] (워커 로그에 찍힘)
+    heavy: separate 단계 큐 (기본 RQ_HEAVY_QUEUE)
+    at_front: 대기 잡도 앞 잡이 끝나 큐잉될 때 큐 맨 앞으로 (priority="high")
+
+    ANALYSIS_PIPELINE="dag":
+      prepare ─┬─ beats    (light)       ─┬─ join (light)
+               └─ separate (heavy)       ─┘
+      beats와 separate는 서로 다른 워커에서 동시에 돈다.
+    "single": analyze_track_job 하나
+    """
+    meta = {k: v for k, v in (("run_id", run_id), ("trace_id", trace_id)) if v} or None
+    if settings.ANALYSIS_PIPELINE != "dag":
+        job = light.create_job(
+            ANALYZE_TRACK_JOB, args=(track_id,), job_id=run_id, meta=meta, description=f"analyze track {track_id}", **opts
+        )
+        return job, [], job
+
+    def stage(q: Queue, func: str, name: str, args=(), depends_on=None, job_id=None) -> Job:
+        if depends_on is not None and at_front:
+            depends_on = Dependency(depends_on if isinstance(depends_on, list) else [depends_on], enqueue_at_front=True)
+        return q.create_job(
+            func,
+            args=(track_id, *args),
+            depends_on=depends_on,
+            job_id=job_id,
+            meta=meta,
+            status=JobStatus.DEFERRED if depends_on else JobStatus.QUEUED,
+            description=f"analyze track {track_id}: {name}",
+            **opts,
+        )
+
+    prepare = stage(light, PREPARE_STAGE_JOB, "prepare")
+    beats = stage(light, BEAT_STAGE_JOB, "beats", depends_on=prepare)
+    separate = stage(heavy or get_queue(settings.RQ_HEAVY_QUEUE), SEPARATE_STAGE_JOB, "separate", depends_on=prepare)
+    join = stage(
+        light, JOIN_STAGE_JOB, "join", args=(beats.id, separate.id), depends_on=[beats, separate], job_id=run_id
+    )
+    return prepare, [beats, separate, join], join
+
+
+def enqueue_analyses(
+    track_ids: Iterable[int],
+    priority: str = "normal",
+    run_ids: Optional[Dict[int, str]] = None,
+    trace_id: Optional[str] = None,
+    **kwargs,
+) -> Dict[int, Job]:
+    """
+    여러 트랙의 분석 잡을 Redis 파이프라인 한 번(MULTI/EXEC)으로 큐잉 + 진행 이벤트 queued 발행.
+    대기 잡은 rq와 같은 방식(의존 잡의 dependents 집합 + DeferredJobRegistry)으로 등록하고,
+    앞 잡이 끝나면 워커가 이어서 큐잉한다. 한 트랜잭션이라 prepare가 먼저 끝나도 대기 잡을 놓치지 않는다.
+
+    run_ids: claim_analyses()로 이미 잡은 {track_id: run_id} (API는 DB 상태를 바꾸기 전에 먼저 잡는다).
+             없으면 여기서 잡고, 이미 분석 중인 트랙은 새로 큐잉하지 않고 기존 잡을 돌려준다.
+    trace_id: 없으면 현재 컨텍스트(API 요청/실행 중인 잡)의 trace id
+    Returns: {track_id: 완료 기준 잡 (단일 잡 또는 join)}
+    """
+    if priority not in PRIORITIES:
+        raise ValueError(f"unknown priority {priority!r}")
+    opts = {**ANALYSIS_JOB_OPTS, **kwargs}
+    light = get_queue(settings.RQ_LOW_QUEUE if priority == "low" else settings.RQ_QUEUE)
+    heavy = get_queue(settings.RQ_HEAVY_LOW_QUEUE if priority == "low" else settings.RQ_HEAVY_QUEUE)
+    at_front = priority == "high"
+    trace_id = trace_id or current_trace_id()
+
+    existing: Dict[int, str] = {}
+    if run_ids is None:
+        run_ids, existing = claim_analyses(track_ids)
+
+    heads, deferred, out = [], [], {}
+    for track_id, run_id in run_ids.items():
+        head, waiting, final = _analysis_jobs(track_id, light, opts, run_id, trace_id, heavy, at_front)
+        heads.append(head)
+        deferred.extend(waiting)
+        out[track_id] = final
+    if existing:
+        for track_id, job in zip(existing, Job.fetch_many(list(existing.values()), connection=get_redis())):
+            if job is not None:
+                out[track_id] = job
+    if not heads:
+        return out
+
+    try:
+        _enqueue_pipeline(light, heavy, heads, deferred, [j.args[0] for j in heads], at_front)
+    except Exception:
+        release_analyses(run_ids)
+        raise
+    return out
+
+
+def _enqueue_pipeline(light: Queue, heavy: Queue, heads, deferred, track_ids, at_front: bool) -> None:
+    with redis_timer("enqueue"), get_redis().pipeline() as pipe:
+        pipe.multi()
+        for track_id in track_ids:
+            # 이전 실행의 done 이벤트를 queued로 덮는다 (워커의 processing보다 먼저)
+            publish_progress(track_id, "queued", pipeline=pipe)
+        for q in {light, heavy} if deferred else {light}:
+            pipe.sadd(q.redis_queues_keys, q.key)
+        for job in deferred:
+            job.register_dependency(pipeline=pipe)
+            job.save(pipeline=pipe)
+        for job in heads:
+            light.enqueue_job(job, pipeline=pipe, at_front=at_front)
+        pipe.execute()
+
+
+def enqueue_analysis(track_id: int, priority: str = "normal", **kwargs) -> Job:
+    """ANALYSIS_PIPELINE에 따라 단계 DAG 또는 단일 잡. 반환 잡이 끝나면 분석 완료"""
+    return enqueue_analyses([track_id], priority, **kwargs)[track_id]
+
+
+def enqueue_youtube_ingest(track_id: int, url: str, analyze: bool = False) -> Job:
+    trace_id = current_trace_id()
+    return get_queue(settings.RQ_QUEUE).enqueue(
+        INGEST_YOUTUBE_JOB,
+        track_id,
+        url,
+        analyze,
+        job_timeout=60 * 15,
+        result_ttl=60 * 60,
+        failure_ttl=24 * 60 * 60,
+        description=f"youtube ingest track {track_id}",
+        meta={"trace_id": trace_id} if trace_id else None,
+    )
@@ -0,0 +1,145 @@
+"""
+트랙별 분석 single-flight (Redis)
+
+beatmap:analysis:inflight:{track_id} = run id (완료 기준 잡 id: 단일 잡 또는 DAG의 join)
+- API   : claim_analyses()로 먼저 잡은 트랙만 큐잉, 이미 진행 중이면 기존 run id를 돌려준다
+- 워커  : 단계 잡마다 owns_run()으로 확인, 다른 run이 살아 있으면 실행하지 않는다
+- 완료/실패/캐시 HIT 때 release_run()으로 해제 (값이 자기 run id일 때만 삭제)
+run id가 가리키는 잡이 없거나 끝난 상태면 (워커 강제 종료 등) 남은 키는 무시하고 새로 잡는다.
+join이 대기(DEFERRED) 중인데 앞 단계가 실패/중단/취소됐거나 살아 있는 앞 단계가 없으면
+rq가 join을 영영 큐잉하지 않으므로 역시 끝난 run으로 본다.
+"""
+from typing import Dict, Iterable, Optional, Tuple
+from uuid import uuid4
+
+from rq import get_current_job
+from rq.exceptions import NoSuchJobError
+from rq.job import Job, JobStatus
+
+from app.core.logging import logger
+from app.core.metrics import redis_timer
+from app.core.redis import get_redis
+
+# 단계 잡 타임아웃 합 + 큐 대기 여유. 정상 경로는 완료/실패 때 바로 해제된다
+INFLIGHT_TTL_S = 6 * 3600
+
+_DONE_STATUSES = (JobStatus.FINISHED, JobStatus.FAILED, JobStatus.STOPPED, JobStatus.CANCELED)
+_DEAD_STATUSES = (JobStatus.FAILED, JobStatus.STOPPED, JobStatus.CANCELED)
+
+# 값이 ARGV[1]일 때만 삭제 / ARGV[2]로 교체 (EVALSHA, 스크립트 객체는 처음 쓸 때 만든다)
+_RELEASE_LUA = "if redis.call('GET', KEYS[1]) == ARGV[1] then return redis.call('DEL', KEYS[1]) end return 0"
+_REPLACE_LUA = (
+    "if redis.call('GET', KEYS[1]) == ARGV[1] then "
+    "redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3]) return 1 end return 0"
+)
+_scripts = {}
+
+
+def _script(lua: str):
+    if lua not in _scripts:
+        _scripts[lua] = get_redis().register_script(lua)
+    return _scripts[lua]
+
+
+def inflight_key(track_id: int) -> str:
+    return f"beatmap:analysis:inflight:{track_id}"
+
+
+def _decode(v) -> Optional[str]:
+    return v.decode() if isinstance(v, bytes) else v
+
+
+def _job_alive(job: Job, status: Optional[JobStatus] = None) -> bool:
+    status = status or job.get_status()
+    if status in _DONE_STATUSES:
+        return False
+    if status != JobStatus.DEFERRED:
+        return True
+    # 대기 잡: 앞 단계 중 하나라도 실패/중단/취소면 큐잉되지 않는다.
+    # 없는 앞 단계는 끝나고 result_ttl이 지난 것일 수 있어 건너뛰되, 살아 있는 앞 단계가 하나는 있어야 한다
+    alive = False
+    for dep in job.fetch_dependencies():
+        dep_status = dep.get_status()
+        if dep_status in _DEAD_STATUSES:
+            return False
+        alive = alive or _job_alive(dep, dep_status)
+    return alive
+
+
+def run_alive(run_id: str) -> bool:
+    try:
+        return _job_alive(Job.fetch(run_id, connection=get_redis()))
+    except NoSuchJobError:
+        return False
+
+
+def claim_analyses(track_ids: Iterable[int]) -> Tuple[Dict[int, str], Dict[int, str]]:
+    """
+    트랙마다 새 run id로 SET NX (파이프라인 한 번). 이미 키가 있으면 그 run이 살아 있는지 확인.
+    Returns: (새로 잡은 {track_id: run_id}, 이미 진행 중인 {track_id: run_id})
+    """
+    wanted = {track_id: uuid4().hex for track_id in dict.fromkeys(track_ids)}
+    if not wanted:
+        return {}, {}
+    with redis_timer("claim"), get_redis().pipeline(transaction=False) as pipe:
+        for track_id, run_id in wanted.items():
+            pipe.set(inflight_key(track_id), run_id, nx=True, ex=INFLIGHT_TTL_S)
+            pipe.get(inflight_key(track_id))
+        replies = pipe.execute()
+
+    claimed, existing = {}, {}
+    for (track_id, run_id), ok, current in zip(wanted.items(), replies[::2], replies[1::2]):
+        current = _decode(current)
+        if ok:
+            claimed[track_id] = run_id
+        elif current is not None and run_alive(current):
+            existing[track_id] = current
+        elif current is not None and _script(_REPLACE_LUA)(keys=[inflight_key(track_id)], args=[current, run_id, INFLIGHT_TTL_S]):
+            logger.warning(f"[singleflight] stale run={current} track={track_id} replaced")
+            claimed[track_id] = run_id
+        else:  # 그 사이 해제됐거나 다른 요청이 먼저 잡음 -> 한 번 더
+            c, e = claim_analyses([track_id])
+            claimed.update(c)
+            existing.update(e)
+    return claimed, existing
+
+
+def release_analyses(claims: Dict[int, str]) -> None:
+    for track_id, run_id in claims.items():
+        _script(_RELEASE_LUA)(keys=[inflight_key(track_id)], args=[run_id])
+
+
+def current_run_id() -> Optional[str]:
+    """RQ 잡 안이면 그 잡의 run id (meta), 아니면 None (직접 호출/이전 버전 잡 -> 검사 안 함)"""
+    job = get_current_job()
+    return job.meta.get("run_id") if job is not None else None
+
+
+def owns_run(track_id: int) -> bool:
+    """현재 잡의 run이 이 트랙의 single-flight 소유자인지. 소유자면 TTL 연장"""
+    run_id = current_run_id()
+    if run_id is None:
+        return True
+    key = inflight_key(track_id)
+    redis_conn = get_redis()
+    if redis_conn.set(key, run_id, nx=True, ex=INFLIGHT_TTL_S):
+        return True  # TTL 만료 등으로 비어 있었음
+    current = _decode(redis_conn.get(key))
+    if current == run_id:
+        redis_conn.expire(key, INFLIGHT_TTL_S)
+        return True
+    if current is not None and not run_alive(current) and _script(_REPLACE_LUA)(keys=[key], args=[current, run_id, INFLIGHT_TTL_S]):
+        return True
+    logger.warning(f"[singleflight] track={track_id} is owned by run={current}, refusing run={run_id}")
+    return False
+
+
+def release_run(track_id: int) -> None:
+    """현재 잡의 run이 잡고 있는 키 해제 (실패해도 TTL로 풀리므로 경고만)"""
+    run_id = current_run_id()
+    if run_id is None:
+        return
+    try:
+        release_analyses({track_id: run_id})
+    except Exception:
+        logger.warning(f"[singleflight] release failed track={track_id} run={run_id}")
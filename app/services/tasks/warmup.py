@@ -0,0 +1,92 @@
+"""
+워커 웜업: 잡을 받기 전에 오디오 스택을 임포트하고 짧은 합성 신호로 한 번 돌려
+librosa/numba 지연 임포트와 JIT 컴파일을 부모 프로세스에서 끝낸다.
+fork된 잡 프로세스(work horse)와 pre-fork된 워커는 이 상태를 그대로 물려받는다.
+"""
+import time
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.logging import logger
+
+
+def noise_burst(sr: int, seed: int = 0, ms: float = 20.0, decay: float = 8.0) -> np.ndarray:
+    """지수 감쇠 노이즈 버스트 (클릭 한 번, 결정적)"""
+    rng = np.random.default_rng(seed)
+    n = max(1, int(sr * ms / 1000))
+    return (rng.standard_normal(n) * np.exp(-np.linspace(0, decay, n))).astype(np.float32)
+
+
+def place_bursts(y: np.ndarray, starts: np.ndarray, burst: np.ndarray, gains: np.ndarray) -> None:
+    """y[start:]에 burst * gain을 더한다 (끝을 넘는 버스트는 잘라서)"""
+    for start, g in zip(starts.tolist(), gains.tolist()):
+        end = min(len(y), start + len(burst))
+        if start < end:
+            y[start:end] += g * burst[: end - start]
+
+
+def click_track(
+    sr: int, seconds: float = 4.0, bpm: float = 120.0, seed: int = 0, accents: Optional[Sequence[float]] = None
+) -> np.ndarray:
+    """
+    비트마다 noise_burst가 있는 합성 신호 (결정적). benchmarks/synth.py도 이 함수로 만든다.
+    accents: 마디 안 비트별 게인을 반복 적용 (예: (1.0, 0.6, 0.6, 0.6)), None이면 모두 1
+    """
+    y = np.zeros(int(sr * seconds), dtype=np.float32)
+    starts = np.arange(0, len(y), sr * 60.0 / bpm).astype(np.int64)
+    place_bursts(y, starts, noise_burst(sr, seed), np.resize(accents if accents is not None else (1.0,), len(starts)))
+    return y
+
+
+def warm_up(preload_demucs: bool = None) -> Dict[str, float]:
+    """
+    잡 경로에서 처음 호출되는 DSP 함수들을 한 번씩 실행. Returns: 단계별 소요 시간(초)
+    preload_demucs: 상주 Demucs 모델까지 미리 로드 (None이면 settings.WORKER_PRELOAD_DEMUCS)
+    """
+    timings: Dict[str, float] = {}
+
+    def step(name, fn):
+        s = time.perf_counter()
+        out = fn()
+        timings[name] = time.perf_counter() - s
+        return out
+
+    # 잡 모듈 임포트 = librosa/scipy/numba/soxr + 동기 DB 엔진 (연결은 맺지 않음)
+    step("import", lambda: __import__("app.services.tasks.jobs"))
+
+    from app.services.audio.analyze import compute_beat_grid, estimate_phase_shift
+    from app.services.audio.demucs import MODEL_SR, get_engine
+    from app.services.audio.events import OnsetAccumulator, _pick_onsets
+    from app.services.audio.grid import map_to_8count_array, snap_events
+    from app.services.audio.peaks import build_peak_pyramid
+
+    sr = settings.TARGET_SR
+    y = click_track(sr)
+    beat = step("beat_grid", lambda: compute_beat_grid("", sr, y=y))
+    phase = step("phase", lambda: estimate_phase_shift(beat.beat_times, beat.onset_times))
+    counts = step("counts", lambda: map_to_8count_array(beat.beat_times, phase))
+
+    def onsets():
+        import librosa
+        times, _ = _pick_onsets(librosa.onset.onset_strength(y=y, sr=sr, aggregate=np.median), sr)
+        if len(counts):
+            snap_events(counts, times)
+        acc = OnsetAccumulator(MODEL_SR, sr)  # 청크 분리 경로 (soxr 스트림 + mel)
+        acc.push(np.repeat(click_track(MODEL_SR, seconds=1.0)[:, None], 2, axis=1))
+        acc.finish()
+    step("onsets", onsets)
+    step("peaks", lambda: build_peak_pyramid(y, settings.PEAKS_BASE_SAMPLES, settings.PEAKS_LEVELS, settings.PEAKS_LEVEL_FACTOR))
+
+    if settings.WORKER_PRELOAD_DEMUCS if preload_demucs is None else preload_demucs:
+        try:
+            step("demucs", get_engine)
+        except Exception as e:  # torch/demucs 없음 -> 잡에서 CLI로 폴백
+            logger.warning(f"[warmup] demucs preload skipped: {e}")
+
+    logger.info(
+        "[warmup] DONE " + " ".join(f"{k}={v:.2f}s" for k, v in timings.items())
+        + f" total={sum(timings.values()):.2f}s"
+    )
+    return timings
@@ -0,0 +1,60 @@
+import hashlib
+from typing import List, Optional, Tuple
+
+from starlette.requests import Request
+
+
+def make_etag(*parts) -> str:
+    """변하지 않는 식별자들로 만든 strong ETag"""
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode()).hexdigest()[:20]
+    return f'"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    inm: Optional[str] = request.headers.get("if-none-match")
+    if not inm:
+        return False
+    if inm.strip() == "*":
+        return True
+    tags = [t.strip().removeprefix("W/") for t in inm.split(",")]
+    return etag in tags
+
+
+def parse_accept(header: Optional[str]) -> List[Tuple[str, float]]:
+    """Accept 헤더 -> [(media range, q)]. q 파싱 실패한 항목은 버린다"""
+    ranges = []
+    for part in (header or "").split(","):
+        media, *params = [p.strip() for p in part.split(";")]
+        if not media:
+            continue
+        q = 1.0
+        try:
+            for param in params:
+                key, _, value = param.partition("=")
+                if key.strip().lower() == "q":
+                    q = min(max(float(value), 0.0), 1.0)
+        except ValueError:
+            continue
+        ranges.append((media.lower(), q))
+    return ranges
+
+
+def media_quality(ranges: List[Tuple[str, float]], media_type: str, wildcards: bool = True) -> Optional[float]:
+    """
+    media_type에 가장 구체적으로 맞는 range의 q (type/subtype > type/* > */*). 맞는 게 없으면 None.
+    wildcards=False면 media_type을 명시한 range만 본다. q=0은 '허용 안 함'.
+    """
+    main = media_type.split("/")[0] + "/*"
+    best: Optional[Tuple[int, float]] = None
+    for media, q in ranges:
+        if media == media_type:
+            rank = 2
+        elif wildcards and media == main:
+            rank = 1
+        elif wildcards and media == "*/*":
+            rank = 0
+        else:
+            continue
+        if best is None or rank > best[0]:
+            best = (rank, q)
+    return None if best is None else best[1]
@@ -0,0 +1,274 @@
+# 오프라인 DSP 벤치마크 + 회귀 검사 (합성 오디오, 네트워크/GPU/Demucs 모델 없음)
+#   python benchmarks/bench_dsp.py                       # full 프로필 측정 후 기준선과 비교
+#   python benchmarks/bench_dsp.py --profile quick       # 짧은 신호로 빠르게 (CI)
+#   python benchmarks/bench_dsp.py --save                # 결과를 기준선으로 저장
+#   python benchmarks/bench_dsp.py --only beat_grid --threshold 0.5
+# 기준선: benchmarks/baselines/dsp-<profile>.json (케이스별 반복 중 최소 시간, 호출 1회 기준)
+# 한 번이 --min-time보다 짧은 케이스는 안쪽 루프(loops회)로 묶어 재고 호출당 시간으로 나눈다.
+# 기준선 대비 (1 + threshold)배 넘게 느려진 케이스가 있으면 exit 1. 다른 머신에서 만든 기준선이면 경고만 출력.
+from __future__ import annotations
+
+import argparse
+import fnmatch
+import json
+import math
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+import soundfile as sf
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+for p in (ROOT, os.path.dirname(os.path.abspath(__file__))):
+    if p not in sys.path:
+        sys.path.insert(0, p)
+
+import synth  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.db.base import Base  # noqa: E402
+from app.db.models.analysis import Analysis  # noqa: E402
+from app.db.models.stem import Stem  # noqa: E402
+from app.db.models.track import Track  # noqa: E402
+from app.services.audio.analyze import compute_beat_grid, estimate_phase_shift, map_to_8count  # noqa: E402
+from app.services.audio.buffer import AudioBufferCache  # noqa: E402
+from app.services.audio.events import extract_events_and_map  # noqa: E402
+from app.services.audio.grid import map_to_8count_array  # noqa: E402
+from app.services.audio.packed import pack_beats  # noqa: E402
+from app.services.audio.peaks import compute_peak_preview  # noqa: E402
+from app.services.audio.timeline import build_timeline_sync  # noqa: E402
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+STEM_SR = 44100  # Demucs 출력과 같은 스테레오 44.1kHz
+
+# 프로필별 신호 길이(초)
+PROFILES = {
+    "full": {"click": 120.0, "drift": 240.0, "mix": 3600.0, "stem": 360.0, "stems": 240.0},
+    "quick": {"click": 20.0, "drift": 30.0, "mix": 120.0, "stem": 30.0, "stems": 20.0},
+}
+
+Case = Tuple[str, Callable[[], Callable[[], object]]]  # (이름, setup() -> 측정할 함수)
+
+
+def build_cases(profile: str, tmp: str) -> List[Case]:
+    d = PROFILES[profile]
+    sr = settings.TARGET_SR
+    shared: Dict[str, object] = {}
+
+    def beat_grid_of(make_signal):
+        def setup():
+            y = make_signal()
+            return lambda: compute_beat_grid("", sr, y=y)
+        return setup
+
+    def mix_signal():
+        if "mix" not in shared:
+            shared["mix"] = synth.mix(d["mix"], sr)
+        return shared["mix"]
+
+    def mix_grid():
+        # 긴 믹스의 비트 그리드는 한 번만 계산해 phase/8count 케이스가 공유
+        if "mix_grid" not in shared:
+            shared["mix_grid"] = compute_beat_grid("", sr, y=mix_signal())
+        return shared["mix_grid"]
+
+    def phase_setup():
+        b = mix_grid()
+        return lambda: estimate_phase_shift(b.beat_times, b.onset_times)
+
+    def counts_setup(fn):
+        def setup():
+            b = mix_grid()
+            return lambda: fn(b.beat_times, 0.0)
+        return setup
+
+    def peaks_setup():
+        y = synth.mix(d["stem"], STEM_SR, seed=3)
+        data = np.stack([y, 0.8 * y], axis=1)
+        return lambda: compute_peak_preview("", data=data)
+
+    def events_db():
+        """SQLite 파일 DB + 트랙/분석/4 stem 행 + (sr, mono)로 디코딩해 둔 stem 버퍼"""
+        if "db" in shared:
+            return shared["db"]
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.sqlite')}")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(engine, expire_on_commit=False)
+        audio = AudioBufferCache()
+        bufs = {}
+        for name, y in synth.stems(d["stems"], sr, seed=7).items():
+            path = os.path.join(tmp, f"{name}.wav")
+            sf.write(path, y, sr)
+            bufs[name] = audio.get(path, sr=sr, mono=True)
+        beat = compute_beat_grid("", sr, y=sum(b.array() for b in bufs.values()))
+        counts = map_to_8count_array(beat.beat_times, estimate_phase_shift(beat.beat_times, beat.onset_times))
+        with Session() as db:
+            t = Track(title="bench", source_type="upload", status="processing", file_path="")
+            db.add(t)
+            db.flush()
+            a = Analysis(
+                track_id=t.id, bpm=beat.bpm, beat_confidence=beat.confidence, beat_phase_shift_ms=0,
+                measures=int(counts["measure"].max()) + 1, beat_grid=pack_beats(counts),
+            )
+            db.add(a)
+            db.add_all(Stem(track_id=t.id, stem_type=name, file_path=b.path) for name, b in bufs.items())
+            db.commit()
+            shared["db"] = dict(Session=Session, track_id=t.id, analysis_id=a.id, counts=counts, bufs=bufs, audio=audio)
+        return shared["db"]
+
+    def map_events(commit: bool = False):
+        st = events_db()
+        with st["Session"]() as db:
+            analysis = db.get(Analysis, st["analysis_id"])
+            rows = {s.stem_type: s for s in db.execute(select(Stem).where(Stem.track_id == st["track_id"])).scalars()}
+            extract_events_and_map(db, analysis, st["counts"], st["bufs"], rows, sr)  # onset + 스냅 + INSERT
+            if commit:
+                db.commit()
+            else:
+                db.rollback()
+
+    def events_setup():
+        events_db()
+        return map_events
+
+    def timeline_setup():
+        st = events_db()
+        map_events(commit=True)
+
+        def run():
+            with st["Session"]() as db:
+                return build_timeline_sync(db, st["track_id"])
+        return run
+
+    return [
+        *((f"beat_grid/click_{bpm}", beat_grid_of(lambda bpm=bpm: synth.click(bpm, d["click"], sr))) for bpm in (90, 128, 174)),
+        ("beat_grid/drift_100_130", beat_grid_of(lambda: synth.drift(100, 130, d["drift"], sr))),
+        ("beat_grid/mix", beat_grid_of(mix_signal)),
+        ("phase/mix", phase_setup),
+        ("map_to_8count/mix", counts_setup(map_to_8count)),
+        ("map_to_8count_array/mix", counts_setup(map_to_8count_array)),
+        ("peak_preview/stem", peaks_setup),
+        ("extract_events_and_map/4stem_sqlite", events_setup),
+        ("build_timeline/4stem_sqlite", timeline_setup),
+    ]
+
+
+def run_case(setup: Callable[[], Callable[[], object]], repeat: int, min_time: float = 0.1) -> Dict[str, float]:
+    """호출 1회 시간의 최소/중앙값. loops: 측정 한 번에 묶은 호출 수 (한 번이 min_time 이상이 되게)"""
+    fn = setup()
+    fn()  # 웜업 (numba JIT, 첫 임포트/캐시) - 측정 제외
+    s = time.perf_counter()
+    fn()
+    once = time.perf_counter() - s
+    loops = 1 if once >= min_time else min(100_000, math.ceil(min_time / max(once, 1e-7)))
+    times = []
+    for _ in range(repeat):
+        s = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        times.append((time.perf_counter() - s) / loops)
+    return {
+        "min_s": round(min(times), 9), "median_s": round(statistics.median(times), 9), "repeat": repeat, "loops": loops,
+    }
+
+
+def machine_info() -> Dict[str, object]:
+    return {
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+    }
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float, floor_s: float) -> List[str]:
+    """
+    기준선보다 max(threshold 비율, floor_s)를 넘게 느려진 케이스 이름들.
+    floor_s는 측정 한 번(loops회 호출) 기준이라 호출당으로는 floor_s / loops (sub-ms 케이스도 잡히게)
+    """
+    regressed = []
+    for name, r in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        slower = r["min_s"] - base["min_s"]
+        if slower > max(base["min_s"] * threshold, floor_s / r.get("loops", 1)):
+            regressed.append(name)
+    return regressed
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description="offline DSP benchmark with regression check")
+    p.add_argument("--profile", choices=sorted(PROFILES), default="full")
+    p.add_argument("--only", default="*", help="fnmatch pattern on case names, comma separated (default: all)")
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--baseline", default="", help="baseline JSON (default: benchmarks/baselines/dsp-<profile>.json)")
+    p.add_argument("--save", action="store_true", help="write results as the new baseline")
+    p.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown ratio (0.25 = 25%%)")
+    p.add_argument("--floor", type=float, default=0.005, help="ignore slowdowns below this many seconds per timed sample")
+    p.add_argument("--min-time", type=float, default=0.1, help="loop fast cases until one timed sample takes this long")
+    p.add_argument("--json", default="", help="also write this run's results to this path")
+    args = p.parse_args(argv)
+
+    baseline_path = args.baseline or os.path.join(BASELINE_DIR, f"dsp-{args.profile}.json")
+    patterns = [s.strip() for s in args.only.split(",") if s.strip()]
+    settings.ONSET_MODE = "serial"  # 프로세스 풀 없이 (코어 수에 따라 결과가 흔들리지 않게)
+    settings.PERSIST_EVENT_ROWS = True
+
+    results: Dict[str, dict] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, setup in build_cases(args.profile, tmp):
+            if not any(fnmatch.fnmatch(name, pat) or name.startswith(pat) for pat in patterns):
+                continue
+            results[name] = r = run_case(setup, args.repeat, args.min_time)
+            print(f"{name:<38} min={r['min_s'] * 1000:.3f}ms median={r['median_s'] * 1000:.3f}ms loops={r['loops']}")
+
+    report = {
+        "profile": args.profile,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "machine": machine_info(),
+        "results": results,
+    }
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.save:
+        os.makedirs(os.path.dirname(baseline_path), exist_ok=True)
+        if os.path.exists(baseline_path):  # 일부 케이스만 돌렸으면 나머지 기준선은 유지
+            with open(baseline_path) as f:
+                report["results"] = {**json.load(f).get("results", {}), **results}
+        with open(baseline_path, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"baseline saved: {baseline_path}")
+        return 0
+
+    if not os.path.exists(baseline_path):
+        print(f"no baseline at {baseline_path} (run with --save to create one)")
+        return 0
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    if baseline.get("machine") != report["machine"]:
+        print(f"warning: baseline was recorded on a different machine: {baseline.get('machine')}")
+    for name, r in results.items():
+        base = baseline["results"].get(name)
+        if base is not None:
+            print(f"{name:<38} x{r['min_s'] / max(base['min_s'], 1e-9):.2f} vs baseline")
+    regressed = compare(results, baseline["results"], args.threshold, args.floor)
+    if regressed:
+        print(f"REGRESSION (> {args.threshold:.0%} slower): {', '.join(regressed)}")
+        return 1
+    print("OK: no regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
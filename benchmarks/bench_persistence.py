@@ -0,0 +1,112 @@
+# 분석 잡 하나가 DB에 보내는 문장 수 / 커밋 수 / 소요 시간 측정 (합성 트랙 + 가짜 분리기)
+#   python benchmarks/bench_persistence.py [--url sqlite:///...|mysql+pymysql://...] [--seconds 120] [--pipeline single|dag]
+# --url 없으면 임시 SQLite 파일. 원격 MySQL이면 문장 수 x 왕복 지연만큼 차이가 커진다.
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import soundfile as sf
+from sqlalchemy import create_engine, event
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+for p in (ROOT, os.path.dirname(os.path.abspath(__file__))):
+    if p not in sys.path:
+        sys.path.insert(0, p)
+
+import synth  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.db.base import Base  # noqa: E402
+from app.db.models.track import Track  # noqa: E402
+from app.db.sync import make_sync_sessionmaker  # noqa: E402
+from app.services.cache import results  # noqa: E402
+from app.services.tasks import jobs  # noqa: E402
+
+SR = 22050
+
+
+class StatementCounter:
+    def __init__(self, engine):
+        self.statements = self.rows = self.commits = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+        event.listen(engine, "commit", self._on_commit)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements += 1
+        self.rows += len(parameters) if executemany else 1
+
+    def _on_commit(self, conn):
+        self.commits += 1
+
+
+def main():
+    p = argparse.ArgumentParser(description="analysis job persistence benchmark")
+    p.add_argument("--url", default="", help="SQLAlchemy URL (default: temp SQLite file)")
+    p.add_argument("--seconds", type=float, default=120.0)
+    p.add_argument("--pipeline", choices=["single", "dag"], default="single")
+    p.add_argument("--repeat", type=int, default=2)
+    args = p.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.STORAGE_DIR = tmp
+        settings.PROGRESS_EVENTS = False
+        settings.DEMUCS_CHUNKED = False
+        settings.ONSET_MODE = "serial"
+
+        engine = create_engine(args.url or f"sqlite:///{tmp}/bench.sqlite")
+        Base.metadata.create_all(engine)
+        jobs._Session = make_sync_sessionmaker(engine)
+        results.record_cache_result = lambda hit: None
+
+        def track_wav(i: int) -> str:
+            # 잡마다 다른 오디오 (같으면 결과 캐시 HIT로 분석을 건너뜀)
+            path = os.path.join(tmp, f"track{i}.wav")
+            sf.write(path, synth.click(120.0, args.seconds, SR, seed=100 + i), SR)
+            return path
+
+        stem_paths = {}
+        for name, y in synth.stems(args.seconds, SR, seed=1).items():
+            stem_paths[name] = os.path.join(tmp, f"{name}.wav")
+            sf.write(stem_paths[name], y, SR)
+        jobs.separate_stems = lambda wav_path: dict(stem_paths)
+
+        def run(track_id):
+            if args.pipeline == "single":
+                jobs.analyze_track_job(track_id)
+            else:
+                jobs.prepare_stage_job(track_id)
+                jobs.beat_stage_job(track_id)
+                jobs.separate_stage_job(track_id)
+                jobs.join_stage_job(track_id)
+
+        # 첫 잡은 numba JIT/임포트 웜업
+        with jobs._Session() as db:
+            warm = Track(title="warm", source_type="upload", status="queued", file_path=track_wav(-1))
+            db.add(warm)
+            db.commit()
+            warm_id = warm.id
+        run(warm_id)
+
+        counter = StatementCounter(engine)
+        for i in range(args.repeat):
+            with jobs._Session() as db:
+                t = Track(title=f"bench{i}", source_type="upload", status="queued", file_path=track_wav(i))
+                db.add(t)
+                db.commit()
+                track_id = t.id
+            before = (counter.statements, counter.rows, counter.commits)
+            s = time.perf_counter()
+            run(track_id)
+            wall = time.perf_counter() - s
+            st, rows, commits = (a - b for a, b in zip((counter.statements, counter.rows, counter.commits), before))
+            print(
+                f"job #{i + 1} pipeline={args.pipeline} statements={st} rows={rows} commits={commits} "
+                f"wall={wall:.2f}s persist_event_rows={settings.PERSIST_EVENT_ROWS}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# 4분짜리 합성 4-stem 세트로 onset 추출 경로(serial / batch / pool) 비교
+#   python benchmarks/bench_stem_onsets.py [--seconds 240] [--repeat 1]
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import soundfile as sf
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+for p in (ROOT, os.path.dirname(os.path.abspath(__file__))):
+    if p not in sys.path:
+        sys.path.insert(0, p)
+
+import synth  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.services.audio.events import iter_stem_onsets  # noqa: E402
+
+STEM_SR = 44100  # Demucs 출력과 동일 (스테레오 44.1kHz)
+
+
+def _write_stems(out_dir: str, seconds: float) -> dict:
+    paths = {}
+    for name, y in synth.stems(seconds, STEM_SR).items():
+        path = os.path.join(out_dir, f"{name}.wav")
+        sf.write(path, np.stack([y, y], axis=1), STEM_SR)
+        paths[name] = path
+    return paths
+
+
+def main():
+    p = argparse.ArgumentParser(description="stem onset extraction benchmark")
+    p.add_argument("--seconds", type=float, default=240.0)
+    p.add_argument("--repeat", type=int, default=1)
+    args = p.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = _write_stems(tmp, args.seconds)
+        sr = settings.TARGET_SR
+        # numba JIT 등 첫 호출 비용을 측정에서 제외
+        list(iter_stem_onsets({"drums": paths["drums"]}, sr, mode="serial"))
+
+        results = {}
+        for mode in ("serial", "batch", "pool"):
+            best = float("inf")
+            for _ in range(args.repeat):
+                s = time.perf_counter()
+                first = None
+                counts = {}
+                for name, times, _ in iter_stem_onsets(paths, sr, mode=mode):
+                    first = first or time.perf_counter() - s
+                    counts[name] = len(times)
+                best = min(best, time.perf_counter() - s)
+            results[mode] = best
+            print(f"{mode:>6}: total={best:.2f}s first_stem={first:.2f}s onsets={counts}")
+
+        base = results["serial"]
+        for mode in ("batch", "pool"):
+            print(f"{mode:>6}: speedup x{base / results[mode]:.2f} vs serial")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# 벤치마크용 결정적 합성 오디오 (네트워크/GPU/Demucs 모델 없이)
+#   click(bpm)         : 고정 템포 클릭 트랙 (tasks/warmup.click_track + 4/4 다운비트 강조)
+#   drift(bpm0, bpm1)  : 템포가 선형으로 변하는 클릭 트랙
+#   mix(seconds)       : 섹션마다 BPM/악센트가 바뀌는 긴 믹스 (1시간 DJ 세트 흉내)
+#   stems(seconds)     : drums/bass/vocals/other 가짜 4-stem 세트 (Demucs 출력 대신)
+# 버스트/클릭 생성은 워커 웜업과 같은 함수를 쓴다 (app.services.tasks.warmup)
+from __future__ import annotations
+
+import os
+import sys
+from typing import Dict, Sequence
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from app.services.tasks.warmup import click_track, noise_burst, place_bursts  # noqa: E402
+
+MIX_BPMS = (92.0, 104.0, 120.0, 128.0, 140.0, 174.0)
+ACCENTS = (1.0, 0.6, 0.6, 0.6)  # 4/4 다운비트 강조
+
+
+def click(bpm: float, seconds: float, sr: int, seed: int = 0) -> np.ndarray:
+    return click_track(sr, seconds, bpm, seed=seed, accents=ACCENTS)
+
+
+def drift(bpm0: float, bpm1: float, seconds: float, sr: int, seed: int = 0) -> np.ndarray:
+    """순간 템포 bpm(t) = bpm0 + (bpm1 - bpm0) t / seconds 를 적분한 위치에 비트"""
+    y = np.zeros(int(sr * seconds), dtype=np.float32)
+    t = np.arange(int(seconds * 100)) / 100.0  # 10ms 격자
+    beats = np.cumsum((bpm0 + (bpm1 - bpm0) * t / seconds) / 60.0 / 100.0)
+    idx = np.searchsorted(beats, np.arange(1, int(beats[-1]) + 1))
+    starts = (t[np.clip(idx, 0, len(t) - 1)] * sr).astype(np.int64)
+    place_bursts(y, starts, noise_burst(sr, seed), np.resize(ACCENTS, len(starts)))
+    return y
+
+
+def mix(seconds: float, sr: int, section_s: float = 240.0, bpms: Sequence[float] = MIX_BPMS, seed: int = 0) -> np.ndarray:
+    """섹션별 클릭 + 8분음표 하이햇 + 약한 노이즈. 섹션 경계에서 템포가 바뀐다"""
+    rng = np.random.default_rng(seed)
+    y = (0.005 * rng.standard_normal(int(sr * seconds))).astype(np.float32)
+    hat = 0.3 * noise_burst(sr, seed + 1, ms=8.0, decay=12.0)
+    for i, start_s in enumerate(np.arange(0.0, seconds, section_s)):
+        a, b = int(start_s * sr), min(len(y), int((start_s + section_s) * sr))
+        bpm = bpms[i % len(bpms)]
+        y[a:b] += click(bpm, (b - a) / sr, sr, seed=seed + i)
+        place_bursts(y[a:b], np.arange(sr * 30.0 / bpm, b - a, sr * 60.0 / bpm).astype(np.int64), hat, np.ones(b - a))
+    return y
+
+
+def stems(seconds: float, sr: int, bpm: float = 120.0, seed: int = 0) -> Dict[str, np.ndarray]:
+    """stem마다 다른 리듬 밀도 (drums: 16분, bass: 8분, vocals: 불규칙, other: 2분)"""
+    rng = np.random.default_rng(seed)
+    n = int(sr * seconds)
+    beat = sr * 60.0 / bpm
+    grids = {
+        "drums": np.arange(0, n, beat / 4),
+        "bass": np.arange(0, n, beat / 2),
+        "vocals": np.sort(rng.uniform(0, n, int(seconds * 1.5))),
+        "other": np.arange(0, n, beat * 2),
+    }
+    out = {}
+    for i, (name, starts) in enumerate(grids.items()):
+        y = (0.01 * rng.standard_normal(n)).astype(np.float32)
+        place_bursts(y, starts.astype(np.int64), noise_burst(sr, seed + 10 + i, ms=30.0), rng.uniform(0.4, 1.0, len(starts)))
+        out[name] = y
+    return out
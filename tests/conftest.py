@@ -0,0 +1,14 @@
+import pytest
+
+from app.core import redis
+from app.services.tasks import queue, singleflight
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """get_redis()를 fakeredis로 (큐/Lua 스크립트 캐시는 비워서 새 클라이언트에 다시 묶는다)"""
+    fakeredis = pytest.importorskip("fakeredis")
+    r = fakeredis.FakeRedis()
+    monkeypatch.setattr(redis, "_redis", r)
+    monkeypatch.setattr(queue, "_queues", {})
+    monkeypatch.setattr(singleflight, "_scripts", {})
+    return r
@@ -0,0 +1,123 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from redis.client import Pipeline
+from rq import SimpleWorker
+from rq.job import Job
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.api.routes import analysis
+from app.core.config import settings
+from app.db.base import Base
+from app.db.models.track import Track
+from app.services.tasks import jobs, queue
+
+@pytest.fixture
+def client(tmp_path, fake_redis, monkeypatch):
+    pytest.importorskip("aiosqlite")
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    db_path = tmp_path / "db.sqlite"
+    engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add_all([Track(id=i, title=f"t{i}", source_type="upload", status="done", file_path=f"t{i}.wav") for i in (1, 2, 3)])
+        db.add(Track(id=4, title="yt", source_type="youtube", status="downloading", file_path=""))
+        db.commit()
+    monkeypatch.setattr(analysis, "SESSION", async_sessionmaker(create_async_engine(f"sqlite+aiosqlite:///{db_path}")))
+    monkeypatch.setattr(settings, "ANALYSIS_PIPELINE", "dag")
+    monkeypatch.setattr(settings, "PROGRESS_EVENTS", False)
+    app = FastAPI()
+    app.include_router(analysis.router, prefix="/analysis")
+    c = TestClient(app)
+    c.engine = engine
+    return c
+
+@pytest.fixture
+def transactions(monkeypatch):
+    """Pipeline.execute마다 (MULTI 여부, 명령 이름들)"""
+    calls = []
+    execute = Pipeline.execute
+
+    def spy(self, *a, **kw):
+        calls.append((self.explicit_transaction, [str(args[0]).upper() for args, _ in self.command_stack]))
+        return execute(self, *a, **kw)
+    monkeypatch.setattr(Pipeline, "execute", spy)
+    return calls
+
+def _stub_stages(monkeypatch):
+    log = []
+    monkeypatch.setattr(jobs, "prepare_stage_job", lambda tid: log.append(("prepare", tid)) or False)
+    monkeypatch.setattr(jobs, "beat_stage_job", lambda tid: log.append(("beats", tid)) or 1)
+    monkeypatch.setattr(jobs, "separate_stage_job", lambda tid: log.append(("separate", tid)) or {})
+    monkeypatch.setattr(jobs, "join_stage_job", lambda tid, b, s: log.append(("join", tid)))
+    return log
+
+def test_batch_enqueues_in_one_transaction_and_runs_stages_in_order(client, fake_redis, transactions, monkeypatch):
+    log = _stub_stages(monkeypatch)
+    res = client.post("/analysis/batch", json={"track_ids": [1, 99, 2, 1]})
+    assert res.status_code == 200
+    body = res.json()
+    assert body["missing"] == [99] and body["inflight"] == []
+    assert set(body["jobs"]) == {"1", "2"}
+    with Session(client.engine) as db:
+        assert [db.get(Track, i).status for i in (1, 2, 3)] == ["queued", "queued", "done"]
+
+    # 두 트랙의 잡 8개가 MULTI/EXEC 한 번에
+    writes = [cmds for multi, cmds in transactions if "HSET" in cmds]
+    assert len(writes) == 1 and [multi for multi, cmds in transactions if "HSET" in cmds] == [True]
+    assert writes[0].count("HSET") >= 8
+    assert queue.get_queue(settings.RQ_QUEUE).count == 2  # prepare만 바로 큐잉, 나머지는 대기
+
+    SimpleWorker(queue.analysis_queues(), connection=fake_redis).work(burst=True)
+    for tid in (1, 2):
+        stages = [name for name, t in log if t == tid]
+        assert stages[0] == "prepare" and stages[-1] == "join"
+        assert sorted(stages[1:3]) == ["beats", "separate"] and len(stages) == 4
+    assert Job.fetch(body["jobs"]["1"], connection=fake_redis).get_status() == "finished"
+
+def test_batch_priority_routes_stages(client, fake_redis, monkeypatch):
+    _stub_stages(monkeypatch)
+    high = client.post("/analysis/batch", json={"track_ids": [1], "priority": "high"}).json()
+    low = client.post("/analysis/batch", json={"track_ids": [2], "priority": "low"}).json()
+
+    join = Job.fetch(high["jobs"]["1"], connection=fake_redis)
+    beats_id, separate_id = join.args[1:]
+    for job in Job.fetch_many([beats_id, separate_id, join.id], connection=fake_redis):
+        assert job.enqueue_at_front is True  # 앞 잡이 끝나 큐잉될 때도 맨 앞
+    assert Job.fetch(separate_id, connection=fake_redis).origin == settings.RQ_HEAVY_QUEUE
+
+    join = Job.fetch(low["jobs"]["2"], connection=fake_redis)
+    beats, separate = Job.fetch_many(list(join.args[1:]), connection=fake_redis)
+    assert beats.origin == settings.RQ_LOW_QUEUE and separate.origin == settings.RQ_HEAVY_LOW_QUEUE
+    assert not separate.enqueue_at_front
+    assert queue.get_queue(settings.RQ_LOW_QUEUE).count == 1
+
+    # normal이 먼저 기다리고 있어도 high의 separate는 heavy 큐 맨 앞으로
+    client.post("/analysis/batch", json={"track_ids": [3]})
+    light, heavy = queue.get_queue(settings.RQ_QUEUE), queue.get_queue(settings.RQ_HEAVY_QUEUE)
+    for job_id in reversed(light.job_ids):  # normal(3)의 prepare가 먼저 끝난 것처럼
+        job = light.fetch_job(job_id)
+        light.remove(job)
+        job.set_status("finished")
+        light.enqueue_dependents(job)
+    assert len(heavy.job_ids) == 2 and heavy.job_ids[0] == separate_id
+
+def test_tracks_without_audio_are_not_queued(client, fake_redis, monkeypatch):
+    _stub_stages(monkeypatch)
+    res = client.post("/analysis/4/start")
+    assert res.status_code == 409
+    res = client.post("/analysis/batch", json={"track_ids": [4, 1]})
+    assert res.status_code == 200
+    body = res.json()
+    assert body["not_ready"] == [4] and set(body["jobs"]) == {"1"}
+
+    # 다운로드가 실패해 파일이 없는 트랙도 마찬가지
+    with Session(client.engine) as db:
+        db.get(Track, 4).status = "failed"
+        db.commit()
+    assert client.post("/analysis/4/start").status_code == 409
+    with Session(client.engine) as db:
+        assert db.get(Track, 4).status == "failed"
+    assert queue.get_queue(settings.RQ_QUEUE).count == 1
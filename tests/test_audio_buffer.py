@@ -0,0 +1,20 @@
+from app.services.audio.buffer import AudioBufferCache
+import numpy as np
+import soundfile as sf
+import librosa
+import os
+
+def test_buffer_matches_librosa_load_and_decodes_once(tmp_path):
+    wav = str(tmp_path / "stem.wav")
+    rng = np.random.default_rng(0)
+    sf.write(wav, (0.3 * rng.standard_normal((44100 * 2, 2))).astype(np.float32), 44100)
+
+    with AudioBufferCache(root=str(tmp_path / "cache")) as cache:
+        resampled = cache.get(wav, sr=22050, mono=True)
+        native = cache.get(wav, sr=None, mono=True)
+        y, _ = librosa.load(wav, sr=22050, mono=True)
+        assert np.array_equal(resampled.array(), y)
+        assert native.sr == 44100 and native.frames == 44100 * 2
+        assert cache.get(wav, sr=44100, mono=True) is native  # 이미 같은 sr -> 리샘플 없음
+        assert len(os.listdir(cache.dir)) == 3  # 원본 / mono / 22050
+    assert not os.path.exists(cache.dir)
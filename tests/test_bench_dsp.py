@@ -0,0 +1,43 @@
+import json
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+import bench_dsp  # noqa: E402
+import synth  # noqa: E402
+from app.services.tasks.warmup import click_track  # noqa: E402
+
+def test_synthetic_audio_is_deterministic():
+    assert np.array_equal(synth.mix(30, 8000), synth.mix(30, 8000))
+    assert np.array_equal(synth.drift(100, 130, 10, 8000), synth.drift(100, 130, 10, 8000))
+    assert np.array_equal(synth.click(120, 4, 8000), click_track(8000, 4, 120, accents=synth.ACCENTS))
+    stems = synth.stems(5, 8000)
+    assert set(stems) == {"drums", "bass", "vocals", "other"} and all(len(y) == 40000 for y in stems.values())
+
+def test_compare_threshold_and_floor():
+    base = {"a": {"min_s": 1.0}, "b": {"min_s": 0.001}, "c": {"min_s": 1.0}, "d": {"min_s": 0.001}}
+    cur = {"a": {"min_s": 1.3}, "b": {"min_s": 0.004}, "c": {"min_s": 1.2}, "new": {"min_s": 9.0},
+           "d": {"min_s": 0.004, "loops": 100}}  # 안쪽 루프로 잰 sub-ms 케이스는 floor도 호출당으로
+    assert bench_dsp.compare(cur, base, threshold=0.25, floor_s=0.005) == ["a", "d"]
+
+def test_fast_cases_are_timed_over_an_inner_loop():
+    calls = []
+    r = bench_dsp.run_case(lambda: lambda: calls.append(1), repeat=2, min_time=0.01)
+    assert r["loops"] > 100 and len(calls) == 2 + 2 * r["loops"]
+    assert 0 < r["min_s"] < 0.001
+
+def test_quick_run_saves_and_checks_baseline(tmp_path, monkeypatch):
+    for name in ("ONSET_MODE", "PERSIST_EVENT_ROWS"):  # main()이 바꾸는 설정은 테스트 후 복원
+        monkeypatch.setattr(bench_dsp.settings, name, getattr(bench_dsp.settings, name))
+    path = str(tmp_path / "dsp.json")
+    argv = ["--profile", "quick", "--only", "phase,map_to_8count/", "--repeat", "1", "--min-time", "0.02", "--baseline", path]
+    assert bench_dsp.main(argv + ["--save"]) == 0
+    saved = json.load(open(path))
+    assert set(saved["results"]) == {"phase/mix", "map_to_8count/mix"}
+    assert all(r["loops"] > 1 for r in saved["results"].values())  # 둘 다 1ms 안팎
+
+    saved["results"]["phase/mix"]["min_s"] = -1.0  # 기준선을 비현실적으로 빠르게 -> 회귀로 잡혀야 함
+    json.dump(saved, open(path, "w"))
+    assert bench_dsp.main(argv) == 1  # 기본 floor로도 (호출당 floor / loops)
@@ -0,0 +1,149 @@
+import os
+import stat
+import sys
+
+import pytest
+import numpy as np
+import librosa
+import soundfile as sf
+from app.core.config import settings
+from app.services.audio import demucs
+from app.services.audio.buffer import AudioBufferCache
+from app.services.audio.demucs import CrossfadeStitcher, MODEL_SR, STEMS, plan_segments
+from app.services.audio.events import OnsetAccumulator, _pick_onsets
+from app.services.audio.peaks import PeakAccumulator, compute_stem_peaks
+
+def test_plan_segments_overlap_and_stitch_identity():
+    segs = plan_segments(10_000, 1000, segment_s=2.0, overlap=0.25)
+    assert segs[0] == (0, 2000) and segs[-1][1] == 10_000
+    assert all(a[1] - b[0] == 500 for a, b in zip(segs, segs[1:]))
+
+    x = np.random.default_rng(0).standard_normal((2, 10_000)).astype(np.float32)
+    st = CrossfadeStitcher(500)
+    out = [st.push(x[:, s:e]) for s, e in segs] + [st.flush()]
+    np.testing.assert_allclose(np.concatenate(out, axis=1), x, atol=1e-6)
+
+def test_chunked_separation_streams_stems_and_accumulators(tmp_path, monkeypatch):
+    # 가짜 분리기: stem i = 입력 * (i+1)/10 -> 이어 붙인 결과가 원본 비율과 같아야 함
+    def fake_segment(buf, start, end, mean, std):
+        seg = np.asarray(buf.array()[start:end], dtype=np.float32).reshape(end - start, -1).T
+        seg = np.repeat(seg[:1], 2, axis=0)
+        return np.stack([seg * (i + 1) / 10 for i in range(len(STEMS))])
+    monkeypatch.setattr(demucs, "_separate_segment", fake_segment)
+    monkeypatch.setattr(settings, "DEMUCS_SEGMENT", 1.5)
+
+    rng = np.random.default_rng(1)
+    y = (0.5 * rng.standard_normal(MODEL_SR * 5)).clip(-1, 1).astype(np.float32)
+    wav = str(tmp_path / "t.wav")
+    sf.write(wav, y, MODEL_SR, subtype="FLOAT")
+
+    chunks, peaks, onsets = [], PeakAccumulator(len(y), MODEL_SR), OnsetAccumulator(MODEL_SR, 22050)
+    def on_chunk(start, stems):
+        chunks.append(start)
+        peaks.push(stems["drums"]); onsets.push(stems["drums"])
+
+    with AudioBufferCache(root=str(tmp_path / "cache")) as audio:
+        paths = demucs.separate_stems_chunked(wav, audio, on_chunk=on_chunk, workers=1)
+    assert len(chunks) > 1 and chunks == sorted(chunks)
+
+    drums, sr = sf.read(paths["drums"], dtype="float32")
+    assert sr == MODEL_SR and drums.shape == (len(y), 2)
+    np.testing.assert_allclose(drums[:, 0], y * 0.1, atol=2e-4)  # PCM_16 양자화
+
+    preview, path = peaks.finish(str(tmp_path / "acc.wav"))
+    full = np.repeat((y * 0.1)[:, None], 2, axis=1)
+    ref_preview, ref_path = compute_stem_peaks(str(tmp_path / "ref.wav"), data=full, sr=MODEL_SR)
+    assert preview == ref_preview
+    assert open(path, "rb").read() == open(ref_path, "rb").read()
+
+    times, _ = onsets.finish()
+    y_22k = librosa.resample(y * 0.1, orig_sr=MODEL_SR, target_sr=22050)
+    ref_times, _ = _pick_onsets(librosa.onset.onset_strength(y=y_22k, sr=22050, aggregate=np.median), 22050)
+    np.testing.assert_allclose(times, ref_times)
+
+class _ScaleEngine:
+    """stem i = 입력 * (i+1)/10 (풀 자식 프로세스에서도 쓰이도록 모듈 수준)"""
+    def separate_array(self, data, mean=None, std=None, split=True):
+        seg = np.repeat(np.asarray(data, dtype=np.float32).reshape(len(data), -1).T[:1], 2, axis=0)
+        return np.stack([seg * (i + 1) / 10 for i in range(len(STEMS))])
+
+def _scale_engine():
+    return _ScaleEngine()
+
+def test_segment_pool_is_reused_across_separations(tmp_path, monkeypatch):
+    monkeypatch.setattr(demucs, "get_engine", _scale_engine)  # fork된 자식도 같은 대역을 본다
+    monkeypatch.setattr(demucs, "_engine_importable", lambda: True)
+    monkeypatch.setattr(settings, "DEMUCS_SEGMENT", 1.0)
+    y = (0.3 * np.random.default_rng(2).standard_normal(MODEL_SR * 3)).astype(np.float32)
+    wav = str(tmp_path / "t.wav")
+    sf.write(wav, y, MODEL_SR, subtype="FLOAT")
+    try:
+        pools = []
+        for _ in range(2):
+            with AudioBufferCache(root=str(tmp_path / "cache")) as audio:
+                paths = demucs.separate_stems_chunked(wav, audio, workers=2)
+            pools.append(demucs._segment_pool)
+            bass, _ = sf.read(paths["bass"], dtype="float32")
+            np.testing.assert_allclose(bass[:, 0], y * 0.2, atol=2e-4)
+        assert pools[0] is not None and pools[0] is pools[1]
+    finally:
+        demucs.shutdown_segment_pool()
+    assert demucs._segment_pool is None
+
+def test_chunked_separation_falls_back_without_engine(tmp_path, monkeypatch):
+    def no_engine():
+        raise ImportError("No module named 'torch'")
+    calls = []
+    monkeypatch.setattr(demucs, "get_engine", no_engine)
+    monkeypatch.setattr(demucs, "_engine_importable", lambda: False)
+    monkeypatch.setattr(demucs, "separate_stems", lambda wav: calls.append(wav) or {"drums": "d.wav"})
+    monkeypatch.setattr(settings, "DEMUCS_SEGMENT", 1.0)
+    wav = str(tmp_path / "t.wav")
+    sf.write(wav, np.zeros(MODEL_SR * 3, dtype=np.float32), MODEL_SR)
+
+    chunks = []
+    monkeypatch.setattr(settings, "DEMUCS_ENGINE", "auto")
+    with AudioBufferCache(root=str(tmp_path / "cache")) as audio:
+        for workers in (1, 2):  # 상주 엔진 / 세그먼트 풀 둘 다
+            assert demucs.separate_stems_chunked(wav, audio, on_chunk=lambda *a: chunks.append(a), workers=workers) == {"drums": "d.wav"}
+        assert calls == [wav, wav] and chunks == []
+
+        monkeypatch.setattr(settings, "DEMUCS_ENGINE", "inprocess")
+        with pytest.raises(ImportError):
+            demucs.separate_stems_chunked(wav, audio, workers=2)
+
+def test_chunked_fallback_returns_cli_stems_not_empty_files(tmp_path, monkeypatch):
+    # 엔진 없음 -> 실제 separate_stems -> _separate_cli (PATH의 가짜 demucs CLI가 입력을 stem마다 복사)
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    cli = bin_dir / "demucs"
+    cli.write_text(
+        f"#!{sys.executable}\n"
+        "import os, shutil, sys\n"
+        "args = sys.argv[1:]\n"
+        "out = os.path.join(args[args.index('-o') + 1], args[args.index('-n') + 1])\n"
+        "os.makedirs(out, exist_ok=True)\n"
+        "base = os.path.splitext(os.path.basename(args[-1]))[0]\n"
+        "for s in ('drums', 'bass', 'vocals', 'other'):\n"
+        "    shutil.copy(args[-1], os.path.join(out, f'{base}-{s}.wav'))\n"
+    )
+    cli.chmod(cli.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+
+    def no_engine():
+        raise ImportError("No module named 'torch'")
+    monkeypatch.setattr(demucs, "get_engine", no_engine)
+    monkeypatch.setattr(demucs, "_engine_importable", lambda: False)
+    monkeypatch.setattr(settings, "DEMUCS_ENGINE", "auto")
+    monkeypatch.setattr(settings, "DEMUCS_SEGMENT", 1.0)
+    wav = str(tmp_path / "t.wav")
+    sf.write(wav, np.full(MODEL_SR * 3, 0.25, dtype=np.float32), MODEL_SR)
+
+    for workers in (1, 2):
+        with AudioBufferCache(root=str(tmp_path / "cache")) as audio:
+            stems = demucs.separate_stems_chunked(wav, audio, workers=workers)
+        assert set(stems) == set(STEMS)
+        assert all(sf.info(path).frames == MODEL_SR * 3 for path in stems.values())
+        # 청크 경로가 빈 stem 파일을 남기지 않는다 (남으면 _separate_cli가 접미사로 집을 수 있다)
+        out = tmp_path / "t_stems" / settings.DEMUCS_MODEL
+        assert sorted(p.name for p in out.iterdir()) == sorted(f"t-{s}.wav" for s in STEMS)
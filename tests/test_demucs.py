@@ -0,0 +1,19 @@
+import pytest
+from app.core.config import settings
+from app.services.audio import demucs
+
+def test_separate_stems_falls_back_to_cli_without_torch(tmp_path, monkeypatch):
+    def no_engine():
+        raise ImportError("No module named 'torch'")
+    calls = []
+    monkeypatch.setattr(demucs, "get_engine", no_engine)
+    monkeypatch.setattr(demucs, "_separate_cli", lambda wav, out: calls.append((wav, out)) or {"drums": "d.wav"})
+
+    wav = str(tmp_path / "track.wav")
+    monkeypatch.setattr(settings, "DEMUCS_ENGINE", "auto")
+    assert demucs.separate_stems(wav) == {"drums": "d.wav"}
+    assert calls == [(wav, str(tmp_path / "track_stems"))]
+
+    monkeypatch.setattr(settings, "DEMUCS_ENGINE", "inprocess")
+    with pytest.raises(ImportError):
+        demucs.separate_stems(wav)
@@ -0,0 +1,21 @@
+from app.services.audio.analyze import map_to_8count
+from app.services.audio.grid import map_to_8count_array, snap_to_beats, beat_grid_from_events
+import numpy as np
+
+def test_map_to_8count_array_matches_tuple_api():
+    beat_times = np.cumsum(np.full(40, 0.5)) + 0.13
+    arr = map_to_8count_array(beat_times, -0.2)
+    tuples = map_to_8count(beat_times, -0.2)
+    assert [(i, int(m), int(c), int(me)) for i, (m, c, me) in enumerate(arr)] == tuples
+
+def test_snap_to_beats_matches_argmin():
+    rng = np.random.default_rng(0)
+    beat_times = np.sort(rng.uniform(0, 60, 120))
+    times = np.concatenate([rng.uniform(-1, 61, 500), beat_times[:5], (beat_times[:-1] + beat_times[1:]) / 2])
+    expected = [int(np.argmin(np.abs(beat_times - t))) for t in times]
+    assert snap_to_beats(beat_times, times).tolist() == expected
+
+def test_beat_grid_from_events_dedupes_and_sorts():
+    grid = beat_grid_from_events(np.array([1000, 500, 1000]), np.array([3, 2, 3]), np.array([0, 0, 0]))
+    assert grid["ms"].tolist() == [500, 1000]
+    assert grid["count"].tolist() == [2, 3]
@@ -0,0 +1,56 @@
+import json
+import os
+import subprocess
+import sys
+
+from fastapi.testclient import TestClient
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# API 콜드 스타트 예산 (현재 ~0.5s / ~90MB, 느린 CI 여유 포함)
+IMPORT_BUDGET_S = 3.0
+RSS_BUDGET_MB = 200
+
+# API 프로세스가 임포트하면 안 되는 모듈 (DSP/워커 스택)
+FORBIDDEN = (
+    "librosa", "numba", "scipy", "soxr", "sklearn", "torch", "demucs",
+    "app.services.tasks.jobs", "app.services.audio.analyze", "app.services.audio.events",
+    "app.services.audio.demucs", "app.db.sync",
+)
+
+_PROBE = """
+import json, resource, sys, time
+s = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - s
+from app.core import redis
+from app.db.session import db_manager
+try:  # ru_maxrss는 fork한 부모(pytest)의 최대치를 물려받으므로 exec 이후 값인 VmHWM 우선
+    rss_kb = int(next(l for l in open("/proc/self/status") if l.startswith("VmHWM")).split()[1])
+except OSError:
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // (1024 if sys.platform == "darwin" else 1)
+print(json.dumps({
+    "elapsed": elapsed,
+    "rss_mb": rss_kb / 1024,
+    "loaded": [m for m in %r if m in sys.modules],
+    "clients": [redis._redis is not None, redis._async_redis is not None, db_manager.engine is not None],
+}))
+""" % (FORBIDDEN,)
+
+def test_api_import_is_lean():
+    out = subprocess.run([sys.executable, "-c", _PROBE], cwd=ROOT, capture_output=True, text=True, check=True)
+    probe = json.loads(out.stdout.strip().splitlines()[-1])
+    assert probe["loaded"] == []
+    assert probe["clients"] == [False, False, False]  # 연결/엔진은 lifespan에서
+    assert probe["elapsed"] < IMPORT_BUDGET_S, probe
+    assert probe["rss_mb"] < RSS_BUDGET_MB, probe
+
+def test_lifespan_creates_and_closes_clients():
+    from app.core import redis
+    from app.db.session import db_manager
+    from app.main import app
+
+    with TestClient(app) as client:
+        assert client.get("/test").status_code == 200
+        assert db_manager.engine is not None and redis._async_redis is not None
+    assert db_manager.engine is None and redis._async_redis is None
@@ -0,0 +1,69 @@
+import logging
+from datetime import datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+import worker
+from app.core.metrics import DB_STATEMENTS, REGISTRY, instrument_engine
+from app.core.tracing import TraceIdFilter, trace_id_var
+from app.main import app
+from app.services.tasks import queue as q
+
+def _value(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+def test_metrics_endpoint_and_request_latency():
+    client = TestClient(app)
+    before = _value("beatmap_http_request_seconds_count", method="GET", route="/test", status="200")
+    res = client.get("/test", headers={"X-Trace-Id": "abc123"})
+    assert res.headers["x-trace-id"] == "abc123"
+    assert client.get("/test").headers["x-trace-id"]  # 없으면 새로 만든다
+    assert _value("beatmap_http_request_seconds_count", method="GET", route="/test", status="200") == before + 2
+
+    body = client.get("/metrics").text  # Redis가 없어도 큐 깊이만 빠지고 응답
+    for name in ("beatmap_stage_seconds", "beatmap_queue_wait_seconds", "beatmap_db_statements",
+                 "beatmap_redis_seconds", "beatmap_http_request_seconds_bucket"):
+        assert name in body
+
+def test_db_statement_counter():
+    engine = create_engine("sqlite://")
+    instrument_engine(engine, "test")
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        conn.execute(text("SELECT 2"))
+    assert DB_STATEMENTS.labels(engine="test")._value.get() == 2
+
+def test_trace_id_in_job_meta_and_logs(monkeypatch):
+    monkeypatch.setattr(q.settings, "ANALYSIS_PIPELINE", "dag")
+    token = trace_id_var.set("t-1")
+    try:
+        head, deferred, final = q._analysis_jobs(5, q.queue, q.ANALYSIS_JOB_OPTS, "run-1", q.current_trace_id())
+        record = logging.LogRecord("dancer", logging.INFO, __file__, 1, "msg", None, None)
+        TraceIdFilter().filter(record)
+        assert record.trace_id == "t-1"
+    finally:
+        trace_id_var.reset(token)
+    assert all(j.meta == {"run_id": "run-1", "trace_id": "t-1"} for j in [head, *deferred])
+
+class _Base:
+    def perform_job(self, job, queue):
+        self.seen = trace_id_var.get()
+        return True
+
+class _Worker(worker.JobMetricsMixin, _Base):
+    pass
+
+class _Job:
+    meta = {"trace_id": "t-2"}
+    origin = "analysis"
+    func_name = "app.services.tasks.jobs.prepare_stage_job"
+    enqueued_at = datetime.now(timezone.utc) - timedelta(seconds=3)
+
+def test_worker_records_queue_wait_and_trace():
+    before = _value("beatmap_queue_wait_seconds_sum", queue="analysis")
+    w = _Worker()
+    assert w.perform_job(_Job(), None) is True
+    assert w.seen == "t-2" and trace_id_var.get() is None
+    assert _value("beatmap_queue_wait_seconds_sum", queue="analysis") - before >= 3
+    assert _value("beatmap_job_seconds_count", job="prepare_stage_job", outcome="ok") >= 1
@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+from sqlalchemy import MetaData, Table, create_engine, func, inspect, select
+from sqlalchemy.orm import Session
+from app.db.base import Base
+from app.db.models.track import Track
+from app.db.models.analysis import Analysis
+from app.db.models.stem import Stem
+from app.db.models.stem_event import StemEvent
+from app.db.migrate_packed import add_cache_indexes, add_packed_columns, add_timeline_indexes, backfill_stem_events
+from app.services.audio.grid import map_to_8count_array
+from app.services.audio.packed import pack_beats, pack_events, unpack_beats, unpack_events
+from app.services.audio.timeline import build_timeline_sync
+
+def _db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    return Session(engine)
+
+def test_beats_roundtrip_is_zero_copy():
+    counts = map_to_8count_array(np.arange(20) * 0.5, 0.0)
+    blob = pack_beats(counts)
+    b = unpack_beats(blob)
+    assert b.ms.tolist() == counts["ms"].tolist()
+    assert b.count.tolist() == counts["count"].tolist()
+    assert b.measure.tolist() == counts["measure"].tolist()
+    assert not b.ms.flags.owndata and not b.count.flags.owndata
+    assert len(blob) == 12 + 9 * len(counts)
+
+def test_events_roundtrip_and_bad_magic():
+    blob = pack_events([0, 500, 1000], [0.25, 1.5, 3.0], [1, -1, 3], [0, -1, 0])
+    ev = unpack_events(blob)
+    assert ev.ms.tolist() == [0, 500, 1000]
+    assert ev.strength.tolist() == [0.25, 1.5, 3.0]
+    assert ev.count.tolist() == [1, -1, 3]
+    with pytest.raises(ValueError):
+        unpack_beats(blob)
+
+def test_timeline_reads_packed_columns_and_backfill():
+    with _db() as db:
+        t = Track(title="a", source_type="upload", status="done")
+        db.add(t); db.flush()
+        counts = map_to_8count_array(np.array([0.5, 1.0, 1.5]), 0.0)
+        db.add(Analysis(track_id=t.id, bpm=120.0, beat_grid=pack_beats(counts)))
+        drums = Stem(track_id=t.id, stem_type="drums", events_packed=pack_events([500, 1500], [0.5, 2.0], [1, 3], [0, 0]))
+        bass = Stem(track_id=t.id, stem_type="bass")
+        db.add_all([drums, bass]); db.flush()
+        db.add(StemEvent(stem_id=bass.id, ts_ms=1000, strength=1.0, count_in_8=None, measure_index=None))
+        db.commit()
+
+        _, tl = build_timeline_sync(db, t.id)
+        assert [(b.ms, b.count) for b in tl.beatGrid] == [(500, 1), (1000, 2), (1500, 3)]
+        assert [(e.ms, e.strength) for e in tl.stems["drums"].events] == [(500, 0.5), (1500, 2.0)]
+        assert [(e.ms, e.count) for e in tl.stems["bass"].events] == [(1000, None)]
+
+        assert backfill_stem_events(db, batch_size=1, delete_rows=True) == 1
+        assert db.execute(select(func.count()).select_from(StemEvent)).scalar() == 0
+        _, tl2 = build_timeline_sync(db, t.id)
+        assert tl2 == tl
+
+def test_packed_columns_are_mediumblob_on_mysql():
+    from sqlalchemy.dialects import mysql
+    from app.db.migrate_packed import PACKED_COLUMNS
+    # MySQL은 BLOB(M)을 M이 들어가는 가장 작은 타입으로: 2**24 - 1 이하면 MEDIUMBLOB (2**24면 LONGBLOB)
+    for _, col in PACKED_COLUMNS:
+        assert col.type.compile(dialect=mysql.dialect()) == "BLOB(16777215)"
+
+def test_migration_adds_cache_columns_and_indexes():
+    # 이전 스키마: packed/캐시 컬럼이 없는 테이블
+    new_cols = {("analysis", "beat_grid"), ("stem", "events_packed"), ("track", "audio_hash"), ("analysis", "pipeline_version")}
+    legacy = MetaData()
+    for t in Base.metadata.sorted_tables:
+        Table(t.name, legacy, *[c._copy() for c in t.columns if (t.name, c.name) not in new_cols])
+    engine = create_engine("sqlite://")
+    legacy.create_all(engine)
+
+    assert set(add_packed_columns(engine)) == {f"{t}.{c}" for t, c in new_cols}
+    add_cache_indexes(engine)
+    add_timeline_indexes(engine)
+    assert add_packed_columns(engine) == []
+    add_cache_indexes(engine)  # 두 번 돌려도 안전
+
+    insp = inspect(engine)
+    indexed = {(t, tuple(i["column_names"])) for t in ("track", "analysis") for i in insp.get_indexes(t)}
+    assert ("track", ("audio_hash",)) in indexed
+    assert ("analysis", ("pipeline_version",)) in indexed
+    with Session(engine) as db:
+        t = Track(title="a", source_type="upload", status="done", audio_hash="ab" * 32)
+        db.add(t); db.flush()
+        db.add(Analysis(track_id=t.id, bpm=120.0, pipeline_version="v1"))
+        db.commit()
+        assert db.execute(select(Analysis.pipeline_version).join(Track).where(Track.audio_hash == "ab" * 32)).scalar() == "v1"
@@ -0,0 +1,33 @@
+from app.core.config import settings
+from app.services.audio.peaks import compute_peak_preview, compute_stem_peaks, PeakPyramid
+import numpy as np
+import soundfile as sf
+
+def test_peak_preview_and_pyramid(tmp_path):
+    rng = np.random.default_rng(0)
+    sr = 8000
+    data = (0.5 * rng.standard_normal((sr * 7 + 123, 2))).clip(-1, 1).astype(np.float32)
+    wav = str(tmp_path / "drums.wav")
+    sf.write(wav, data, sr, subtype="FLOAT")
+
+    # 기존 list comprehension 구현과 동일한 결과
+    mono = data.mean(axis=1)
+    step = max(1, len(mono) // settings.PEAKS_DOWNSAMPLE)
+    old = np.array([float(np.max(np.abs(mono[i:i+step]))) for i in range(0, len(mono), step)])[:settings.PEAKS_DOWNSAMPLE]
+    assert compute_peak_preview(wav) == (old * 32767.0).astype('<i2').tobytes()
+
+    preview, path = compute_stem_peaks(wav)
+    assert preview == compute_peak_preview(wav)
+    pyr = PeakPyramid(path)
+    assert pyr.sample_rate == sr and len(pyr.level_bins) == settings.PEAKS_LEVELS
+
+    level = 1
+    spb = pyr.samples_per_bin(level)
+    raw, start = pyr.read(level, from_ms=1000, to_ms=3000)
+    got = np.frombuffer(raw, dtype="<i2").reshape(-1, 2)
+    assert start == 1000 * sr // (1000 * spb)
+    for i, (lo, hi) in enumerate(got):
+        seg = mono[(start + i) * spb:(start + i + 1) * spb]
+        assert lo == int(np.clip(seg.min(), -1, 1) * 32767.0)
+        assert hi == int(np.clip(seg.max(), -1, 1) * 32767.0)
+    assert (start + len(got)) * spb >= 3 * sr
@@ -0,0 +1,37 @@
+from app.services.audio.phase import phase_shift, phase_shifts_batch
+import numpy as np
+
+def _score(beat_times, onset_times, shift, tol=0.07):
+    # 기존 estimate_phase_shift 의 채점식
+    period = float(np.median(np.diff(beat_times)))
+    base = float(beat_times[0]) + shift
+    recon = base + np.round((onset_times - base) / period) * period
+    return float(np.mean(np.abs(onset_times - recon) < tol))
+
+def _tracks(n=20, seed=1):
+    rng = np.random.default_rng(seed)
+    out = []
+    for _ in range(n):
+        period = rng.uniform(0.35, 0.7)
+        beat_times = rng.uniform(0, 0.3) + np.arange(200) * period
+        true = rng.uniform(0, period)
+        hits = beat_times[0] + true + rng.integers(0, 200, 300) * period + rng.normal(0, 0.01, 300)
+        onset_times = np.sort(np.concatenate([hits, rng.uniform(0, 200 * period, 100)]))
+        out.append((beat_times, onset_times))
+    return out
+
+def test_phase_shift_beats_old_scan():
+    for beat_times, onset_times in _tracks():
+        period = float(np.median(np.diff(beat_times)))
+        old_best = max(_score(beat_times, onset_times, s) for s in np.linspace(-period, period, 41))
+        shift, score = phase_shift(beat_times, onset_times, resolution=0.001)
+        assert -period <= shift < 0
+        assert abs(_score(beat_times, onset_times, shift) - score) < 0.01
+        assert score >= old_best - 0.01
+
+def test_phase_shifts_batch_matches_single():
+    tracks = _tracks(8, seed=2) + [(np.array([0.0]), np.array([0.1])), (np.arange(4) * 0.5, np.array([]))]
+    shifts, scores = phase_shifts_batch(tracks, resolution=0.001)
+    for (beat_times, onset_times), s, sc in zip(tracks, shifts, scores):
+        assert (s, sc) == phase_shift(beat_times, onset_times, resolution=0.001)
+    assert shifts[-1] == 0.0 and scores[-2] == 0.0
@@ -0,0 +1,101 @@
+import numpy as np
+import soundfile as sf
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import sessionmaker
+from app.core.config import settings
+from app.db.base import Base
+from app.db.models.track import Track
+from app.db.models.analysis import Analysis
+from app.db.models.stem import Stem
+from app.services.audio.packed import unpack_events
+from app.services.cache import results
+from app.services.tasks import jobs
+
+def _setup(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr(jobs, "_Session", sessionmaker(engine, expire_on_commit=False))
+    monkeypatch.setattr(settings, "STORAGE_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "DEMUCS_CHUNKED", False)
+    monkeypatch.setattr(results, "record_cache_result", lambda hit: None)
+    events = []
+    monkeypatch.setattr(jobs, "publish_progress", lambda track_id, stage, *a, **kw: events.append(stage))
+
+    # 클릭 트랙 (120 BPM) + 가짜 분리기: stem = 입력 복사
+    sr = 22050
+    y = np.zeros(sr * 6, dtype=np.float32)
+    for i in range(12):
+        y[i * sr // 2: i * sr // 2 + 200] = 0.8
+    wav = str(tmp_path / "t.wav")
+    sf.write(wav, y, sr)
+
+    def fake_separate(wav_path):
+        out = {}
+        for name in ("drums", "bass"):
+            out[name] = str(tmp_path / f"{name}.wav")
+            sf.write(out[name], y, sr)
+        return out
+    monkeypatch.setattr(jobs, "separate_stems", fake_separate)
+
+    Session = jobs._Session
+    with Session() as db:
+        t = Track(title="a", source_type="upload", status="queued", file_path=wav)
+        db.add(t); db.commit()
+        return Session, t.id, events
+
+def _events(Session, track_id):
+    with Session() as db:
+        stems = db.execute(select(Stem).where(Stem.track_id == track_id).order_by(Stem.id)).scalars().all()
+        return {s.stem_type: unpack_events(s.events_packed).ms.tolist() for s in stems}
+
+def test_dag_stages_match_single_job(tmp_path, monkeypatch):
+    Session, track_id, events = _setup(tmp_path, monkeypatch)
+    jobs.analyze_track_job(track_id)
+    single = _events(Session, track_id)
+    assert events == ["processing", "prepare", "beats", "separate", "events", "done"]
+
+    with Session() as db:
+        db.execute(Stem.__table__.delete()); db.commit()
+    assert jobs.prepare_stage_job(track_id) is False
+    analysis_id = jobs.beat_stage_job(track_id)
+    with Session() as db:
+        # 분리가 끝나기 전에도 BPM은 조회 가능
+        assert db.get(Track, track_id).status == "processing"
+        assert db.get(Analysis, analysis_id).bpm > 0
+    separated = jobs.separate_stage_job(track_id)
+    assert set(separated["stems"]) == {"drums", "bass"}
+    jobs.join_stage_job(track_id)  # 잡 결과 없이 DB에서 최신 분석/stem을 찾음
+
+    with Session() as db:
+        assert db.get(Track, track_id).status == "done"
+    assert _events(Session, track_id) == single and single["drums"]
+
+def test_single_job_persists_in_few_statements(tmp_path, monkeypatch):
+    Session, track_id, _ = _setup(tmp_path, monkeypatch)
+    monkeypatch.setattr(settings, "PERSIST_EVENT_ROWS", True)
+    engine = Session.kw["bind"]
+    seen = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cur, stmt, params, ctx, many: seen.append(stmt))
+    jobs.analyze_track_job(track_id)
+    inserts = [s for s in seen if s.startswith("INSERT INTO stem_event")]
+    assert len(inserts) == 1 and len(seen) < 40  # 이벤트는 executemany 한 번
+
+def test_dag_stages_skip_after_failure(tmp_path, monkeypatch):
+    Session, track_id, _ = _setup(tmp_path, monkeypatch)
+    with Session() as db:
+        db.get(Track, track_id).status = "failed"; db.commit()
+    assert jobs.beat_stage_job(track_id) is None
+    assert jobs.separate_stage_job(track_id) is None
+    with Session() as db:
+        assert db.execute(select(Analysis)).first() is None
+
+def test_analysis_jobs_dag_shape(monkeypatch):
+    from app.services.tasks import queue as q
+    monkeypatch.setattr(settings, "ANALYSIS_PIPELINE", "dag")
+    head, deferred, final = q._analysis_jobs(5, q.low_queue, q.ANALYSIS_JOB_OPTS)
+    beats, separate, join = deferred
+    assert head.func_name == q.PREPARE_STAGE_JOB and head.origin == settings.RQ_LOW_QUEUE
+    assert separate.origin == settings.RQ_HEAVY_QUEUE and beats.origin == settings.RQ_LOW_QUEUE
+    assert beats._dependency_ids == [head.id] == separate._dependency_ids
+    assert final is join and join.args == (5, beats.id, separate.id)
+    assert set(join._dependency_ids) == {beats.id, separate.id}
@@ -0,0 +1,43 @@
+import asyncio, json
+from app.services.tasks import progress
+from app.services.tasks.progress import progress_channel, progress_key, stream_progress
+
+class FakePubSub:
+    def __init__(self, messages):
+        self.messages, self.subscribed = list(messages), []
+    async def subscribe(self, ch): self.subscribed.append(ch)
+    async def unsubscribe(self, ch): self.subscribed.remove(ch)
+    async def aclose(self): pass
+    async def get_message(self, ignore_subscribe_messages=True, timeout=None):
+        return self.messages.pop(0) if self.messages else None
+
+class FakeRedis:
+    def __init__(self, last, messages):
+        self.last, self.ps = last, FakePubSub(messages)
+    def pubsub(self): return self.ps
+    async def get(self, key):
+        assert key == progress_key(7)
+        return self.last
+
+def _collect(r):
+    async def run():
+        return [m async for m in stream_progress(7, r, heartbeat_s=0.01)]
+    return asyncio.run(run())
+
+def _ev(stage, **kw):
+    return json.dumps(progress.progress_event(7, stage, 1.0, **kw)).encode()
+
+def test_stream_starts_from_last_event_and_stops_at_done():
+    msgs = [None, {"data": _ev("separating", percent=50)}, {"data": _ev("done")}, {"data": _ev("queued")}]
+    r = FakeRedis(_ev("beats", bpm=120.0), msgs)
+    out = _collect(r)
+    data = [json.loads(m.split("data: ")[1]) for m in out if m.startswith("event: progress")]
+    assert [d["stage"] for d in data] == ["beats", "separating", "done"]
+    assert data[0]["bpm"] == 120.0 and data[0]["percent"] == 30 and data[1]["percent"] == 50
+    assert ": keep-alive\n\n" in out
+    assert r.ps.subscribed == []  # 종료 시 구독 해제
+
+def test_stream_ends_immediately_for_finished_track():
+    r = FakeRedis(_ev("failed"), [{"data": _ev("done")}])
+    out = _collect(r)
+    assert len(out) == 1 and '"stage": "failed"' in out[0]
@@ -0,0 +1,44 @@
+from sqlalchemy import create_engine, select, func
+from sqlalchemy.orm import Session
+from app.db.base import Base
+from app.db.models.track import Track
+from app.db.models.analysis import Analysis
+from app.db.models.stem import Stem
+from app.db.models.stem_event import StemEvent
+from app.services.cache import results
+from app.services.cache.results import clone_cached_analysis, pipeline_version
+
+def test_clone_cached_analysis(monkeypatch):
+    hits = []
+    monkeypatch.setattr(results, "record_cache_result", hits.append)
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        src = Track(title="a", source_type="upload", status="done", audio_hash="h1", sample_rate=22050, duration_ms=1000)
+        db.add(src); db.flush()
+        db.add(Analysis(track_id=src.id, bpm=120.0, measures=2, pipeline_version=pipeline_version()))
+        stem = Stem(track_id=src.id, stem_type="drums", file_path="/x/drums.wav")
+        db.add(stem); db.flush()
+        db.add_all([StemEvent(stem_id=stem.id, ts_ms=i * 500, strength=1.0, count_in_8=i + 1, measure_index=0) for i in range(4)])
+        dst = Track(title="b", source_type="upload", status="pending", audio_hash="h1")
+        other = Track(title="c", source_type="upload", status="pending", audio_hash="h2")
+        db.add_all([dst, other]); db.commit()
+
+        assert clone_cached_analysis(db, other, "h2") is None
+        analysis = clone_cached_analysis(db, dst, "h1")
+        db.commit()
+        assert analysis.track_id == dst.id and analysis.bpm == 120.0
+        assert dst.status == "done" and dst.duration_ms == 1000
+        new_stem = db.execute(select(Stem).where(Stem.track_id == dst.id)).scalar_one()
+        assert new_stem.file_path == "/x/drums.wav"
+        assert db.scalar(select(func.count()).where(StemEvent.stem_id == new_stem.id)) == 4
+        assert hits == [False, True]
+
+def test_pipeline_version_covers_result_settings(monkeypatch):
+    from app.core.config import settings
+    seen = {pipeline_version()}
+    for name, value in [("PHASE_RESOLUTION_MS", 5.0), ("DEMUCS_SHIFTS", 2), ("DEMUCS_SEGMENT", 7.5),
+                        ("DEMUCS_OVERLAP", 0.2), ("DEMUCS_CHUNKED", True)]:
+        monkeypatch.setattr(settings, name, value)
+        seen.add(pipeline_version())
+    assert len(seen) == 6
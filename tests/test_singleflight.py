@@ -0,0 +1,109 @@
+from rq import SimpleWorker
+from rq.job import Job
+
+from app.core.config import settings
+from app.db.models.track import Track
+from app.services.tasks import jobs, queue, singleflight as sf
+from test_pipeline_dag import _setup
+
+def _work(redis_conn):
+    SimpleWorker(queue.analysis_queues(), connection=redis_conn).work(burst=True)
+
+def _inflight(redis_conn, track_id):
+    v = redis_conn.get(sf.inflight_key(track_id))
+    return v.decode() if v else None
+
+def test_repeated_enqueue_returns_the_running_job(fake_redis, monkeypatch):
+    monkeypatch.setattr(settings, "ANALYSIS_PIPELINE", "dag")
+    first = queue.enqueue_analyses([1, 2])
+    again = queue.enqueue_analyses([1, 3])
+    assert again[1].id == first[1].id == _inflight(fake_redis, 1)
+    assert queue.get_queue(settings.RQ_QUEUE).count == 3  # 트랙 1의 prepare는 한 번만
+
+def test_run_lifecycle_releases_key(tmp_path, fake_redis, monkeypatch):
+    Session, track_id, _ = _setup(tmp_path, monkeypatch)
+    monkeypatch.setattr(settings, "ANALYSIS_PIPELINE", "dag")
+
+    # 완료 -> 해제
+    run = queue.enqueue_analysis(track_id)
+    assert _inflight(fake_redis, track_id) == run.id
+    _work(fake_redis)
+    with Session() as db:
+        assert db.get(Track, track_id).status == "done"
+        copy = Track(title="b", source_type="upload", status="queued", file_path=db.get(Track, track_id).file_path)
+        db.add(copy); db.commit()
+        copy_id = copy.id
+    assert _inflight(fake_redis, track_id) is None
+
+    # 같은 오디오 -> prepare에서 캐시 HIT -> 해제
+    queue.enqueue_analysis(copy_id)
+    _work(fake_redis)
+    with Session() as db:
+        assert db.get(Track, copy_id).status == "done"
+    assert _inflight(fake_redis, copy_id) is None
+
+    # 분리 실패 -> failed + 해제
+    def broken(wav_path):
+        raise RuntimeError("demucs crashed")
+    monkeypatch.setattr(jobs, "separate_stems", broken)
+    with Session() as db:
+        db.get(Track, track_id).audio_hash = None; db.commit()
+    monkeypatch.setattr(jobs, "clone_cached_analysis", lambda db, t, h: None)
+    queue.enqueue_analysis(track_id)
+    _work(fake_redis)
+    with Session() as db:
+        assert db.get(Track, track_id).status == "failed"
+    assert _inflight(fake_redis, track_id) is None
+
+def test_hijacked_key_makes_stages_skip(tmp_path, fake_redis, monkeypatch):
+    Session, track_id, events = _setup(tmp_path, monkeypatch)
+    monkeypatch.setattr(settings, "ANALYSIS_PIPELINE", "dag")
+    queue.enqueue_analysis(track_id)
+    # 다른 run이 살아 있는 것처럼 키를 가로챈다 -> 모든 단계가 실행하지 않고 넘어간다
+    other = queue.get_queue(settings.RQ_QUEUE).create_job("x.y", args=(track_id,))
+    other.save()
+    fake_redis.set(sf.inflight_key(track_id), other.id)
+    _work(fake_redis)
+    with Session() as db:
+        assert db.get(Track, track_id).status == "queued"
+    assert events == [] and _inflight(fake_redis, track_id) == other.id
+
+def test_stale_claims_are_replaced(fake_redis):
+    fake_redis.set(sf.inflight_key(5), "nosuchjob")
+    done = queue.get_queue(settings.RQ_QUEUE).create_job("x.y", args=(6,))
+    done.save(); done.set_status("finished")
+    fake_redis.set(sf.inflight_key(6), done.id)
+
+    claimed, existing = sf.claim_analyses([5, 6])
+    assert existing == {} and set(claimed) == {5, 6}
+    assert _inflight(fake_redis, 5) == claimed[5] and _inflight(fake_redis, 6) == claimed[6]
+
+def test_run_with_dead_stage_is_not_alive(fake_redis, monkeypatch):
+    # 워커가 죽어 release 없이 beats만 실패 -> join은 영원히 DEFERRED
+    monkeypatch.setattr(settings, "ANALYSIS_PIPELINE", "dag")
+    monkeypatch.setattr(jobs, "prepare_stage_job", lambda tid: False)
+    monkeypatch.setattr(jobs, "separate_stage_job", lambda tid: {})
+    monkeypatch.setattr(jobs, "join_stage_job", lambda tid, b, s: None)
+
+    def crash(tid):
+        raise RuntimeError("worker died")
+    monkeypatch.setattr(jobs, "beat_stage_job", crash)
+
+    run = queue.enqueue_analysis(1)
+    beats_id, separate_id = run.args[1:]
+    assert sf.run_alive(run.id)  # prepare 대기 중
+    _work(fake_redis)
+    assert Job.fetch(run.id, connection=fake_redis).get_status() == "deferred"
+    assert Job.fetch(beats_id, connection=fake_redis).get_status() == "failed"
+    assert not sf.run_alive(run.id)
+    claimed, existing = sf.claim_analyses([1])
+    assert existing == {} and claimed[1] != run.id
+
+    # 취소된 앞 단계 / 앞 단계가 모두 사라진 경우도 끝난 run
+    run = queue.enqueue_analysis(2)
+    Job.fetch(run.args[1], connection=fake_redis).cancel()
+    assert not sf.run_alive(run.id)
+    run = queue.enqueue_analysis(3)
+    for job_id in run.args[1:]:
+        Job.fetch(job_id, connection=fake_redis).delete()
+    assert not sf.run_alive(run.id)
@@ -0,0 +1,97 @@
+import asyncio
+import os
+import stat
+import sys
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.api.routes.stems import _stem_audio_response
+from app.core.config import settings
+from app.services.audio.transcode import TranscodeBusy, TranscodePool, opus_path
+
+def _client(path):
+    app = FastAPI()
+
+    @app.api_route("/audio", methods=["GET", "HEAD"])
+    async def audio(request: Request):
+        return _stem_audio_response(request, 1, path, os.stat(path))
+    return TestClient(app)
+
+def test_stem_audio_range_and_etag(tmp_path):
+    path = str(tmp_path / "drums.flac")
+    body = bytes(range(256)) * 400
+    open(path, "wb").write(body)
+    client = _client(path)
+
+    full = client.get("/audio")
+    assert full.status_code == 200 and full.content == body
+    assert full.headers["content-type"] == "audio/flac" and full.headers["accept-ranges"] == "bytes"
+    etag = full.headers["etag"]
+    assert not etag.startswith("W/")
+
+    part = client.get("/audio", headers={"Range": "bytes=1000-1999", "If-Range": etag})
+    assert part.status_code == 206 and part.content == body[1000:2000]
+    assert part.headers["content-range"] == f"bytes 1000-1999/{len(body)}"
+    assert client.get("/audio", headers={"Range": "bytes=1000-1999", "If-Range": '"stale"'}).status_code == 200
+    assert client.get("/audio", headers={"Range": f"bytes={len(body)}-"}).status_code == 416
+    assert client.get("/audio", headers={"If-None-Match": etag}).status_code == 304
+
+def test_stem_audio_accel_redirect(tmp_path, monkeypatch):
+    os.makedirs(tmp_path / "stems" / "3")
+    path = str(tmp_path / "stems" / "3" / "bass.wav")
+    open(path, "wb").write(b"RIFF")
+    monkeypatch.setattr(settings, "STORAGE_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "STEM_AUDIO_ACCEL_PREFIX", "/_media/")
+    res = _client(path).get("/audio")
+    assert res.headers["x-accel-redirect"] == "/_media/stems/3/bass.wav" and res.content == b""
+
+def _fake_ffmpeg(tmp_path, delay=0.2):
+    """'-i src ... dst' 를 복사만 하는 ffmpeg 대역 (호출 횟수 기록)"""
+    script = tmp_path / "ffmpeg"
+    script.write_text(
+        f"#!{sys.executable}\n"
+        "import shutil, sys, time\n"
+        f"time.sleep({delay})\n"
+        f"open({str(tmp_path / 'calls')!r}, 'a').write('x')\n"
+        "shutil.copy(sys.argv[sys.argv.index('-i') + 1], sys.argv[-1])\n"
+    )
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    return str(script)
+
+def test_transcode_pool_dedups_and_bounds(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "FFMPEG_BIN", _fake_ffmpeg(tmp_path))
+    src = str(tmp_path / "vocals.flac")
+    open(src, "wb").write(b"audio")
+    others = [str(tmp_path / f"o{i}.flac") for i in range(3)]
+    for p in others:
+        open(p, "wb").write(b"audio")
+
+    async def main():
+        pool = TranscodePool(workers=1, queue=1)
+        a, b = await asyncio.gather(pool.to_opus(src), pool.to_opus(src))  # 같은 파일은 한 번만
+        assert a == b == opus_path(src) and open(a, "rb").read() == b"audio"
+        assert await pool.to_opus(src) == a  # 캐시
+        first = [asyncio.ensure_future(pool.to_opus(p)) for p in others[:2]]
+        await asyncio.sleep(0)
+        try:
+            await pool.to_opus(others[2])
+            assert False, "pool should be full"
+        except TranscodeBusy:
+            pass
+        await asyncio.gather(*first)
+
+    asyncio.run(main())
+    assert open(tmp_path / "calls").read() == "xxx"
+
+def test_missing_ffmpeg_is_transcode_error(tmp_path, monkeypatch):
+    from app.services.audio.transcode import TranscodeError
+    monkeypatch.setattr(settings, "FFMPEG_BIN", str(tmp_path / "no-such-ffmpeg"))
+    src = str(tmp_path / "bass.flac")
+    open(src, "wb").write(b"audio")
+    try:
+        asyncio.run(TranscodePool(workers=1, queue=0).to_opus(src))
+        assert False, "missing ffmpeg must fail the transcode"
+    except TranscodeError as e:
+        assert "no-such-ffmpeg" in str(e)
+    assert not os.path.exists(opus_path(src))
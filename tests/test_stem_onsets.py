@@ -0,0 +1,37 @@
+import numpy as np
+import soundfile as sf
+from app.services.audio.events import iter_stem_onsets
+
+def _clicks(bpm, seconds, sr, gain, seed):
+    rng = np.random.default_rng(seed)
+    y = np.zeros(int(sr * seconds), dtype=np.float32)
+    burst = (rng.standard_normal(sr // 50) * np.exp(-np.linspace(0, 8, sr // 50))).astype(np.float32)
+    for start in np.arange(0, len(y) - len(burst), sr * 60.0 / bpm).astype(int):
+        y[start : start + len(burst)] += gain * burst
+    return y
+
+def test_onset_modes_agree(tmp_path):
+    # 길이/레벨이 다른 stem: batch의 0 패딩과 dB 변환이 stem별 결과를 바꾸면 안 된다
+    sr = 22050
+    stems = {
+        "drums": _clicks(120, 6, sr, 0.8, 0),
+        "bass": _clicks(60, 6, sr, 0.5, 1),
+        "vocals": _clicks(90, 4.5, sr, 0.3, 2),
+        "other": _clicks(150, 3, sr, 0.005, 3),
+    }
+    paths = {}
+    for name, y in stems.items():
+        paths[name] = str(tmp_path / f"{name}.wav")
+        sf.write(paths[name], y, sr, subtype="FLOAT")
+
+    got = {
+        mode: {name: (t, s) for name, t, s in iter_stem_onsets(paths, sr, mode=mode, workers=2)}
+        for mode in ("serial", "batch", "pool")
+    }
+    for mode in ("batch", "pool"):
+        assert set(got[mode]) == set(paths)
+        for name in paths:
+            times, strength = got["serial"][name]
+            assert len(times) > 0
+            np.testing.assert_array_equal(got[mode][name][0], times)
+            np.testing.assert_allclose(got[mode][name][1], strength, rtol=1e-5, atol=1e-6)
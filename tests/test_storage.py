@@ -0,0 +1,108 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import soundfile as sf
+
+from app.services.audio.io import ensure_wav, hash_wav
+from app.services.storage.backends import LocalFlacStorage, ObjectStorage, is_object_ref
+
+def _wav(path, sr=22050, seconds=3.0):
+    t = np.arange(int(sr * seconds)) / sr
+    y = 0.3 * np.sin(2 * np.pi * 220 * t) * np.exp(-(t % 0.5) * 6)
+    sf.write(path, y.astype(np.float32), sr, subtype="PCM_16")
+    return path
+
+def test_flac_backend_is_lossless(tmp_path):
+    wav = _wav(str(tmp_path / "1.wav"))
+    before, size = hash_wav(wav), os.path.getsize(wav)
+    ref = LocalFlacStorage().store_audio(wav)
+    assert ref.endswith(".flac") and not os.path.exists(wav)
+    assert os.path.getsize(ref) < size / 2
+    assert hash_wav(ref) == before  # PCM 그대로 -> 결과 캐시 키 유지
+    assert ensure_wav(ref)[1:] == (22050, 3000)
+
+class _Store(BaseHTTPRequestHandler):
+    objects = {}
+    def do_PUT(self):
+        self.objects[self.path] = self.rfile.read(int(self.headers["Content-Length"]))
+        self.send_response(201); self.end_headers()
+    def do_GET(self):
+        body = self.objects.get(self.path)
+        self.send_response(200 if body is not None else 404)
+        self.send_header("Content-Length", str(len(body or b""))); self.end_headers()
+        self.wfile.write(body or b"")
+    def do_DELETE(self):
+        self.objects.pop(self.path, None)
+        self.send_response(204); self.end_headers()
+    def log_message(self, *args):
+        pass
+
+def test_object_backend_roundtrip(tmp_path):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Store)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        storage = ObjectStorage(f"http://127.0.0.1:{server.server_port}/bucket", str(tmp_path))
+        os.makedirs(tmp_path / "stems" / "7")
+        wav = _wav(str(tmp_path / "stems" / "7" / "drums.wav"))
+        before = hash_wav(wav)
+        open(wav + ".peaks", "wb").write(b"PEAKS")
+
+        ref = storage.store_audio(wav)
+        storage.store_file(wav + ".peaks", ref + ".peaks")
+        assert is_object_ref(ref) and ref == "object://stems/7/drums.flac"
+        assert set(_Store.objects) == {"/bucket/stems/7/drums.flac", "/bucket/stems/7/drums.flac.peaks"}
+
+        # 캐시를 지워도 다시 내려받는다
+        os.remove(storage.local_path(ref))
+        os.remove(storage.local_path(ref + ".peaks"))
+        assert hash_wav(storage.local_path(ref)) == before
+        assert open(storage.local_path(ref + ".peaks"), "rb").read() == b"PEAKS"
+
+        storage.delete(ref)
+        assert not os.path.exists(str(tmp_path / "stems" / "7" / "drums.flac"))
+        try:
+            storage.local_path(ref)
+            assert False, "deleted object must not resolve"
+        except FileNotFoundError:
+            pass
+    finally:
+        server.shutdown()
+
+def test_object_backend_concurrent_downloads(tmp_path):
+    # 캐시에 없는 같은 ref를 요청 스레드 여러 개가 동시에 내려받는 경우
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Store)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        storage = ObjectStorage(f"http://127.0.0.1:{server.server_port}/bucket", str(tmp_path), flac=False)
+        body = os.urandom(4 << 20)
+        _Store.objects["/bucket/stems/9/bass.wav"] = body
+        ref = "object://stems/9/bass.wav"
+        for _ in range(3):
+            start, results, errors = threading.Barrier(4), [], []
+
+            def fetch():
+                start.wait()
+                try:
+                    results.append(storage.local_path(ref))
+                except Exception as e:
+                    errors.append(e)
+
+            threads = [threading.Thread(target=fetch) for _ in range(4)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            assert errors == [] and len(set(results)) == 1
+            assert open(results[0], "rb").read() == body
+            os.remove(results[0])
+
+        try:
+            storage.local_path("object://stems/9/missing.wav")
+            assert False, "missing object must not resolve"
+        except FileNotFoundError:
+            pass
+        assert os.listdir(tmp_path / "stems" / "9") == []  # .part 임시 파일이 남지 않음
+    finally:
+        server.shutdown()
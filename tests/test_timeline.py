@@ -0,0 +1,141 @@
+import json, threading, time
+import msgpack
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.db.base import Base
+from app.db.models.track import Track
+from app.db.models.analysis import Analysis
+from app.db.models.stem import Stem
+from app.db.models.stem_event import StemEvent
+from app.services.audio.grid import map_to_8count_array
+from app.services.audio.packed import pack_beats, pack_events
+from app.services.audio.timeline import build_timeline_sync, collect_timeline, encode_timeline, render_timeline
+from app.services.cache.timeline import read_cached_timeline, write_cached_timeline, invalidate_timeline
+
+def _db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    return Session(engine)
+
+def test_build_timeline_uses_latest_stems_and_keeps_empty_lanes():
+    with _db() as db:
+        t = Track(title="a", source_type="upload", status="done")
+        db.add(t); db.flush()
+        db.add(Analysis(track_id=t.id, bpm=100.0))
+        old = Stem(track_id=t.id, stem_type="drums")
+        db.add(old); db.flush()
+        db.add(StemEvent(stem_id=old.id, ts_ms=1, strength=1.0, count_in_8=1, measure_index=0))
+        drums, bass = Stem(track_id=t.id, stem_type="drums"), Stem(track_id=t.id, stem_type="bass")
+        db.add_all([drums, bass]); db.flush()
+        db.add_all([StemEvent(stem_id=drums.id, ts_ms=ms, strength=0.5, count_in_8=c, measure_index=0)
+                    for ms, c in [(1000, 3), (500, 2), (1000, 3)]])
+        db.commit()
+
+        analysis_id, tl = build_timeline_sync(db, t.id)
+        assert [e.ms for e in tl.stems["drums"].events] == [1000, 500, 1000]
+        assert tl.stems["bass"].events == []
+        assert [(b.idx, b.ms, b.count) for b in tl.beatGrid] == [(0, 500, 2), (1, 1000, 3)]
+
+        t.status = "processing"; db.commit()
+        assert build_timeline_sync(db, t.id) is None
+
+def test_timeline_cache_roundtrip(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "STORAGE_DIR", str(tmp_path))
+    assert read_cached_timeline(1, 7) is None
+    etag = write_cached_timeline(1, 7, b'{"trackId":1}')
+    assert read_cached_timeline(1, 7) == (b'{"trackId":1}', etag)
+    invalidate_timeline(1)
+    assert read_cached_timeline(1, 7) is None
+
+def test_timeline_cache_concurrent_writes(tmp_path, monkeypatch):
+    # 같은 키의 첫 조회가 동시에 들어와 asyncio.to_thread로 함께 쓰는 경우
+    monkeypatch.setattr(settings, "STORAGE_DIR", str(tmp_path))
+    data = b'{"trackId":1}' * 4096
+    start, errors = threading.Barrier(4), []
+
+    def write():
+        start.wait()
+        for _ in range(10):
+            try:
+                write_cached_timeline(1, 7, data)
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=write) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert read_cached_timeline(1, 7)[0] == data
+    assert sorted(p.name for p in (tmp_path / "timelines" / "1").iterdir()) == ["7.json"]
+
+def test_timeline_window_and_stem_filter():
+    with _db() as db:
+        t = Track(title="a", source_type="upload", status="done")
+        db.add(t); db.flush()
+        counts = map_to_8count_array(np.arange(10) * 0.5, 0.0)  # 0, 500, ... 4500ms
+        db.add(Analysis(track_id=t.id, bpm=120.0, beat_grid=pack_beats(counts)))
+        drums = Stem(track_id=t.id, stem_type="drums", events_packed=pack_events(
+            counts["ms"], np.ones(10), counts["count"], counts["measure"]))
+        bass = Stem(track_id=t.id, stem_type="bass")
+        db.add_all([drums, bass]); db.flush()
+        db.add_all([StemEvent(stem_id=bass.id, ts_ms=ms, strength=1.0, count_in_8=1, measure_index=0)
+                    for ms in (0, 1000, 2000, 3000)])
+        db.commit()
+
+        _, tl = build_timeline_sync(db, t.id, from_ms=1000, to_ms=2500)
+        assert [(b.idx, b.ms) for b in tl.beatGrid] == [(2, 1000), (3, 1500), (4, 2000)]
+        assert [e.ms for e in tl.stems["drums"].events] == [1000, 1500, 2000]
+        assert [e.ms for e in tl.stems["bass"].events] == [1000, 2000]
+
+        _, tl = build_timeline_sync(db, t.id, from_ms=4000, stems=["bass"])
+        assert list(tl.stems) == ["bass"] and tl.stems["bass"].events == []
+        assert [b.ms for b in tl.beatGrid] == [4000, 4500]
+
+def test_msgpack_timeline_is_smaller_and_faster_than_json():
+    # 약 10분 트랙: 비트 1200개, stem 4개 x 이벤트 3000개
+    rng = np.random.default_rng(0)
+    counts = map_to_8count_array(np.arange(1200) * 0.5, 0.0)
+    packed = []
+    for i, name in enumerate(["drums", "bass", "vocals", "other"]):
+        idx = np.sort(rng.integers(0, len(counts), 3000))
+        packed.append((i, name, pack_events(counts["ms"][idx], rng.random(3000) * 10, counts["count"][idx], counts["measure"][idx])))
+    cols = collect_timeline(1, 120.0, [], beat_grid=pack_beats(counts), packed_lanes=packed)
+
+    def best(fmt):
+        times = []
+        for _ in range(3):
+            s = time.perf_counter(); data = render_timeline(cols, fmt); times.append(time.perf_counter() - s)
+        return data, min(times)
+
+    js, t_json = best("json")
+    mp, t_mp = best("msgpack")
+    assert len(mp) * 3 < len(js)
+    assert t_mp * 3 < t_json
+
+    doc = msgpack.unpackb(mp)
+    assert doc["v"] == 1 and doc["trackId"] == 1
+    lane = doc["stems"]["drums"]
+    assert np.frombuffer(lane["ms"], "<i4").tolist() == [e["ms"] for e in json.loads(js)["stems"]["drums"]["events"]]
+    assert np.frombuffer(doc["beatGrid"]["ms"], "<i4").tolist() == counts["ms"].tolist()
+
+def test_timeline_format_honours_accept_q_values():
+    from starlette.requests import Request
+    from app.api.routes.stems import _timeline_format
+
+    def fmt(accept):
+        headers = [(b"accept", accept.encode())] if accept is not None else []
+        return _timeline_format(Request({"type": "http", "headers": headers}))
+
+    assert fmt(None) == "json"
+    assert fmt("*/*") == "json"
+    assert fmt("application/x-msgpack") == "msgpack"
+    assert fmt("application/msgpack, */*") == "msgpack"
+    assert fmt("application/msgpack;q=0") == "json"  # q=0: 허용 안 함
+    assert fmt("application/msgpack;q=0, application/json") == "json"
+    assert fmt("application/json, application/msgpack;q=0.5") == "json"
+    assert fmt("application/json;q=0.4, application/x-msgpack;q=0.8") == "msgpack"
+    assert fmt("text/html, application/msgpack;q=bogus") == "json"
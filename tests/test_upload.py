@@ -0,0 +1,73 @@
+import io
+import shutil
+
+import numpy as np
+import pytest
+import soundfile as sf
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.routes import tracks
+from app.core.config import settings
+from app.services.audio.io import hash_wav
+
+pytestmark = pytest.mark.skipif(shutil.which(settings.FFMPEG_BIN) is None, reason="ffmpeg not installed")
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    # DB 대신 트랙 레코드를 dict에 기록
+    records = {}
+
+    async def create_stub(*, filename, source_type, status="pending"):
+        records[len(records) + 1] = {"title": filename, "status": status}
+        return len(records)
+
+    async def finalize(track_id, file_path, audio_hash=None, status="pending"):
+        records[track_id].update(file_path=file_path, audio_hash=audio_hash, status=status)
+
+    async def no_cache(track_id, audio_hash):
+        return False
+
+    monkeypatch.setattr(tracks, "_create_stub_record", create_stub)
+    monkeypatch.setattr(tracks, "_finalize_record", finalize)
+    monkeypatch.setattr(tracks, "_reuse_cached_analysis", no_cache)
+    monkeypatch.setattr(settings, "STORAGE_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "local")
+    app = FastAPI()
+    app.include_router(tracks.router, prefix="/tracks")
+    c = TestClient(app)
+    c.records = records
+    return c
+
+def _wav_bytes(seconds=1.0, sr=44100):
+    t = np.arange(int(sr * seconds)) / sr
+    y = 0.3 * np.sin(2 * np.pi * 440 * t)
+    buf = io.BytesIO()
+    sf.write(buf, np.stack([y, y], axis=1), sr, format="WAV", subtype="PCM_16")
+    return buf.getvalue()
+
+def test_upload_converts_and_hashes_like_hash_wav(client):
+    body = _wav_bytes()
+    for res in (
+        client.post("/tracks/upload_stream?filename=a.wav", content=body),
+        client.post("/tracks/upload", files={"file": ("b.wav", body, "audio/wav")}),
+    ):
+        assert res.status_code == 201 and res.json()["status"] == "pending"
+        rec = client.records[res.json()["id"]]
+        info = sf.info(rec["file_path"])
+        assert (info.samplerate, info.channels) == (settings.TARGET_SR, 1)
+        assert abs(info.duration - 1.0) < 0.01
+        assert rec["audio_hash"] == hash_wav(rec["file_path"])
+
+def test_upload_too_large_is_413(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "MAX_UPLOAD_BYTES", 32 * 1024)
+    res = client.post("/tracks/upload_stream?filename=big.wav", content=_wav_bytes(2.0))
+    assert res.status_code == 413
+    rec = client.records[1]
+    assert rec["status"] == "failed" and rec["file_path"] == ""
+    assert not list((tmp_path / "tracks").glob("*.wav"))
+
+def test_upload_corrupt_input_is_400(client):
+    res = client.post("/tracks/upload_stream?filename=junk.mp3", content=b"not audio at all" * 1000)
+    assert res.status_code == 400 and "Unsupported or corrupt audio" in res.json()["detail"]
+    assert client.records[1]["status"] == "failed"
@@ -0,0 +1,31 @@
+import worker
+from app.services.tasks.warmup import click_track, warm_up
+
+def test_warm_up_runs_dsp_stack():
+    timings = warm_up(preload_demucs=False)
+    assert set(timings) == {"import", "beat_grid", "phase", "counts", "onsets", "peaks"}
+    assert len(click_track(1000, seconds=2.0)) == 2000
+
+class _Base:
+    def execute_job(self, job, queue):
+        return self.perform_job(job, queue)
+    def perform_job(self, job, queue):
+        return job.func()
+
+class _Timed(worker.StartupTimingMixin, _Base):
+    pass
+
+class _Job:
+    id = "j1"
+    def __init__(self):
+        self.meta, self.saved = {}, False
+    @property
+    def func(self):
+        return lambda: "ok"
+    def save_meta(self):
+        self.saved = True
+
+def test_startup_timing_recorded_in_job_meta():
+    job = _Job()
+    assert _Timed().execute_job(job, None) == "ok"
+    assert job.saved and job.meta["startup_ms"] >= job.meta["import_ms"] >= 0
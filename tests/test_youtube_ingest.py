@@ -0,0 +1,103 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+import soundfile as sf
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.api.routes import tracks
+from app.core.config import settings
+from app.db.base import Base
+from app.db.models.track import Track
+from app.services.audio.io import hash_wav
+from app.services.cache import results
+from app.services.tasks import jobs, queue
+
+def _setup(tmp_path, monkeypatch, download):
+    engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(engine, expire_on_commit=False)
+    monkeypatch.setattr(jobs, "_Session", Session)
+    monkeypatch.setattr(settings, "STORAGE_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "local")
+    monkeypatch.setattr(results, "record_cache_result", lambda hit: None)
+    monkeypatch.setattr(jobs, "download_youtube_wav", download)
+    queued = []
+
+    def enqueue(track_id):
+        queued.append(track_id)
+        return SimpleNamespace(id=f"run-{track_id}")
+    monkeypatch.setattr(jobs, "enqueue_analysis", enqueue)
+    with Session() as db:
+        t = Track(title="https://youtu.be/x", source_type="youtube", status="downloading", file_path="")
+        db.add(t); db.commit()
+        return Session, t.id, queued
+
+def _fake_download(url, out_base):
+    sr = settings.TARGET_SR
+    wav = f"{out_base}.wav"
+    sf.write(wav, (0.3 * np.sin(np.arange(sr) / 10)).astype(np.float32), sr, subtype="PCM_16")
+    return wav, "Song Title"
+
+def test_ingest_youtube_job_stores_and_queues_analysis(tmp_path, monkeypatch):
+    Session, track_id, queued = _setup(tmp_path, monkeypatch, _fake_download)
+    jobs.ingest_youtube_job(track_id, "https://youtu.be/x", analyze=True)
+    with Session() as db:
+        t = db.get(Track, track_id)
+        assert (t.title, t.status) == ("Song Title", "queued")
+        assert t.file_path == str(tmp_path / "tracks" / f"{track_id}.wav")
+        assert t.audio_hash == hash_wav(t.file_path)
+    assert queued == [track_id]
+
+    # analyze=False면 pending으로 두고 큐잉하지 않는다
+    jobs.ingest_youtube_job(track_id, "https://youtu.be/x")
+    with Session() as db:
+        assert db.get(Track, track_id).status == "pending"
+    assert queued == [track_id]
+
+def test_ingest_youtube_job_marks_failed(tmp_path, monkeypatch):
+    def broken(url, out_base):
+        raise RuntimeError("video unavailable")
+    Session, track_id, queued = _setup(tmp_path, monkeypatch, broken)
+    with pytest.raises(RuntimeError):
+        jobs.ingest_youtube_job(track_id, "https://youtu.be/x", analyze=True)
+    with Session() as db:
+        assert db.get(Track, track_id).status == "failed"
+    assert queued == []
+
+def test_upload_yt_enqueues_ingest_job(fake_redis, monkeypatch):
+    records = {}
+
+    async def create_stub(*, filename, source_type, status="pending"):
+        records[7] = {"title": filename, "source_type": source_type, "status": status}
+        return 7
+
+    async def finalize(track_id, file_path, audio_hash=None, status="pending"):
+        records[track_id]["status"] = status
+
+    monkeypatch.setattr(tracks, "_create_stub_record", create_stub)
+    monkeypatch.setattr(tracks, "_finalize_record", finalize)
+    app = FastAPI()
+    app.include_router(tracks.router, prefix="/tracks")
+    client = TestClient(app)
+
+    res = client.post("/tracks/upload_yt", params={"url": "https://youtu.be/x", "analyze": "true"})
+    assert res.status_code == 201
+    body = res.json()
+    assert body["id"] == 7 and body["status"] == "downloading"
+    assert records[7]["status"] == "downloading" and records[7]["source_type"] == "youtube"
+    q = queue.get_queue(settings.RQ_QUEUE)
+    assert q.job_ids == [body["job_id"]]
+    job = q.fetch_job(body["job_id"])
+    assert job.func_name == queue.INGEST_YOUTUBE_JOB and job.args == (7, "https://youtu.be/x", True)
+
+    # 큐잉 실패 -> 스텁 레코드는 failed
+    def boom(*a, **kw):
+        raise ConnectionError("redis down")
+    monkeypatch.setattr(tracks, "enqueue_youtube_ingest", boom)
+    with pytest.raises(ConnectionError):
+        client.post("/tracks/upload_yt", params={"url": "https://youtu.be/x"})
+    assert records[7]["status"] == "failed"
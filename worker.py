@@ -4,13 +4,19 @@ from __future__ import annotations
 import argparse
 import logging
 import os
+import shutil
 import signal
 import sys
+import tempfile
+import time
+from datetime import timezone
 from typing import List
 
 from redis import Redis
-from rq import Worker, Queue
+from rq import Worker, Queue, SimpleWorker
 from rq.logutils import setup_loghandlers
+from rq.utils import now
+from rq.worker_pool import WorkerPool
 
 # ────────────────────────────────────────────────────────────────────────────
 # 프로젝트 루트 경로 추가 (app.* 임포트 보장)
@@ -40,6 +46,92 @@ def _install_signal_handlers():
     signal.signal(signal.SIGTERM, _signal_handler)
 
 
+# ────────────────────────────────────────────────────────────────────────────
+# 잡 시작 오버헤드 측정 (웜업 효과 확인용)
+#   dispatch(부모가 잡을 꺼냄) -> perform_job 진입(fork면 work horse 안) -> 잡 함수 임포트 완료
+#   로그 + job.meta["startup_ms"/"import_ms"]
+# ────────────────────────────────────────────────────────────────────────────
+class StartupTimingMixin:
+    def execute_job(self, job, queue):
+        self._dispatched_at = time.perf_counter()  # CLOCK_MONOTONIC: fork 후에도 같은 기준
+        return super().execute_job(job, queue)
+
+    def perform_job(self, job, queue):
+        entered = time.perf_counter()
+        try:
+            job.func  # 잡 모듈 임포트 (웜업 안 했으면 librosa/numba 임포트가 여기서 일어남)
+        except Exception:
+            pass  # 임포트 실패는 perform_job이 잡 실패로 처리
+        ready = time.perf_counter()
+        startup_ms = (ready - getattr(self, "_dispatched_at", entered)) * 1000
+        import_ms = (ready - entered) * 1000
+        logging.info("Job %s startup overhead %.1fms (import %.1fms)", job.id, startup_ms, import_ms)
+        try:
+            job.meta.update(startup_ms=round(startup_ms, 1), import_ms=round(import_ms, 1))
+            job.save_meta()
+        except Exception:
+            logging.warning("Failed to save startup overhead for job %s", job.id)
+        return super().perform_job(job, queue)
+
+
+# ────────────────────────────────────────────────────────────────────────────
+# 잡 메트릭 + trace id
+#   큐 대기(enqueued_at -> perform_job), 잡 실행 시간/결과, job.meta["trace_id"]를 로그 컨텍스트로
+#   app.core.metrics는 _setup_metrics_dir() 이후에 임포트해야 해서 메서드 안에서 임포트
+# ────────────────────────────────────────────────────────────────────────────
+class JobMetricsMixin:
+    def perform_job(self, job, queue):
+        from app.core.metrics import JOB_SECONDS, QUEUE_WAIT_SECONDS
+        from app.core.tracing import trace_id_var
+
+        token = trace_id_var.set(job.meta.get("trace_id"))
+        if job.enqueued_at is not None:
+            enqueued_at = job.enqueued_at
+            if enqueued_at.tzinfo is None:
+                enqueued_at = enqueued_at.replace(tzinfo=timezone.utc)
+            QUEUE_WAIT_SECONDS.labels(queue=job.origin).observe(max((now() - enqueued_at).total_seconds(), 0.0))
+        s = time.perf_counter()
+        ok = False
+        try:
+            ok = super().perform_job(job, queue)
+            return ok
+        finally:
+            JOB_SECONDS.labels(
+                job=(job.func_name or "").rsplit(".", 1)[-1], outcome="ok" if ok else "failed",
+            ).observe(time.perf_counter() - s)
+            trace_id_var.reset(token)
+
+
+class TimedWorker(JobMetricsMixin, StartupTimingMixin, Worker):
+    """잡마다 work horse를 fork (웜업한 부모 상태를 copy-on-write로 물려받음)"""
+
+
+class TimedSimpleWorker(JobMetricsMixin, StartupTimingMixin, SimpleWorker):
+    """fork 없이 워커 프로세스에서 잡 실행 (임포트/JIT/상주 모델이 잡 사이에 유지)"""
+
+
+WORKER_CLASSES = {"fork": TimedWorker, "simple": TimedSimpleWorker}
+
+
+def _setup_metrics_dir() -> None:
+    """
+    prometheus_client 멀티프로세스 모드: work horse/풀 워커가 pid별 파일에 쓰고 사이드 포트가 합쳐서 응답.
+    prometheus_client가 임포트되기 전에 설정해야 한다. 이전 실행의 파일은 지운다.
+    """
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR") or os.path.join(tempfile.gettempdir(), "beatmap-worker-metrics")
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = path
+
+
+def _start_metrics_server(port: int) -> None:
+    from prometheus_client import start_http_server
+    from app.core.metrics import metrics_registry
+
+    start_http_server(port, registry=metrics_registry())
+    logging.info("Metrics on :%s/metrics (multiprocess dir=%s)", port, os.environ["PROMETHEUS_MULTIPROC_DIR"])
+
+
 # ────────────────────────────────────────────────────────────────────────────
 # 메인
 # ────────────────────────────────────────────────────────────────────────────
@@ -47,8 +139,10 @@ def parse_args() -> argparse.Namespace:
     p = argparse.ArgumentParser(description="RQ Worker (latest API)")
     p.add_argument(
         "--queues",
-        default=settings.RQ_QUEUE,
-        help="Comma-separated queue names (default: settings.RQ_QUEUE)",
+        default=f"{settings.RQ_QUEUE},{settings.RQ_HEAVY_QUEUE},{settings.RQ_LOW_QUEUE},{settings.RQ_HEAVY_LOW_QUEUE}",
+        help="Comma-separated queue names, in priority order "
+             "(default: settings.RQ_QUEUE,settings.RQ_HEAVY_QUEUE,settings.RQ_LOW_QUEUE,settings.RQ_HEAVY_LOW_QUEUE; "
+             "run separate workers per queue to overlap beat analysis and separation)",
     )
     p.add_argument(
         "--log-level",
@@ -61,11 +155,39 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="Burst mode: exit when queues are empty",
     )
+    p.add_argument(
+        "--mode",
+        default=settings.WORKER_MODE,
+        choices=sorted(WORKER_CLASSES),
+        help="fork: fork a work horse per job | simple: run jobs in the worker process "
+             "(default: settings.WORKER_MODE)",
+    )
+    p.add_argument(
+        "--processes",
+        type=int,
+        default=settings.WORKER_PROCESSES,
+        help="Number of worker processes pre-forked from the warmed parent (default: settings.WORKER_PROCESSES)",
+    )
+    p.add_argument(
+        "--metrics-port",
+        type=int,
+        default=settings.WORKER_METRICS_PORT,
+        help="Serve Prometheus metrics on this port, 0 to disable (default: settings.WORKER_METRICS_PORT)",
+    )
+    p.add_argument(
+        "--no-warmup",
+        dest="warmup",
+        action="store_false",
+        default=settings.WORKER_WARMUP,
+        help="Skip importing the audio stack and JIT warm-up before accepting jobs",
+    )
     return p.parse_args()
 
 
 def main():
     args = parse_args()
+    if args.metrics_port:
+        _setup_metrics_dir()
 
     # 로깅 설정
     setup_loghandlers(level=args.log_level)
@@ -93,14 +215,35 @@ def main():
     if worker_name:
         logging.info("Worker name: %s", worker_name)
 
+    # 웜업: 잡을 받기 전에 부모에서 임포트/JIT (fork된 잡/워커가 물려받음)
+    if args.warmup:
+        from app.services.tasks.warmup import warm_up
+        warm_up()
+
+    if args.metrics_port:
+        _start_metrics_server(args.metrics_port)
+
+    worker_class = WORKER_CLASSES[args.mode]
+
+    # pre-fork: 웜업한 부모에서 워커 N개를 fork, 부모는 감시만
+    if args.processes > 1:
+        logging.info(
+            "Worker pool starting. processes=%s, mode=%s, queues=%s, burst=%s",
+            args.processes, args.mode, qnames, args.burst,
+        )
+        pool = WorkerPool(qnames, connection=redis_conn, num_workers=args.processes, worker_class=worker_class)
+        pool.start(burst=args.burst, logging_level=args.log_level)
+        logging.info("Worker pool exited.")
+        return
+
     # 신호 처리기
     _install_signal_handlers()
 
     # 워커 시작 (최신 RQ: Connection 컨텍스트 불필요)
-    worker = Worker(queues, connection=redis_conn, name=worker_name)
+    worker = worker_class(queues, connection=redis_conn, name=worker_name)
     logging.info(
-        "Worker started. queues=%s, burst=%s, redis=%s",
-        qnames, args.burst, redis_url
+        "Worker started. queues=%s, burst=%s, mode=%s, redis=%s",
+        qnames, args.burst, args.mode, redis_url
     )
 
     # with_scheduler=True 는 rq-scheduler 사용할 때만